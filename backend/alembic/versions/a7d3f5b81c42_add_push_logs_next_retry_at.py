@@ -0,0 +1,37 @@
+"""add push_logs.next_retry_at retry queue
+
+失败推送按 next_retry_at 退避重试（app.services.push.retry），部分索引只覆盖待重试的行。
+最近 24 小时内仍可重试的失败记录立即进入队列，更早的记录不再重试。
+
+Revision ID: a7d3f5b81c42
+Revises: f1a6c3e9d204
+Create Date: 2026-10-17 23:05:37.104829
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3f5b81c42'
+down_revision = 'f1a6c3e9d204'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('push_logs', sa.Column('next_retry_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_push_logs_next_retry_at', 'push_logs', ['next_retry_at'], unique=False,
+        postgresql_where=sa.text('next_retry_at IS NOT NULL'),
+    )
+    op.execute(
+        "UPDATE push_logs SET next_retry_at = now() "
+        "WHERE status = 'FAILED' AND retry_count < max_retries "
+        "AND created_at >= now() - interval '24 hours'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_push_logs_next_retry_at', table_name='push_logs')
+    op.drop_column('push_logs', 'next_retry_at')
@@ -0,0 +1,30 @@
+"""index bipupu_id_free allocation order
+
+bipupu_id 分配器按 ORDER BY length(bipupu_id), bipupu_id 取最小空闲 ID（app.services.bipupu_id_allocator），
+表达式索引让每次分配只读索引首条，不再排序整个空闲池。
+
+Revision ID: c4e9b2d7a6f1
+Revises: a7d3f5b81c42
+Create Date: 2026-10-17 23:48:12.550913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e9b2d7a6f1'
+down_revision = 'a7d3f5b81c42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_bipupu_id_free_length_id', 'bipupu_id_free',
+        [sa.text('length(bipupu_id)'), 'bipupu_id'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bipupu_id_free_length_id', table_name='bipupu_id_free')
@@ -0,0 +1,133 @@
+"""partition messages and push_logs by month
+
+messages 与 push_logs 改为按 created_at 的 RANGE 分区表（每月一个分区 {table}_pYYYYMM），
+主键改为 (id, created_at)，沿用原 id 序列。分区表上的唯一约束必须包含分区键，
+favorites.message_id 的外键随之移除（由 ORM 关系与保留期清理维护一致性）。
+
+升级会重建两张表并复制现有数据，期间表不可写。后续分区由 maintenance.partitions 任务维护。
+
+Revision ID: f1a6c3e9d204
+Revises: e2c9a4d7b618
+Create Date: 2026-10-17 21:40:12.518204
+
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a6c3e9d204'
+down_revision = 'e2c9a4d7b618'
+branch_labels = None
+depends_on = None
+
+PREMAKE_MONTHS = 3
+
+TABLES = {
+    "messages": {
+        "columns": """
+            id INTEGER NOT NULL DEFAULT nextval('messages_id_seq'),
+            content TEXT NOT NULL,
+            message_type VARCHAR(20) NOT NULL,
+            sender_bipupu_id VARCHAR(50) NOT NULL,
+            receiver_bipupu_id VARCHAR(50) NOT NULL,
+            pattern JSON,
+            waveform JSONB,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+        """,
+        "names": "id, content, message_type, sender_bipupu_id, receiver_bipupu_id, pattern, waveform, created_at",
+        "indexes": [
+            ("idx_msg_type", ["message_type", "created_at"]),
+            ("idx_receiver_created", ["receiver_bipupu_id", "created_at"]),
+            ("idx_sender_created", ["sender_bipupu_id", "created_at"]),
+            ("idx_receiver_id", ["receiver_bipupu_id", "id"]),
+            ("idx_sender_id", ["sender_bipupu_id", "id"]),
+            ("ix_messages_created_at", ["created_at"]),
+            ("ix_messages_id", ["id"]),
+            ("ix_messages_message_type", ["message_type"]),
+            ("ix_messages_receiver_bipupu_id", ["receiver_bipupu_id"]),
+            ("ix_messages_sender_bipupu_id", ["sender_bipupu_id"]),
+        ],
+    },
+    "push_logs": {
+        "columns": """
+            id INTEGER NOT NULL DEFAULT nextval('push_logs_id_seq'),
+            service_name VARCHAR(100) NOT NULL,
+            receiver_bipupu_id VARCHAR(50) NOT NULL,
+            content_preview VARCHAR(255),
+            status push_status_enum NOT NULL,
+            error_message TEXT,
+            retry_count INTEGER NOT NULL DEFAULT '0',
+            max_retries INTEGER NOT NULL DEFAULT '3',
+            task_id VARCHAR(100),
+            task_name VARCHAR(100),
+            extra_data JSONB,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            started_at TIMESTAMP WITH TIME ZONE,
+            completed_at TIMESTAMP WITH TIME ZONE
+        """,
+        "names": "id, service_name, receiver_bipupu_id, content_preview, status, error_message, retry_count, "
+                 "max_retries, task_id, task_name, extra_data, created_at, started_at, completed_at",
+        "indexes": [
+            ("idx_push_receiver_created", ["receiver_bipupu_id", "created_at"]),
+            ("idx_push_service_created", ["service_name", "created_at"]),
+            ("idx_push_status_created", ["status", "created_at"]),
+            ("idx_push_task_id", ["task_id"]),
+        ],
+    },
+}
+
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _rebuild(table: str, partitioned: bool) -> None:
+    spec = TABLES[table]
+    tmp = f"{table}_rebuild"
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+
+    if partitioned:
+        op.execute(
+            f"CREATE TABLE {tmp} ({spec['columns']}, PRIMARY KEY (id, created_at)) "
+            f"PARTITION BY RANGE (created_at)"
+        )
+        first, last = op.get_bind().execute(
+            sa.text(f"SELECT min(created_at), max(created_at) FROM {table}")
+        ).one()
+        today = datetime.now(timezone.utc).date()
+        month = (first.astimezone(timezone.utc).date() if first else today).replace(day=1)
+        end = _add_months(max(today, last.astimezone(timezone.utc).date() if last else today), PREMAKE_MONTHS)
+        while month <= end:
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {tmp} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') "
+                f"TO ('{_add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+            )
+            month = _add_months(month, 1)
+    else:
+        op.execute(f"CREATE TABLE {tmp} ({spec['columns']}, PRIMARY KEY (id))")
+
+    op.execute(f"INSERT INTO {tmp} ({spec['names']}) SELECT {spec['names']} FROM {table}")
+    op.execute(f"DROP TABLE {table}")
+    op.execute(f"ALTER TABLE {tmp} RENAME TO {table}")
+    op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {tmp}_pkey TO {table}_pkey")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    for name, columns in spec["indexes"]:
+        op.create_index(name, table, columns, unique=False)
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE favorites DROP CONSTRAINT IF EXISTS favorites_message_id_fkey")
+    _rebuild("messages", partitioned=True)
+    _rebuild("push_logs", partitioned=True)
+
+
+def downgrade() -> None:
+    _rebuild("push_logs", partitioned=False)
+    _rebuild("messages", partitioned=False)
+    op.execute("DELETE FROM favorites WHERE message_id NOT IN (SELECT id FROM messages)")
+    op.create_foreign_key("favorites_message_id_fkey", "favorites", "messages", ["message_id"], ["id"])
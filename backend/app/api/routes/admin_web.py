@@ -39,7 +39,7 @@ async def admin_login(
     db: Session = Depends(get_db),
 ):
     """处理管理后台登录"""
-    user = authenticate_user(db, username, password)
+    user = await authenticate_user(db, username, password)
     if not user:
         return templates.TemplateResponse(
             "login.html", {"request": request, "error": "用户名或密码错误"}
@@ -383,6 +383,8 @@ async def upload_service_avatar(
         # 使用StorageService处理头像压缩
         try:
             avatar_data = await StorageService.save_avatar(file)
+        except HTTPException:
+            raise
         except ValueError as e:
             # 处理StorageService抛出的具体错误
             raise HTTPException(status_code=400, detail=str(e))
@@ -394,7 +396,11 @@ async def upload_service_avatar(
 
         # 更新数据库
         try:
+            from app.services.avatar_rendition_service import AvatarRenditionService
             service.avatar_data = avatar_data
+            await AvatarRenditionService.save_renditions(
+                db, AvatarRenditionService.service_key(service.id), avatar_data
+            )
             db.commit()
 
             return RedirectResponse(url="/admin/service_accounts", status_code=302)
@@ -438,6 +444,8 @@ async def update_service_push_time(
         if description is not None:
             service.description = description
 
+        from app.services.push.utils import refresh_push_slots
+        refresh_push_slots(db, service_account_id=service.id)
         db.commit()
 
         return RedirectResponse(url="/admin/service_accounts", status_code=302)
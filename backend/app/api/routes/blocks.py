@@ -17,7 +17,8 @@ from app.schemas.user import BlockUserRequest, BlockedUserResponse
 from app.schemas.common import (
     PaginationParams, PaginatedResponse, SuccessResponse, CountResponse
 )
-from app.core.security import get_current_active_user
+from app.core.security import get_current_principal
+from app.core.principal import Principal
 from app.core.logging import get_logger
 
 router = APIRouter()
@@ -27,7 +28,7 @@ logger = get_logger(__name__)
 @router.post("/", response_model=SuccessResponse)
 async def block_user(
     block_data: BlockUserRequest,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """拉黑用户
@@ -85,7 +86,7 @@ async def block_user(
 @router.get("/", response_model=PaginatedResponse[BlockedUserResponse])
 async def get_blocked_users(
     params: PaginationParams = Depends(),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """获取黑名单列表
@@ -137,7 +138,7 @@ async def get_blocked_users(
 @router.delete("/{bipupu_id}", response_model=SuccessResponse)
 async def unblock_user(
     bipupu_id: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """取消拉黑用户
@@ -186,7 +187,7 @@ async def unblock_user(
 @router.get("/check/{bipupu_id}", response_model=dict)
 async def check_block_status(
     bipupu_id: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """检查用户是否被拉黑
@@ -237,7 +238,7 @@ async def check_block_status(
 async def search_blocked_users(
     query: str = Query(..., description="搜索关键词（用户名或昵称）"),
     limit: int = Query(10, ge=1, le=50, description="返回结果数量"),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """搜索黑名单用户
@@ -293,7 +294,7 @@ async def search_blocked_users(
 
 @router.get("/count", response_model=CountResponse)
 async def get_blocked_users_count(
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """获取黑名单用户数量
@@ -17,7 +17,8 @@ from app.schemas.contact import (
     ContactCreate, ContactUpdate, ContactResponse, ContactListResponse
 )
 from app.schemas.common import SuccessResponse
-from app.core.security import get_current_user
+from app.core.security import get_current_principal
+from app.core.principal import Principal
 from app.core.logging import get_logger
 
 router = APIRouter()
@@ -28,7 +29,7 @@ logger = get_logger(__name__)
 async def get_contacts(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """获取联系人列表
@@ -92,7 +93,7 @@ async def get_contacts(
 @router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED)
 async def create_contact(
     contact_data: ContactCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """添加联系人
@@ -161,7 +162,7 @@ async def create_contact(
 async def update_contact(
     contact_id: str,
     contact_data: ContactUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """更新联系人备注
@@ -205,7 +206,7 @@ async def update_contact(
 @router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_contact(
     contact_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """删除联系人
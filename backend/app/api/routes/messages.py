@@ -8,11 +8,13 @@
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, cast
 import asyncio
 
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
 from app.models.user import User
 from app.models.message import Message
 from app.schemas.message import (
@@ -23,7 +25,11 @@ from app.schemas.favorite import (
     FavoriteCreate, FavoriteResponse, FavoriteListResponse
 )
 from app.services.cache_service import CacheService
-from app.core.security import get_current_user
+from app.services.message_service import MessageService
+from app.services.timeline_cache import TimelineCache
+from app.core.security import get_current_principal
+from app.core.principal import Principal
+from app.core.poll_wakeup import poll_wakeups
 from app.core.logging import get_logger
 
 router = APIRouter()
@@ -37,8 +43,8 @@ logger = get_logger(__name__)
 @router.post("/", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
 async def send_message(
     message_data: MessageCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """发送消息
 
@@ -60,18 +66,22 @@ async def send_message(
     try:
         # 检查接收者是否存在
         from app.models.user import User as UserModel
-        receiver = db.query(UserModel).filter(
-            UserModel.bipupu_id == message_data.receiver_id,
-            UserModel.is_active.is_(True)
-        ).first()
+        receiver = (await db.execute(
+            select(UserModel).where(
+                UserModel.bipupu_id == message_data.receiver_id,
+                UserModel.is_active.is_(True)
+            )
+        )).scalars().first()
 
         if not receiver:
             # 检查是否是服务号
             from app.models.service_account import ServiceAccount
-            service = db.query(ServiceAccount).filter(
-                ServiceAccount.name == message_data.receiver_id,
-                ServiceAccount.is_active.is_(True)
-            ).first()
+            service = (await db.execute(
+                select(ServiceAccount.id).where(
+                    ServiceAccount.name == message_data.receiver_id,
+                    ServiceAccount.is_active.is_(True)
+                )
+            )).scalars().first()
 
             if not service:
                 raise HTTPException(
@@ -90,15 +100,16 @@ async def send_message(
         )
 
         db.add(message)
-        db.commit()
-        db.refresh(message)
+        await db.commit()
+        await db.refresh(message)
+
+        # 写入时间线缓存，WebSocket 推送并唤醒接收者的长轮询（跨进程）
+        await TimelineCache.record_message(message)
+        await MessageService.push_new_message(message)
 
         # 清除接收者的缓存
-        receiver_user = db.query(User).filter(
-            User.bipupu_id == message_data.receiver_id
-        ).first()
-        if receiver_user:
-            await CacheService.invalidate_user_inbox_cache(cast(int, receiver_user.id))
+        if receiver:
+            await CacheService.invalidate_user_inbox_cache(cast(int, receiver.id))
         
         logger.info(f"消息发送成功: sender={current_user.bipupu_id}, receiver={message_data.receiver_id}")
         return message
@@ -106,7 +117,7 @@ async def send_message(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"消息发送失败: {e}")
         raise HTTPException(status_code=500, detail="消息发送失败")
 
@@ -118,8 +129,11 @@ async def get_received_messages(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     since_id: int = Query(0, ge=0, description="增量同步ID"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    before_id: int | None = Query(None, ge=1, description="游标：返回 id 小于此值的更早消息"),
+    after_id: int | None = Query(None, ge=0, description="游标：返回 id 大于此值的更新消息"),
+    include_total: bool | None = Query(None, description="是否统计总数（游标模式默认不统计）"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取用户的收件箱（接收的消息）
 
@@ -127,60 +141,37 @@ async def get_received_messages(
     - page: 页码（从1开始）
     - page_size: 每页数量（1-100，默认20）
     - since_id: 增量同步参数，只返回 id > since_id 的消息（默认0表示全量）
+    - before_id / after_id: 游标分页（二选一），传入后忽略 page，耗时与历史消息数无关
+    - include_total: 是否返回总数
 
     返回：
-    - messages: 消息列表
-    - total: 总数
+    - messages: 消息列表（按 id 降序）
+    - total: 总数（游标模式下默认为 null）
     - page: 当前页码
     - page_size: 每页数量
+    - has_more / next_cursor: 是否还有更多消息及下一页游标
     """
+    if before_id is not None and after_id is not None:
+        raise HTTPException(status_code=400, detail="before_id 与 after_id 不能同时使用")
+
     try:
-        # 尝试从缓存获取
-        cache_key = CacheService.generate_inbox_cache_key(
-            user_id=cast(int, current_user.id),
-            page=page,
-            page_size=page_size
-        )
-        
-        # 非增量同步时使用缓存
-        if since_id == 0:
-            cached_response = await CacheService.get_message_list(cache_key)
-            if cached_response:
-                logger.debug(f"收件箱缓存命中: user_id={current_user.id}, page={page}")
-                return cached_response
-        
-        # 构建查询
-        query = db.query(Message).filter(
-            Message.receiver_bipupu_id == current_user.bipupu_id
-        )
-        
-        # 增量同步：只返回 id > since_id 的消息
-        if since_id > 0:
-            query = query.filter(Message.id > since_id)
-        
-        # 计算总数
-        total = query.count()
-        
-        # 分页查询，按创建时间降序
-        messages = query.order_by(Message.created_at.desc()) \
-            .offset((page - 1) * page_size) \
-            .limit(page_size) \
-            .all()
-        
-        response = MessageListResponse(
-            messages=[MessageResponse.model_validate(msg) for msg in messages],
-            total=total,
+        # 优先从时间线缓存组装（新消息写穿，第一页不会因新消息失效）
+        response = await MessageService.get_message_page(
+            db,
+            bipupu_id=cast(str, current_user.bipupu_id),
+            direction="received",
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            since_id=since_id,
+            before_id=before_id,
+            after_id=after_id,
+            include_total=include_total
         )
         
-        # 缓存结果（非增量同步）
-        if since_id == 0:
-            await CacheService.set_message_list(cache_key, response, ttl=300)
-        
         logger.debug(
             f"获取收件箱: user_id={current_user.id}, page={page}, "
-            f"count={len(messages)}, total={total}"
+            f"before_id={before_id}, after_id={after_id}, "
+            f"count={len(response.messages)}, total={response.total}"
         )
         return response
 
@@ -194,8 +185,11 @@ async def get_sent_messages(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     since_id: int = Query(0, ge=0, description="增量同步ID"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    before_id: int | None = Query(None, ge=1, description="游标：返回 id 小于此值的更早消息"),
+    after_id: int | None = Query(None, ge=0, description="游标：返回 id 大于此值的更新消息"),
+    include_total: bool | None = Query(None, description="是否统计总数（游标模式默认不统计）"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取用户的发件箱（发送的消息）
 
@@ -203,62 +197,39 @@ async def get_sent_messages(
     - page: 页码（从1开始）
     - page_size: 每页数量（1-100，默认20）
     - since_id: 增量同步参数，只返回 id > since_id 的消息（默认0表示全量）
+    - before_id / after_id: 游标分页（二选一），传入后忽略 page，耗时与历史消息数无关
+    - include_total: 是否返回总数
 
     返回：
-    - messages: 消息列表
-    - total: 总数
+    - messages: 消息列表（按 id 降序）
+    - total: 总数（游标模式下默认为 null）
     - page: 当前页码
     - page_size: 每页数量
+    - has_more / next_cursor: 是否还有更多消息及下一页游标
     
     注：后端已经按 sender_bipupu_id 过滤，前端无需再次过滤
     """
+    if before_id is not None and after_id is not None:
+        raise HTTPException(status_code=400, detail="before_id 与 after_id 不能同时使用")
+
     try:
-        # 尝试从缓存获取
-        cache_key = CacheService.generate_sent_cache_key(
-            user_id=cast(int, current_user.id),
-            page=page,
-            page_size=page_size
-        )
-        
-        # 非增量同步时使用缓存
-        if since_id == 0:
-            cached_response = await CacheService.get_message_list(cache_key)
-            if cached_response:
-                logger.debug(f"发件箱缓存命中: user_id={current_user.id}, page={page}")
-                return cached_response
-        
-        # 构建查询：只获取该用户发送的消息
-        query = db.query(Message).filter(
-            Message.sender_bipupu_id == current_user.bipupu_id
-        )
-        
-        # 增量同步：只返回 id > since_id 的消息
-        if since_id > 0:
-            query = query.filter(Message.id > since_id)
-        
-        # 计算总数
-        total = query.count()
-        
-        # 分页查询，按创建时间降序
-        messages = query.order_by(Message.created_at.desc()) \
-            .offset((page - 1) * page_size) \
-            .limit(page_size) \
-            .all()
-        
-        response = MessageListResponse(
-            messages=[MessageResponse.model_validate(msg) for msg in messages],
-            total=total,
+        # 优先从时间线缓存组装（新消息写穿，第一页不会因新消息失效）
+        response = await MessageService.get_message_page(
+            db,
+            bipupu_id=cast(str, current_user.bipupu_id),
+            direction="sent",
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            since_id=since_id,
+            before_id=before_id,
+            after_id=after_id,
+            include_total=include_total
         )
         
-        # 缓存结果（非增量同步）
-        if since_id == 0:
-            await CacheService.set_message_list(cache_key, response, ttl=300)
-        
         logger.debug(
             f"获取发件箱: user_id={current_user.id}, page={page}, "
-            f"count={len(messages)}, total={total}"
+            f"before_id={before_id}, after_id={after_id}, "
+            f"count={len(response.messages)}, total={response.total}"
         )
         return response
 
@@ -273,15 +244,15 @@ async def get_sent_messages(
 async def long_poll_messages(
     last_msg_id: int = Query(0, ge=0, description="最后收到的消息 ID"),
     timeout: int = Query(30, ge=1, le=120, description="轮询超时时间（秒）"),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    """长轮询接口：获取新消息 - 1C1G 优化版
+    """长轮询接口：获取新消息 - 事件驱动版
     
     核心优化：
-    1. 使用统一依赖注入（get_db_context）
-    2. 使用独立查询函数（query_messages_for_user）
-    3. 快速申请/释放连接（占用时间 < 100ms）
-    4. 不手动管理会话生命周期
+    1. 没有新消息时按 bipupu_id 挂起，不再每秒查询数据库
+    2. 新消息提交后经投递总线唤醒（跨进程），唤醒后只查询一次
+    3. 使用独立查询函数（query_messages_for_user），连接占用时间 < 100ms
+    4. 挂起期间不持有数据库连接
     
     参数：
     - last_msg_id: 最后收到的消息 ID（从 0 开始表示获取所有新消息）
@@ -292,42 +263,37 @@ async def long_poll_messages(
     - has_more: 是否有更多消息（返回数量≥20 时为 true）
     """
     try:
-        from app.db.database import get_db_context, query_messages_for_user
+        from app.db.database import query_messages_for_user
         
-        # 步骤 1：使用统一上下文管理器进行初始查询
-        async with get_db_context() as db:
-            initial_messages = db.query(Message).filter(
-                Message.receiver_bipupu_id == current_user.bipupu_id,
-                Message.id > last_msg_id
-            ).order_by(Message.id.asc()).limit(20).all()
-        
-        if initial_messages:
-            return MessagePollResponse(
-                messages=[MessageResponse.model_validate(msg) for msg in initial_messages],
-                has_more=len(initial_messages) >= 20
-            )
+        bipupu_id = str(current_user.bipupu_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
         
-        # 步骤 2：等待循环 - 使用独立查询函数（每次快速申请/释放）
-        elapsed = 0
-        while elapsed < timeout:
-            await asyncio.sleep(1)  # 1 秒检查间隔
-            elapsed += 1
-            
-            # ✅ 关键：使用独立查询函数，连接占用时间 < 100ms
+        # 先注册等待者再查询，避免查询与挂起之间到达的消息丢失唤醒
+        with poll_wakeups.listen(bipupu_id) as waiter:
             messages = await query_messages_for_user(
-                user_bipupu_id=current_user.bipupu_id,
+                user_bipupu_id=bipupu_id,
                 last_msg_id=last_msg_id,
                 limit=20
             )
             
-            if messages:
-                return MessagePollResponse(
-                    messages=[MessageResponse.model_validate(msg) for msg in messages],
-                    has_more=len(messages) >= 20
+            while not messages:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                if not await waiter.wait(remaining):
+                    break
+                # 被唤醒：只查询一次
+                messages = await query_messages_for_user(
+                    user_bipupu_id=bipupu_id,
+                    last_msg_id=last_msg_id,
+                    limit=20
                 )
         
-        # 超时返回空
-        return MessagePollResponse(messages=[], has_more=False)
+        return MessagePollResponse(
+            messages=[MessageResponse.model_validate(msg) for msg in messages],
+            has_more=len(messages) >= 20
+        )
         
     except Exception as e:
         logger.error(f"长轮询失败：{e}")
@@ -339,7 +305,7 @@ async def long_poll_messages(
 @router.post("/{message_id}/read")
 async def mark_single_message_read(
     message_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """标记单条消息为已读
@@ -381,7 +347,7 @@ async def mark_single_message_read(
 @router.post("/read-batch")
 async def mark_messages_read_batch(
     message_ids: List[int],
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """批量标记消息为已读
@@ -421,7 +387,7 @@ async def mark_messages_read_batch(
 async def get_favorites(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """获取收藏消息列表
@@ -483,7 +449,7 @@ async def get_favorites(
 async def add_favorite(
     message_id: int,
     favorite_data: FavoriteCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """收藏消息
@@ -545,7 +511,7 @@ async def add_favorite(
 @router.delete("/{message_id}/favorite", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_favorite(
     message_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """取消收藏消息
@@ -586,7 +552,7 @@ async def remove_favorite(
 @router.delete("/{message_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_message(
     message_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """删除消息（仅限发送者）
@@ -611,6 +577,7 @@ async def delete_message(
         # 删除消息
         db.delete(message)
         db.commit()
+        await TimelineCache.remove_message(message)
         
         # 清除发送者和接收者的缓存
         sender_user = db.query(User).filter(User.bipupu_id == message.sender_bipupu_id).first()
@@ -8,17 +8,19 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.security import get_current_principal
+from app.core.principal import Principal
 from app.services.push.service import PushService
 from app.core.logging import get_logger
+from app.core.priority import Priority
+from app.core.websocket import manager
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
 
-def _require_admin(current_user: User):
+def _require_admin(current_user: Principal):
     if not (current_user.is_superuser if current_user.is_superuser is not None else False):
         raise HTTPException(status_code=403, detail="管理员权限不足")
 
@@ -26,12 +28,14 @@ def _require_admin(current_user: User):
 @router.get("/status", tags=["推送服务"])
 async def get_push_service_status(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Dict[str, Any]:
-    """获取推送服务状态（引擎统计、服务号列表）"""
+    """获取推送服务状态（服务号列表、最近推送运行进度、本进程各优先级通道的发送延迟）"""
     try:
         push_service = PushService(db)
         status = push_service.get_service_status()
+        status["runs"] = await push_service.get_push_runs()
+        status["lanes"] = manager.get_lane_stats()
         return {"success": True, "data": status}
     except Exception as e:
         logger.error(f"获取推送服务状态失败: {e}")
@@ -44,7 +48,7 @@ async def send_immediate_push(
     user_id: Optional[str] = Body(None, description="目标用户 BIPUPU ID，为空时推给当前用户"),
     content: Optional[str] = Body(None, description="推送内容，为空时按服务号类型自动生成"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Dict[str, Any]:
     """立即向指定用户发送推送消息（高优先级）"""
     try:
@@ -57,7 +61,7 @@ async def send_immediate_push(
             service_name=service_name,
             user_id=target_user_id,
             content=content,
-            priority=1
+            priority=Priority.HIGH
         )
 
         if not result.get("success"):
@@ -77,13 +81,13 @@ async def broadcast_push(
     service_name: str = Body(..., description="服务号名称"),
     content: Optional[str] = Body(None, description="推送内容，为空时自动生成"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Dict[str, Any]:
     """向服务号所有订阅者广播推送（管理员）"""
     _require_admin(current_user)
     try:
         push_service = PushService(db)
-        result = await push_service.broadcast(service_name=service_name, content=content, priority=2)
+        result = await push_service.broadcast(service_name=service_name, content=content, priority=Priority.NORMAL)
         return {"success": True, "data": result}
     except HTTPException:
         raise
@@ -97,7 +101,7 @@ async def test_push(
     service_name: str = Body(..., description="服务号名称"),
     user_id: Optional[str] = Body(None, description="目标用户 BIPUPU ID，为空时推给当前用户"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Dict[str, Any]:
     """发送测试推送，验证推送链路是否正常"""
     try:
@@ -123,7 +127,7 @@ async def test_push(
 @router.post("/scheduled/run", tags=["推送服务"])
 async def trigger_scheduled_push(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Dict[str, Any]:
     """
     手动触发一次定时推送检查（管理员）
@@ -145,9 +149,9 @@ async def trigger_scheduled_push(
 async def retry_failed_pushes(
     max_retries: int = Body(3, description="最大重试次数上限"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Dict[str, Any]:
-    """重试失败推送（管理员）"""
+    """立即重试已到退避时间的失败推送（管理员）"""
     _require_admin(current_user)
     try:
         push_service = PushService(db)
@@ -166,12 +170,40 @@ async def get_push_logs(
     limit: int = Query(50, ge=1, le=200, description="返回条数"),
     skip: int = Query(0, ge=0, description="分页偏移"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Dict[str, Any]:
-    """查询推送日志（管理员）- 支持多条件筛选，按时间倒序"""
+    """查询推送日志（管理员）- 支持多条件筛选，按时间倒序
+
+    优先读取 Redis Stream 中最近的推送记录（含尚未落库的记录），此时 total 为最近记录窗口内的匹配数；
+    最近记录凑不满请求的页时回退到 push_logs 表。
+    """
     _require_admin(current_user)
 
     from app.models.push_log import PushLog
+    from app.services.push.log_stream import push_log_stream
+
+    recent, matched = await push_log_stream.recent(
+        limit=limit, skip=skip, service_name=service_name, receiver_id=receiver_id, status=status
+    )
+    if len(recent) == limit:
+        items = [
+            {
+                "id": entry["id"],
+                "service_name": entry.get("service_name"),
+                "receiver_bipupu_id": entry.get("receiver_bipupu_id"),
+                "status": entry.get("status"),
+                "content_preview": entry.get("content_preview"),
+                "error_message": entry.get("error_message"),
+                "retry_count": entry.get("retry_count", 0),
+                "task_id": entry.get("task_id"),
+                "created_at": entry.get("created_at"),
+                "started_at": entry.get("started_at"),
+                "completed_at": entry.get("completed_at"),
+                "next_retry_at": entry.get("next_retry_at"),
+            }
+            for entry in recent
+        ]
+        return {"items": items, "total": matched, "skip": skip, "limit": limit, "source": "stream"}
 
     query = db.query(PushLog)
     if service_name:
@@ -197,18 +229,19 @@ async def get_push_logs(
             "created_at": log.created_at.isoformat() if log.created_at else None,
             "started_at": log.started_at.isoformat() if log.started_at else None,
             "completed_at": log.completed_at.isoformat() if log.completed_at else None,
+            "next_retry_at": log.next_retry_at.isoformat() if log.next_retry_at else None,
         }
         for log in logs
     ]
 
-    return {"items": items, "total": total, "skip": skip, "limit": limit}
+    return {"items": items, "total": total, "skip": skip, "limit": limit, "source": "database"}
 
 
 @router.delete("/logs/cleanup", tags=["推送服务"])
 async def cleanup_push_logs(
-    days: int = Query(30, ge=7, description="保留最近 N 天，更早的 success/failed 日志将被删除"),
+    days: int = Query(30, ge=7, description="保留最近 N 天，整月早于该时间的日志分区将被删除"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Dict[str, Any]:
     """清理旧推送日志（管理员）"""
     _require_admin(current_user)
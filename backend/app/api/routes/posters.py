@@ -27,7 +27,7 @@ def _build_poster_response(poster) -> PosterResponse:
         id=poster.id,
         title=poster.title,
         link_url=poster.link_url,
-        image_url=f"/api/posters/{poster.id}/image" if poster.id else None,
+        image_url=poster.image_url,
         display_order=poster.display_order,
         is_active=poster.is_active,
         created_at=poster.created_at,
@@ -104,43 +104,66 @@ async def get_poster_image(
     - 失败：404（海报或图片不存在）
 
     特性：
-    - 支持ETag缓存，减少带宽消耗
-    - 支持HTTP 304 Not Modified响应
-    - 图片数据缓存24小时
-    - 自动处理图片版本更新
+    - ETag 为上传时保存的内容哈希，304 响应不读取图片数据
+    - 海报信息中的 image_url 为带内容哈希的版本化地址，可永久缓存
 
     注意：
     - 无需认证，公开接口
-    - 支持缓存控制头（Cache-Control, ETag）
     - 统一返回JPEG格式二进制数据
     - 前端可直接用于img标签的src属性
     """
+    return await _serve_poster_image(request, poster_id, None, db)
+
+
+@router.get("/{poster_id}/image/{image_hash}")
+async def get_poster_image_by_hash(
+    request: Request,
+    poster_id: int,
+    image_hash: str,
+    db: Session = Depends(get_db)
+):
+    """获取指定内容版本的海报图片（Cache-Control: immutable）
+
+    哈希已过期（图片已更新）时重定向到当前版本。
+    """
+    return await _serve_poster_image(request, poster_id, image_hash, db)
+
+
+async def _serve_poster_image(
+    request: Request,
+    poster_id: int,
+    image_hash: Optional[str],
+    db: Session
+):
+    """按内容哈希响应海报图片，仅在需要返回内容时读取 image_data"""
     from app.services.storage_service import StorageService
-    from fastapi.responses import Response
+    from fastapi.responses import RedirectResponse
 
     poster = PosterService.get_poster(db, poster_id)
-    if not poster or not poster.image_data:
+    if not poster:
         raise HTTPException(status_code=404, detail="海报或图片不存在")
 
-    # 生成ETag - 使用更新时间戳
-    updated_at_timestamp = poster.updated_at.timestamp() if poster.updated_at else 0
-    etag_input = f"{poster.id}:{updated_at_timestamp}".encode()
-    etag = StorageService.get_avatar_etag(poster.image_data, etag_input)
-
-    # 检查If-None-Match头
-    if_none_match = request.headers.get("if-none-match")
-    if if_none_match and if_none_match == etag:
-        return Response(status_code=304)  # Not Modified
-
-    # 返回二进制图片数据
-    return Response(
-        content=poster.image_data,
-        media_type="image/jpeg",  # StorageService统一保存为JPEG格式
-        headers={
-            "ETag": etag,
-            "Cache-Control": "public, max-age=86400",  # 缓存24小时
-            "Content-Disposition": f'inline; filename="poster-{poster.id}.jpg"'
-        }
+    def load_image():
+        return PosterService.get_poster_image_data(db, poster_id)
+
+    current_hash = poster.image_hash
+    if not current_hash:
+        # 迁移前上传、尚未回填哈希的图片
+        image_data = load_image()
+        if not image_data:
+            raise HTTPException(status_code=404, detail="海报或图片不存在")
+        current_hash = StorageService.get_content_hash(image_data)
+
+    if image_hash is not None and image_hash != current_hash:
+        return RedirectResponse(url=f"/api/posters/{poster_id}/image/{current_hash}", status_code=302)
+
+    return await StorageService.serve_image(
+        request,
+        current_hash,
+        load_image,
+        cache_key=StorageService.get_poster_cache_key(poster_id, current_hash),
+        immutable=image_hash is not None,
+        headers={"Content-Disposition": f'inline; filename="poster-{poster_id}.jpg"'}
     )
 
 
@@ -6,9 +6,10 @@
 3. 时区设置
 """
 
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Request
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Request, Query
 from sqlalchemy.orm import Session
 from datetime import date
+from typing import Optional
 
 from app.db.database import get_db
 from app.models.user import User
@@ -17,14 +18,16 @@ from app.schemas.user import (
     TimezoneUpdate
 )
 from app.schemas.common import SuccessResponse
-from app.core.security import get_current_active_user, verify_password, get_password_hash
+from app.core.security import get_current_active_user, verify_password_async, get_password_hash_async
 from app.core.exceptions import ValidationException
 from app.core.logging import get_logger
 from app.services.redis_service import RedisService
+from app.services.user_service import UserService
 from app.services.storage_service import StorageService
+from app.services.avatar_rendition_service import AvatarRenditionService
 from app.services.lunar_service import compute_bazi
+from app.services.push.utils import refresh_push_slots
 from app.core.user_utils import get_western_zodiac
-from app.core.config import settings
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -38,34 +41,33 @@ async def upload_avatar(
 ):
     """上传并更新用户头像"""
     try:
-        # 文件大小验证
-        file_content = await file.read()
-        file_size = len(file_content)
-
-        if file_size > settings.MAX_FILE_SIZE:
-            raise ValidationException(f"文件过大，最大支持 {settings.MAX_FILE_SIZE // (1024*1024)}MB")
-
         # 验证文件类型（宽松检查：Dio 移动端可能上报 application/octet-stream）
-        # 实际图片格式由 StorageService.save_avatar_bytes() 通过 PIL image.verify() 验证
+        # 文件大小与实际图片格式由 StorageService.save_avatar() 在分块读取时检查，
+        # 并在图片处理进程中通过 PIL image.verify() 验证
         if file.content_type and not file.content_type.startswith('image/') \
                 and file.content_type not in ('application/octet-stream', 'binary/octet-stream'):
             raise ValidationException("请上传图片文件（支持JPG、PNG等格式）")
 
-        # 使用存储服务处理头像（直接传入已读取的字节数据，避免重复读取）
+        # 使用存储服务处理头像（分块读取，不把整个上传文件读入内存）
         user_id = current_user.id
         if not user_id:
             raise ValidationException("用户ID获取失败")
 
         try:
-            avatar_data = await StorageService.save_avatar_bytes(file_content)
+            avatar_data = await StorageService.save_avatar(file)
+        except HTTPException:
+            raise
         except ValueError as e:
             raise ValidationException(str(e))
         except Exception as e:
             logger.error(f"头像处理失败: {e}")
             raise ValidationException("头像处理失败，请确保图片格式正确且尺寸合理")
 
-        # 更新数据库
+        # 更新数据库（同时保存多尺寸版本）
         current_user.avatar_data = avatar_data
+        await AvatarRenditionService.save_renditions(
+            db, AvatarRenditionService.user_key(user_id), avatar_data
+        )
 
         try:
             db.commit()
@@ -82,7 +84,7 @@ async def upload_avatar(
         logger.info(f"用户头像上传成功: user_id={current_user.id}, bipupu_id={current_user.bipupu_id}")
         return UserPrivate.model_validate(current_user)
 
-    except ValidationException:
+    except (ValidationException, HTTPException):
         raise
     except Exception as e:
         logger.error(f"头像上传失败: {e}")
@@ -150,6 +152,8 @@ async def update_profile(
 
         db.commit()
         db.refresh(current_user)
+        # 昵称等身份字段可能变化，认证缓存失效
+        await UserService.invalidate_auth_cache(str(current_user.username))
 
         # 更新缓存
         profile_data = UserPrivate.model_validate(current_user).model_dump()
@@ -174,19 +178,22 @@ async def update_password(
     """更新密码"""
     try:
         # 验证原密码
-        if not verify_password(password_data.old_password, str(current_user.hashed_password)):
+        if not await verify_password_async(password_data.old_password, str(current_user.hashed_password)):
             raise ValidationException("原密码错误")
 
         # 更新密码
-        current_user.hashed_password = get_password_hash(password_data.new_password)
+        current_user.hashed_password = await get_password_hash_async(password_data.new_password)
 
         db.commit()
+        await UserService.invalidate_auth_cache(str(current_user.username))
 
         logger.info(f"用户密码更新成功: user_id={current_user.id}")
         return SuccessResponse(message="密码更新成功")
 
     except ValidationException as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         logger.error(f"更新密码失败: {e}")
@@ -203,8 +210,12 @@ async def update_timezone(
     try:
         # 更新时区
         current_user.timezone = timezone_data.timezone
+        db.flush()
+        # 时区变化后重新计算该用户所有订阅的 UTC 推送时间槽
+        refresh_push_slots(db, user_id=current_user.id)
 
         db.commit()
+        await UserService.invalidate_auth_cache(str(current_user.username))
 
         logger.info(f"用户时区更新成功: user_id={current_user.id}, timezone={timezone_data.timezone}")
         return SuccessResponse(message="时区更新成功")
@@ -227,10 +238,10 @@ async def get_push_settings(
 async def get_user_avatar(
     request: Request,
     bipupu_id: str,
+    size: Optional[int] = Query(None, ge=1, description="期望的头像边长（像素）"),
     db: Session = Depends(get_db)
 ):
-    """获取用户头像（公开接口）"""
-    from app.api.routes.users import get_user_avatar_by_bipupu_id
+    """获取用户头像（公开接口，与 /users/users/{bipupu_id}/avatar 相同）"""
+    from app.api.routes.users import _serve_user_avatar
 
-    # 重定向到公共接口
-    return await get_user_avatar_by_bipupu_id(request=request, bipupu_id=bipupu_id, db=db)
+    return await _serve_user_avatar(request, bipupu_id, None, size, db)
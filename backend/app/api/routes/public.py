@@ -20,9 +20,10 @@ from app.schemas.user import (
 )
 from app.schemas.common import StatusResponse, SuccessResponse
 from app.core.security import (
-    verify_password, create_access_token, create_refresh_token,
-    decode_token, get_password_hash, get_current_user
+    verify_password_async, get_password_hash_async, create_access_token,
+    create_refresh_token, decode_token, get_current_principal
 )
+from app.core.principal import Principal
 from app.core.exceptions import ValidationException
 from app.core.logging import get_logger
 from app.core.config import settings
@@ -65,14 +66,17 @@ async def register_user(
         if existing_user:
             raise ValidationException("用户名已存在")
 
-        # 使用 UserService 创建用户
-        user = UserService.create_user(db, user_data)
+        # 使用 UserService 创建用户（密码哈希在线程池中完成）
+        hashed_password = await get_password_hash_async(user_data.password)
+        user = UserService.create_user(db, user_data, hashed_password=hashed_password)
 
         logger.info(f"用户注册成功：username={user.username}, id={user.id}")
         return UserPrivate.model_validate(user)
 
     except ValidationException as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"用户注册失败：{e}")
         raise HTTPException(status_code=500, detail="注册失败")
@@ -114,7 +118,7 @@ async def login_user(
             raise ValidationException("用户名或密码错误")
 
         # 验证密码
-        if not verify_password(login_data.password, str(user.hashed_password)):
+        if not await verify_password_async(login_data.password, str(user.hashed_password)):
             logger.warning(f"登录失败: 密码错误 username={login_data.username}")
             raise ValidationException("用户名或密码错误")
 
@@ -146,6 +150,8 @@ async def login_user(
 
     except ValidationException as e:
         raise HTTPException(status_code=401, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"用户登录失败: {e}")
         raise HTTPException(status_code=500, detail="登录失败")
@@ -237,7 +243,7 @@ async def refresh_token(
 @router.post("/logout", response_model=SuccessResponse)
 async def logout_user(
     credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """用户登出
 
@@ -267,6 +273,9 @@ async def logout_user(
             ttl = max(60, token_exp - current_timestamp)  # 最小 60 秒
             await RedisService.add_token_to_blacklist(token, ttl)
 
+        # 本进程的主体缓存立即失效（其他 worker 由缓存 TTL 兜底）
+        principal_cache.invalidate_token(token)
+
         logger.info("用户登出成功")
         return SuccessResponse(message="登出成功", data=None)
 
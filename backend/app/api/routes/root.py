@@ -1,9 +1,14 @@
 """根目录路由 - 健康检查、文档等"""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
 from datetime import datetime
 from app.core.config import settings
-from app.schemas.common import HealthResponse, ReadyResponse, LiveResponse, ApiInfoResponse
+from app.core.image_processor import image_processor
+from app.core.password_hasher import password_hasher
+from app.core.principal import Principal
+from app.core.security import get_current_principal
+from app.services.blob_cache import blob_cache
+from app.schemas.common import HealthResponse, ReadyResponse, LiveResponse, ApiInfoResponse, MetricsResponse
 
 router = APIRouter()
 
@@ -32,6 +37,18 @@ async def liveness_check():
         "timestamp": datetime.now().isoformat()
     }
 
+@router.get("/metrics", response_model=MetricsResponse)
+async def runtime_metrics(current_user: Principal = Depends(get_current_principal)):
+    """本进程运行指标（管理员）：各线程池/进程池的排队与耗时、图片缓存命中率"""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="管理员权限不足")
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "password_hasher": password_hasher.get_stats(),
+        "blob_cache": blob_cache.get_stats(),
+        "image_processor": image_processor.get_stats(),
+    }
+
 @router.get("/", response_model=ApiInfoResponse)
 async def root():
     """根路径 - 返回API信息"""
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, Request, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, Request, UploadFile, File
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
@@ -20,8 +20,10 @@ from app.schemas.service_account import (
     UserSubscriptionList,
     PushTimeSource
 )
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_current_principal
+from app.core.principal import Principal
 from app.models.user import User
+from app.services.push.utils import refresh_push_slots
 from sqlalchemy import select, update, func
 
 logger = logging.getLogger(__name__)
@@ -76,7 +78,7 @@ async def list_service_accounts(
 @router.get("/{name}", response_model=ServiceAccountResponse, tags=["服务号"])
 async def get_service_account(
     name: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """获取指定服务号详情
@@ -97,74 +99,91 @@ async def get_service_account(
 
 
 @router.get("/{name}/avatar", tags=["服务号"])
-async def get_service_avatar(request: Request, name: str, db: Session = Depends(get_db)):
+async def get_service_avatar(
+    request: Request,
+    name: str,
+    size: Optional[int] = Query(None, ge=1, description="期望的头像边长（像素），返回不小于该尺寸的最小版本"),
+    db: Session = Depends(get_db)
+):
     """获取服务号头像
 
     参数：
     - name: 服务号名称
+    - size: 期望边长，可选 32/64/100 像素版本，默认原尺寸；Accept 含 image/webp 时返回 WebP
 
     特性：
-    - 支持ETag缓存，减少带宽消耗
-    - 支持HTTP 304 Not Modified响应
+    - ETag 为上传时保存的内容哈希，304 响应只查询元数据，不读取图片数据
     - 头像数据缓存24小时
+    - 服务号信息中的 avatar_url 为带内容哈希的版本化地址，可永久缓存
 
     返回：
     - 成功：返回JPEG格式的头像图片
     - 失败：404（服务号或头像不存在）
     """
+    return await _serve_service_avatar(request, name, None, size, db)
+
+
+@router.get("/{name}/avatar/{avatar_hash}", tags=["服务号"])
+async def get_service_avatar_by_hash(
+    request: Request,
+    name: str,
+    avatar_hash: str,
+    size: Optional[int] = Query(None, ge=1, description="期望的头像边长（像素）"),
+    db: Session = Depends(get_db)
+):
+    """获取指定内容版本的服务号头像（Cache-Control: immutable）
+
+    哈希已过期（头像已更新）时重定向到当前版本。
+    """
+    return await _serve_service_avatar(request, name, avatar_hash, size, db)
+
+
+async def _serve_service_avatar(
+    request: Request, name: str, avatar_hash: Optional[str], size: Optional[int], db: Session
+) -> Response:
+    """按内容哈希响应服务号头像，仅在需要返回内容时读取 avatar_data"""
+    from fastapi.responses import RedirectResponse
     from app.services.storage_service import StorageService
-    from app.services.redis_service import RedisService
+    from app.services.avatar_rendition_service import AvatarRenditionService
 
-    service = db.query(ServiceAccount).filter(ServiceAccount.name == name).first()
-    if not service or service.avatar_data is None:
+    service = db.query(
+        ServiceAccount.id, ServiceAccount.avatar_hash, ServiceAccount.has_avatar
+    ).filter(ServiceAccount.name == name).first()
+    if not service or not service.has_avatar:
         # 根据用户反馈：前端有自动处理无头像并使用首字母显示的方案
         # 没有头像没有关系，无需处理默认头像配置
         raise HTTPException(status_code=404, detail="Avatar not found")
 
-    # 生成ETag - 使用时间戳
-    updated_at_timestamp = service.updated_at.timestamp() if service.updated_at is not None else 0
-    etag_input = f"{updated_at_timestamp}".encode()
-    etag = StorageService.get_avatar_etag(service.avatar_data, etag_input)
-
-    # 检查ETag匹配
-    if request and request.headers.get("if-none-match") == etag:
-        return Response(status_code=304)
-
-    # 尝试从缓存获取头像
-    cache_key = StorageService.get_avatar_cache_key(name)
-    cached_avatar = await RedisService.get_cache(cache_key)
-
-    # 如果缓存存在且ETag匹配，使用缓存
-    if cached_avatar:
-        # 验证缓存是否仍然有效（基于版本号）
-        cached_etag = StorageService.get_avatar_etag(cached_avatar, etag_input.encode() if isinstance(etag_input, str) else etag_input)
-        if cached_etag == etag:
-            logger.debug(f"服务号头像缓存命中: {name}")
-            return Response(
-                content=cached_avatar,
-                media_type="image/jpeg",
-                headers={
-                    "Cache-Control": "public, max-age=86400",  # 缓存1天
-                    "ETag": etag
-                }
-            )
+    def load_avatar():
+        return db.query(ServiceAccount.avatar_data).filter(ServiceAccount.id == service.id).scalar()
 
-    # 缓存头像数据（或更新缓存）
-    await RedisService.set_cache(cache_key, service.avatar_data, expire=86400)  # 缓存1天
+    current_hash = service.avatar_hash
+    if not current_hash:
+        # 迁移前上传、尚未回填哈希的头像
+        current_hash = StorageService.get_content_hash(load_avatar())
 
-    return Response(
-        content=service.avatar_data,
-        media_type="image/jpeg",  # 统一使用JPEG格式，与用户头像保持一致
-        headers={
-            "Cache-Control": "public, max-age=86400",  # 缓存1天
-            "ETag": etag
-        }
+    if avatar_hash is not None and avatar_hash != current_hash:
+        query = f"?size={size}" if size else ""
+        return RedirectResponse(
+            url=f"/api/service_accounts/{name}/avatar/{current_hash}{query}",
+            status_code=302
+        )
+
+    return await AvatarRenditionService.serve_avatar(
+        request,
+        db,
+        AvatarRenditionService.service_key(service.id),
+        StorageService.get_avatar_cache_key(name, current_hash),
+        current_hash,
+        load_avatar,
+        size=size,
+        immutable=avatar_hash is not None
     )
 
 
 @router.get("/subscriptions/", response_model=UserSubscriptionList)
 async def get_user_subscriptions(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal), db: Session = Depends(get_db)
 ) -> UserSubscriptionList:
     """获取当前用户订阅的所有服务号列表
 
@@ -237,7 +256,7 @@ async def get_user_subscriptions(
 @router.get("/{name}/settings", response_model=SubscriptionSettingsResponse)
 async def get_subscription_settings(
     name: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """获取指定服务号的订阅设置
@@ -303,7 +322,7 @@ async def get_subscription_settings(
 async def update_subscription_settings(
     name: str,
     settings_update: SubscriptionSettingsUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """更新服务号订阅设置
@@ -371,6 +390,7 @@ async def update_subscription_settings(
         )
 
         result = db.execute(stmt)
+        refresh_push_slots(db, user_id=current_user.id, service_account_id=service.id)
         db.commit()
 
         if result is None:
@@ -422,7 +442,7 @@ async def update_subscription_settings(
 async def subscribe_service_account(
     name: str,
     settings_update: Optional[SubscriptionSettingsUpdate] = None,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """订阅服务号
@@ -452,10 +472,10 @@ async def subscribe_service_account(
 
     # 使用数据库查询进行预检查，避免竞态条件
     existing_subscription = (
-        db.query(current_user.__class__)
+        db.query(User.id)
         .filter(
-            current_user.__class__.id == current_user.id,
-            current_user.__class__.subscriptions.any(ServiceAccount.id == service.id),
+            User.id == current_user.id,
+            User.subscriptions.any(ServiceAccount.id == service.id),
         )
         .first()
     )
@@ -497,6 +517,7 @@ async def subscribe_service_account(
         # 插入订阅记录
         stmt = subscription_table.insert().values(**subscription_data)
         db.execute(stmt)
+        refresh_push_slots(db, user_id=current_user.id, service_account_id=service.id)
         db.commit()
 
         logger.info(f"用户 {current_user.bipupu_id} 订阅了服务号 {name}")
@@ -564,7 +585,7 @@ async def unsubscribe_service_account(
 # 管理员接口（需要 is_superuser=True）
 # ============================================================
 
-def _require_admin(current_user: User):
+def _require_admin(current_user: Principal):
     """检查管理员权限"""
     if not (current_user.is_superuser if current_user.is_superuser is not None else False):
         raise HTTPException(status_code=403, detail="管理员权限不足")
@@ -573,7 +594,7 @@ def _require_admin(current_user: User):
 @router.post("/", response_model=ServiceAccountResponse, tags=["服务号管理"])
 async def create_service_account(
     data: ServiceAccountCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """创建服务号（管理员）
@@ -625,7 +646,7 @@ async def create_service_account(
 async def update_service_account(
     name: str,
     data: ServiceAccountUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """更新服务号信息（管理员）
@@ -660,6 +681,8 @@ async def update_service_account(
                 raise HTTPException(status_code=400, detail="default_push_time 格式无效，请使用 HH:MM")
 
     try:
+        if 'default_push_time' in data.model_fields_set:
+            refresh_push_slots(db, service_account_id=service.id)
         db.commit()
         db.refresh(service)
         logger.info(f"管理员 {current_user.bipupu_id} 更新了服务号 {name}")
@@ -674,7 +697,7 @@ async def update_service_account(
 async def delete_service_account(
     name: str,
     hard_delete: bool = False,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """停用或删除服务号（管理员）
@@ -691,6 +714,8 @@ async def delete_service_account(
 
     try:
         if hard_delete:
+            from app.services.avatar_rendition_service import AvatarRenditionService
+            AvatarRenditionService.delete_renditions(db, AvatarRenditionService.service_key(service.id))
             db.delete(service)
             db.commit()
             logger.info(f"管理员 {current_user.bipupu_id} 硬删除了服务号 {name}")
@@ -710,13 +735,13 @@ async def delete_service_account(
 async def upload_service_account_avatar(
     name: str,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """上传服务号头像（管理员）
 
     接受 JPEG/PNG 图片，自动压缩为 100×100 JPEG，存储于数据库。
-    同时清除 Redis 头像缓存。
+    头像缓存按内容哈希寻址，新头像使用新的缓存键，无需清除旧缓存。
     """
     _require_admin(current_user)
 
@@ -726,18 +751,20 @@ async def upload_service_account_avatar(
 
     try:
         from app.services.storage_service import StorageService
-        from app.services.redis_service import RedisService
+
+        from app.services.avatar_rendition_service import AvatarRenditionService
 
         avatar_data = await StorageService.save_avatar(file)
         service.avatar_data = avatar_data
+        await AvatarRenditionService.save_renditions(
+            db, AvatarRenditionService.service_key(service.id), avatar_data
+        )
         db.commit()
 
-        # 清除头像缓存
-        cache_key = StorageService.get_avatar_cache_key(name)
-        await RedisService.delete_cache(cache_key)
-
         logger.info(f"管理员 {current_user.bipupu_id} 上传了服务号 {name} 的头像")
         return {"message": "头像上传成功", "service_name": name}
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -751,7 +778,7 @@ async def list_service_account_subscribers(
     name: str,
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """获取服务号订阅者列表（管理员）
@@ -813,7 +840,7 @@ async def get_service_push_logs(
     status: Optional[str] = None,
     limit: int = 50,
     skip: int = 0,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """查询服务号推送日志（管理员）
@@ -861,7 +888,7 @@ async def get_service_push_logs(
 async def admin_broadcast_push(
     name: str,
     content: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """向服务号所有订阅者手动广播推送（管理员）
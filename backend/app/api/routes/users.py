@@ -1,13 +1,14 @@
 """用户公开信息路由"""
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, RedirectResponse
 from sqlalchemy.orm import Session
+from typing import Optional
 from app.db.database import get_db
 from app.models.user import User
 from app.schemas.user import UserPublic
 from app.core.logging import get_logger
 from app.services.storage_service import StorageService
-from app.services.redis_service import RedisService
+from app.services.avatar_rendition_service import AvatarRenditionService
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -53,72 +54,85 @@ async def get_user_by_bipupu_id(
 async def get_user_avatar_by_bipupu_id(
     request: Request,
     bipupu_id: str,
+    size: Optional[int] = Query(None, ge=1, description="期望的头像边长（像素），返回不小于该尺寸的最小版本"),
     db: Session = Depends(get_db)
 ):
     """通过 bipupu_id 获取用户头像
 
     参数：
     - bipupu_id: 用户的业务标识符
-
-    特性：
-    - 支持ETag缓存，减少带宽消耗
-    - 支持HTTP 304 Not Modified响应
-    - 头像数据缓存24小时
-    - 自动处理头像版本更新
+    - size: 期望边长，可选 32/64/100 像素版本，默认原尺寸
 
     返回：
-    - 成功：返回JPEG格式的头像图片
+    - 成功：返回JPEG格式的头像图片（Accept 含 image/webp 时返回 WebP）
     - 失败：404（用户或头像不存在）
 
     注意：
     - 无需认证，公开接口
-    - 支持缓存控制头（Cache-Control, ETag）
+    - ETag 为上传时保存的内容哈希，304 响应只查询元数据，不读取图片数据
+    - 用户信息中的 avatar_url 为带内容哈希的版本化地址，建议优先使用
     - 如果用户没有头像，返回404错误
     - 前端应处理无头像情况（如显示首字母）
     """
-    user = db.query(User).filter(
+    return await _serve_user_avatar(request, bipupu_id, None, size, db)
+
+
+@router.get("/users/{bipupu_id}/avatar/{avatar_hash}")
+async def get_user_avatar_by_hash(
+    request: Request,
+    bipupu_id: str,
+    avatar_hash: str,
+    size: Optional[int] = Query(None, ge=1, description="期望的头像边长（像素）"),
+    db: Session = Depends(get_db)
+):
+    """获取指定内容版本的用户头像
+
+    URL 中包含内容哈希，内容永不变化，响应带 Cache-Control: immutable，
+    客户端无需重新验证。哈希已过期（头像已更新）时重定向到当前版本。
+    size 与 Accept 头的含义同 /users/{bipupu_id}/avatar。
+    """
+    return await _serve_user_avatar(request, bipupu_id, avatar_hash, size, db)
+
+
+async def _serve_user_avatar(
+    request: Request,
+    bipupu_id: str,
+    avatar_hash: Optional[str],
+    size: Optional[int],
+    db: Session
+) -> Response:
+    """按内容哈希响应用户头像，仅在需要返回内容时读取 avatar_data"""
+    user = db.query(User.id, User.avatar_hash, User.has_avatar).filter(
         User.bipupu_id == bipupu_id,
         User.is_active == True
     ).first()
 
-    if not user or not user.avatar_data:
+    if not user or not user.has_avatar:
         raise HTTPException(status_code=404, detail="头像不存在")
 
-    # 生成ETag - 使用时间戳
-    updated_at_timestamp = user.updated_at.timestamp() if user.updated_at else 0
-    etag_input = f"{updated_at_timestamp}".encode()
-    etag = StorageService.get_avatar_etag(user.avatar_data, etag_input)
-
-    # 检查ETag匹配
-    if request.headers.get("if-none-match") == etag:
-        return Response(status_code=304)
-
-    # 尝试从缓存获取头像
-    cache_key = StorageService.get_avatar_cache_key(bipupu_id)
-    cached_avatar = await RedisService.get_cache(cache_key)
-
-    # 如果缓存存在且ETag匹配，使用缓存
-    if cached_avatar:
-        cached_etag = StorageService.get_avatar_etag(cached_avatar, etag_input)
-        if cached_etag == etag:
-            logger.debug(f"头像缓存命中: {bipupu_id}")
-            return Response(
-                content=cached_avatar,
-                media_type="image/jpeg",
-                headers={
-                    "Cache-Control": "public, max-age=86400",  # 缓存1天
-                    "ETag": etag
-                }
-            )
-
-    # 缓存头像数据（或更新缓存）
-    await RedisService.set_cache(cache_key, user.avatar_data, expire=86400)
-
-    return Response(
-        content=user.avatar_data,
-        media_type="image/jpeg",
-        headers={
-            "Cache-Control": "public, max-age=86400",  # 缓存1天
-            "ETag": etag
-        }
+    def load_avatar():
+        return db.query(User.avatar_data).filter(User.id == user.id).scalar()
+
+    current_hash = user.avatar_hash
+    if not current_hash:
+        # 迁移前上传、尚未回填哈希的头像
+        current_hash = StorageService.get_content_hash(load_avatar())
+
+    if avatar_hash is not None and avatar_hash != current_hash:
+        query = f"?size={size}" if size else ""
+        url = request.app.url_path_for("get_user_avatar_by_hash", bipupu_id=bipupu_id, avatar_hash=current_hash)
+        return RedirectResponse(
+            url=f"{url}{query}",
+            status_code=302
+        )
+
+    return await AvatarRenditionService.serve_avatar(
+        request,
+        db,
+        AvatarRenditionService.user_key(user.id),
+        StorageService.get_avatar_cache_key(bipupu_id, current_hash),
+        current_hash,
+        load_avatar,
+        size=size,
+        immutable=avatar_hash is not None
     )
@@ -1,9 +1,10 @@
 """WebSocket 路由"""
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, status
+from sqlalchemy import select
 from app.core.websocket import manager
 from app.core.logging import get_logger
 from app.core.security import decode_token
-from app.db.database import SessionLocal
+from app.db.database import get_async_db_context
 from app.models.user import User
 import json
 import asyncio
@@ -43,21 +44,21 @@ async def websocket_endpoint(
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
 
-        # 获取用户信息 - 创建独立的数据库会话
-        db = SessionLocal()
-        try:
-            user = db.query(User).filter(
-                User.username == username,
-                User.is_active == True,
-            ).first()
-            if not user:
-                logger.warning(f"WebSocket 认证失败: 用户不存在或已禁用 username={username}")
-                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-                return
-
-            bipupu_id = str(user.bipupu_id)
-        finally:
-            db.close()
+        # 获取用户信息 - 创建独立的异步数据库会话（查询完成即归还连接）
+        async with get_async_db_context() as db:
+            bipupu_id = (await db.execute(
+                select(User.bipupu_id).where(
+                    User.username == username,
+                    User.is_active == True,
+                )
+            )).scalars().first()
+
+        if not bipupu_id:
+            logger.warning(f"WebSocket 认证失败: 用户不存在或已禁用 username={username}")
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+        bipupu_id = str(bipupu_id)
 
     except Exception as e:
         logger.error(f"WebSocket 认证失败: {e}")
@@ -16,6 +16,7 @@ celery_app = Celery(
     backend=settings.CELERY_RESULT_BACKEND,
     include=[
         "app.tasks.subscriptions",    # 推送调度任务（定时推送 + 日志清理）
+        "app.tasks.maintenance",      # 数据库维护（月分区预建与保留期清理）
     ]
 )
 
@@ -31,15 +32,50 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60,  # 25分钟
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    # 按优先级分队列（app.core.priority），批量推送不阻塞其他任务；
+    # worker 通过 -Q 选择消费的队列（见 docker-entrypoint.sh 中的 CELERY_QUEUES）
+    task_default_queue="default",
+    task_routes={
+        "subscriptions.push_service": {"queue": "push.bulk"},
+        "subscriptions.push_run_complete": {"queue": "push.bulk"},
+        "subscriptions.stage_pushes": {"queue": "push.bulk"},
+        "subscriptions.release_staged_pushes": {"queue": "push.bulk"},
+        "subscriptions.retry_failed_pushes": {"queue": "push.bulk"},
+    },
     beat_schedule={
         # 每15分钟检查定时推送时间窗口，向应接收推送的用户发送消息
         "subscriptions-check-push-times": {
             "task": "subscriptions.check_push_times",
             "schedule": crontab(minute="*/15"),
         },
-        # 每天凌晨3点清理30天前的旧推送日志
-        "subscriptions-cleanup-push-logs": {
-            "task": "subscriptions.cleanup_push_logs",
+        # 每小时刷新夏令时切换时区的订阅推送时间槽
+        "subscriptions-refresh-push-slots": {
+            "task": "subscriptions.refresh_push_slots",
+            "schedule": crontab(minute=5),
+        },
+        # 低峰期预生成未来24小时的定时推送
+        "subscriptions-stage-pushes": {
+            "task": "subscriptions.stage_pushes",
+            "schedule": crontab(hour=settings.PUSH_STAGE_HOUR, minute=0),
+        },
+        # 每分钟按令牌桶速率发布到期的预生成推送
+        "subscriptions-release-staged-pushes": {
+            "task": "subscriptions.release_staged_pushes",
+            "schedule": crontab(),
+        },
+        # 每分钟把 Redis Stream 中的推送日志批量落库（API 进程不在线时兜底）
+        "subscriptions-flush-push-logs": {
+            "task": "subscriptions.flush_push_logs",
+            "schedule": crontab(),
+        },
+        # 每分钟按退避时间重发到期的失败推送（push_logs.next_retry_at）
+        "subscriptions-retry-failed-pushes": {
+            "task": "subscriptions.retry_failed_pushes",
+            "schedule": crontab(),
+        },
+        # 每天凌晨3点预建未来月分区、删除过期分区（messages / push_logs，取代逐行清理推送日志）
+        "maintenance-partitions": {
+            "task": "maintenance.partitions",
             "schedule": crontab(hour=3, minute=0),
         },
     }
@@ -43,15 +43,69 @@ class Settings(BaseSettings):
     DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
     DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "10"))
     DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # API 进程中划给异步引擎（asyncpg）的部分；DB_POOL_SIZE / DB_MAX_OVERFLOW 为两个引擎合计的连接预算
+    DB_ASYNC_POOL_SIZE: int = int(os.getenv("DB_ASYNC_POOL_SIZE", "3"))
+    DB_ASYNC_MAX_OVERFLOW: int = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "5"))
 
     # Redis 配置（1C1G 优化）
     REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "10"))
     REDIS_SOCKET_TIMEOUT: int = int(os.getenv("REDIS_SOCKET_TIMEOUT", "3"))
+    REDIS_BINARY_MAX_CONNECTIONS: int = int(os.getenv("REDIS_BINARY_MAX_CONNECTIONS", "5"))
+
+    # 图片二进制缓存（进程内 L1 按字节计量；超过单项上限的图片不缓存）
+    BLOB_CACHE_L1_MAX_BYTES: int = int(os.getenv("BLOB_CACHE_L1_MAX_BYTES", str(16 * 1024 * 1024)))
+    BLOB_CACHE_MAX_ITEM_BYTES: int = int(os.getenv("BLOB_CACHE_MAX_ITEM_BYTES", str(2 * 1024 * 1024)))
+    BLOB_CACHE_TTL: int = int(os.getenv("BLOB_CACHE_TTL", "86400"))
 
     # 缓存配置
     CACHE_DEFAULT_TTL: int = int(os.getenv("CACHE_DEFAULT_TTL", "300"))
     CACHE_MESSAGE_TTL: int = int(os.getenv("CACHE_MESSAGE_TTL", "120"))
 
+    # 密码哈希线程池（argon2 卸载出事件循环）
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "5"))
+
+    # 批量推送：每个事务写入的消息数（多行 INSERT ... RETURNING）
+    PUSH_BATCH_SIZE: int = int(os.getenv("PUSH_BATCH_SIZE", "500"))
+    # 定时推送扇出：每个 Celery 子任务负责的接收者数
+    PUSH_TASK_CHUNK_SIZE: int = int(os.getenv("PUSH_TASK_CHUNK_SIZE", "1000"))
+
+    # 定时推送预生成与限速发布（削平 09:00 等集中时间槽的写入峰值）
+    PUSH_STAGING_ENABLED: bool = os.getenv("PUSH_STAGING_ENABLED", "true").lower() == "true"
+    PUSH_STAGE_HOUR: int = int(os.getenv("PUSH_STAGE_HOUR", "2"))  # Celery 时区（TIMEZONE）的小时，预生成未来 24 小时
+    PUSH_RELEASE_RATE: float = float(os.getenv("PUSH_RELEASE_RATE", "20"))  # 每秒发布条数
+    PUSH_RELEASE_BURST: int = int(os.getenv("PUSH_RELEASE_BURST", "100"))  # 令牌桶容量
+    PUSH_RELEASE_JITTER_SECONDS: int = int(os.getenv("PUSH_RELEASE_JITTER_SECONDS", "300"))
+
+    # 推送日志写后落库（Redis Stream push:logs → push_logs 批量 INSERT）
+    PUSH_LOG_STREAM_MAXLEN: int = int(os.getenv("PUSH_LOG_STREAM_MAXLEN", "20000"))  # Redis 仅 64MB，约 8MB
+    PUSH_LOG_FLUSH_INTERVAL: float = float(os.getenv("PUSH_LOG_FLUSH_INTERVAL", "5"))  # API 进程落库间隔（秒）
+    PUSH_LOG_FLUSH_BATCH: int = int(os.getenv("PUSH_LOG_FLUSH_BATCH", "1000"))
+
+    # 失败推送退避重试（push_logs.next_retry_at，见 push.retry）：BASE * 2^n 秒，上限 MAX_DELAY，带抖动
+    PUSH_RETRY_MAX_ATTEMPTS: int = int(os.getenv("PUSH_RETRY_MAX_ATTEMPTS", "3"))
+    PUSH_RETRY_BASE_SECONDS: int = int(os.getenv("PUSH_RETRY_BASE_SECONDS", "60"))
+    PUSH_RETRY_MAX_DELAY_SECONDS: int = int(os.getenv("PUSH_RETRY_MAX_DELAY_SECONDS", "3600"))
+    PUSH_RETRY_BATCH_SIZE: int = int(os.getenv("PUSH_RETRY_BATCH_SIZE", "500"))  # 每次领取的记录数
+
+    # messages / push_logs 按月分区（app.db.partitions）：预建月数与保留期（0 = 永久保留）
+    PARTITION_PREMAKE_MONTHS: int = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+    PARTITION_DETACH_ONLY: bool = os.getenv("PARTITION_DETACH_ONLY", "false").lower() == "true"  # 仅分离不删除，便于归档
+    PUSH_LOG_RETENTION_DAYS: int = int(os.getenv("PUSH_LOG_RETENTION_DAYS", "30"))
+    MESSAGE_RETENTION_DAYS: int = int(os.getenv("MESSAGE_RETENTION_DAYS", "0"))
+
+    # 图片处理进程池（PIL 解码/缩放/编码卸载出事件循环）
+    IMAGE_PROCESS_WORKERS: int = int(os.getenv("IMAGE_PROCESS_WORKERS", "1"))
+    IMAGE_PROCESS_MAX_QUEUE: int = int(os.getenv("IMAGE_PROCESS_MAX_QUEUE", "8"))
+    IMAGE_PROCESS_QUEUE_TIMEOUT: float = float(os.getenv("IMAGE_PROCESS_QUEUE_TIMEOUT", "10"))
+    IMAGE_PROCESS_TIMEOUT: int = int(os.getenv("IMAGE_PROCESS_TIMEOUT", "20"))
+    IMAGE_PROCESS_MAX_MEMORY_MB: int = int(os.getenv("IMAGE_PROCESS_MAX_MEMORY_MB", "1024"))
+
+    # bipupu_id 分配（位数可调大，已有的短 ID 保持有效；列宽上限 8 位）
+    BIPUPU_ID_WIDTH: int = int(os.getenv("BIPUPU_ID_WIDTH", "4"))
+    BIPUPU_ID_BATCH_SIZE: int = int(os.getenv("BIPUPU_ID_BATCH_SIZE", "5"))
+
     # 长轮询配置
     POLL_DEFAULT_TIMEOUT: int = int(os.getenv("POLL_DEFAULT_TIMEOUT", "30"))
     POLL_CHECK_INTERVAL: int = int(os.getenv("POLL_CHECK_INTERVAL", "1"))
@@ -62,6 +116,8 @@ class Settings(BaseSettings):
 
     # 文件上传配置
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    # 上传文件超过该大小后落盘到临时文件，单次上传的内存占用不超过此值
+    UPLOAD_SPOOL_THRESHOLD: int = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", str(1024 * 1024)))
     UPLOAD_DIR: str = "uploads"
 
     # 时区配置
@@ -83,6 +139,15 @@ class Settings(BaseSettings):
         password = quote_plus(self.POSTGRES_PASSWORD)
         return f"postgresql://{self.POSTGRES_USER}:{password}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        """异步数据库URL（asyncpg 驱动），由 DATABASE_URL 推导"""
+        url = self.DATABASE_URL
+        for prefix in ("postgresql+psycopg2://", "postgresql+psycopg://", "postgresql://", "postgres://"):
+            if url.startswith(prefix):
+                return "postgresql+asyncpg://" + url[len(prefix):]
+        return url
+
     # Redis配置
     REDIS_PASSWORD: Optional[str] = None
     REDIS_HOST: str = "redis"
@@ -0,0 +1,206 @@
+"""跨进程 WebSocket 投递总线
+
+ConnectionManager 只持有本进程的 WebSocket 连接。多 uvicorn worker 或 Celery
+worker 中发出的消息需要经过投递总线，由持有接收者连接的进程完成推送。
+
+- RedisDeliveryBus：基于 Redis pub/sub，频道沿用 user:{bipupu_id}:messages，
+  每个 API 进程通过 PSUBSCRIBE user:*:messages 订阅全部频道
+- InMemoryDeliveryBus：进程内实现，Redis 不可用时降级使用，也用于测试
+
+消息信封格式：{"origin": 发布进程标识, "target": bipupu_id, "payload": WebSocket 消息,
+"priority": 投递优先级（app.core.priority，可选，缺省为 NORMAL）}
+接收进程按 priority 将消息放入本地发送队列。
+发布方已在本进程完成本地投递，订阅方收到自己发布的信封时直接跳过。
+"""
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.logging import get_logger
+from app.core.priority import Priority, normalize_priority
+
+logger = get_logger(__name__)
+
+DELIVERY_CHANNEL_PATTERN = "user:*:messages"
+
+# (bipupu_id, payload, priority) -> 本地投递
+DeliveryHandler = Callable[[str, dict, Priority], Awaitable[Any]]
+
+
+def delivery_channel(bipupu_id: str) -> str:
+    """接收者对应的投递频道（与 RedisService.publish_message 保持一致）"""
+    return f"user:{bipupu_id}:messages"
+
+
+def encode_envelope(origin: str, bipupu_id: str, payload: dict,
+                    priority: Priority = Priority.NORMAL) -> str:
+    envelope = {"origin": origin, "target": bipupu_id, "payload": payload}
+    if priority != Priority.NORMAL:
+        # 缺省为 NORMAL，旧版本进程发布的信封同样按 NORMAL 处理
+        envelope["priority"] = int(priority)
+    return json.dumps(
+        envelope,
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def decode_envelope(raw: Any) -> Optional[Dict[str, Any]]:
+    """解析信封，格式不符时返回 None"""
+    try:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        envelope = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(envelope, dict) or "target" not in envelope or "payload" not in envelope:
+        return None
+    return envelope
+
+
+class InMemoryDeliveryBus:
+    """进程内投递总线
+
+    多个订阅者（模拟多个 worker）共享同一个实例时，发布的消息会投递给
+    除发布者以外的所有订阅者，行为与 RedisDeliveryBus 一致。
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, DeliveryHandler] = {}
+
+    async def publish(self, origin: str, bipupu_id: str, payload: dict,
+                      priority: Priority = Priority.NORMAL) -> int:
+        """发布消息，返回收到消息的订阅者数量"""
+        delivered = 0
+        for subscriber, handler in list(self._handlers.items()):
+            if subscriber == origin:
+                continue
+            try:
+                await handler(bipupu_id, payload, priority)
+                delivered += 1
+            except Exception as e:
+                logger.warning(f"内存投递总线处理失败: {e}")
+        return delivered
+
+    async def subscribe(self, origin: str, handler: DeliveryHandler) -> None:
+        self._handlers[origin] = handler
+
+    async def unsubscribe(self, origin: str) -> None:
+        self._handlers.pop(origin, None)
+
+
+class RedisDeliveryBus:
+    """基于 Redis pub/sub 的投递总线
+
+    每个进程只需一个订阅连接（PSUBSCRIBE），断线后指数退避重连。
+    """
+
+    # 读取超时（秒），用于周期性检查停止标志
+    POLL_TIMEOUT = 1.0
+    MAX_BACKOFF = 30
+
+    def __init__(self):
+        self._origin: Optional[str] = None
+        self._handler: Optional[DeliveryHandler] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    async def publish(self, origin: str, bipupu_id: str, payload: dict,
+                      priority: Priority = Priority.NORMAL) -> int:
+        """发布消息，返回收到消息的订阅进程数量"""
+        from app.db.redis import get_redis
+
+        redis = await get_redis()
+        receivers = await redis.publish(
+            delivery_channel(bipupu_id), encode_envelope(origin, bipupu_id, payload, priority)
+        )
+        return int(receivers or 0)
+
+    async def subscribe(self, origin: str, handler: DeliveryHandler) -> None:
+        if self._task is not None:
+            return
+        self._origin = origin
+        self._handler = handler
+        self._running = True
+        self._task = asyncio.create_task(self._listen())
+        logger.info(f"✅ 投递总线已订阅: {DELIVERY_CHANNEL_PATTERN}")
+
+    async def unsubscribe(self, origin: str) -> None:
+        self._running = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _listen(self) -> None:
+        from app.db.redis import get_redis
+
+        backoff = 1
+        while self._running:
+            pubsub = None
+            try:
+                redis = await get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.psubscribe(DELIVERY_CHANNEL_PATTERN)
+                backoff = 1
+
+                while self._running:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=self.POLL_TIMEOUT
+                    )
+                    if message is None or message.get("type") != "pmessage":
+                        continue
+                    await self._dispatch(message.get("data"))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ 投递总线订阅中断，{backoff}s 后重连：{e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    async def _dispatch(self, raw: Any) -> None:
+        envelope = decode_envelope(raw)
+        if envelope is None:
+            logger.debug(f"忽略无法解析的投递消息: {raw!r}")
+            return
+        # 发布进程已完成本地投递
+        if envelope.get("origin") == self._origin or self._handler is None:
+            return
+        try:
+            await self._handler(
+                str(envelope["target"]),
+                envelope["payload"],
+                normalize_priority(envelope.get("priority")),
+            )
+        except Exception as e:
+            logger.warning(f"投递总线处理失败: {e}")
+
+
+_bus: Optional[Any] = None
+
+
+async def get_delivery_bus():
+    """获取进程级投递总线：Redis 可用时使用 Redis pub/sub，否则降级为进程内实现"""
+    global _bus
+    if _bus is None:
+        from app.db.redis import get_redis, MemoryCacheWrapper
+
+        redis = await get_redis()
+        _bus = InMemoryDeliveryBus() if isinstance(redis, MemoryCacheWrapper) else RedisDeliveryBus()
+    return _bus
+
+
+def set_delivery_bus(bus: Optional[Any]) -> None:
+    """替换进程级投递总线（测试用）"""
+    global _bus
+    _bus = bus
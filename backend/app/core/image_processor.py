@@ -0,0 +1,231 @@
+"""图片处理进程池
+
+PIL 的 verify/解码/LANCZOS 缩放/JPEG optimize 编码都是 CPU 密集且持有 GIL，
+在 async 路由里直接执行会阻塞事件循环（大海报可达数秒），同一 worker 上的
+WebSocket 投递和长轮询都会被拖住。这里把图片处理放到有界进程池执行：
+
+- 并发上限：IMAGE_PROCESS_WORKERS 个进程同时处理
+- 排队上限：超过 workers + IMAGE_PROCESS_MAX_QUEUE 个任务在途时直接拒绝（ImageProcessorBusy）
+- 单任务时限：子进程内 SIGALRM 计时（IMAGE_PROCESS_TIMEOUT 秒），超时抛出 ImageProcessTimeout（ValueError）；
+  计时信号抛出的是 BaseException 子类，任务内的 except OSError / except Exception 不会吞掉它；
+  父进程另有兜底超时，超时后重建进程池
+- 内存上限：子进程启动时设置 RLIMIT_AS（IMAGE_PROCESS_MAX_MEMORY_MB），超限抛出 MemoryError
+- 指标：次数、平均/最大耗时、各阶段耗时、拒绝/超时/失败次数（get_stats）
+
+任务函数须为可 pickle 的模块级函数或类的静态方法，返回 (结果, 阶段耗时字典)。
+"""
+import asyncio
+import multiprocessing
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ImageProcessorBusy(Exception):
+    """图片处理进程池饱和"""
+
+
+class ImageProcessTimeout(ValueError):
+    """单个图片处理任务超时"""
+
+
+class _JobTimeout(BaseException):
+    """子进程内 SIGALRM 计时到期（不继承 Exception，任务内的异常处理无法捕获）"""
+
+
+def _init_worker(max_memory_mb: int) -> None:
+    """子进程初始化：设置地址空间上限"""
+    if max_memory_mb <= 0:
+        return
+    try:
+        import resource
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        # 非 Unix 平台或权限不足时不限制
+        pass
+
+
+def _on_job_timeout(signum, frame):
+    raise _JobTimeout()
+
+
+def _run_job(func: Callable[..., Any], timeout: int, args: Tuple[Any, ...]) -> Any:
+    """子进程内执行任务，SIGALRM 计时"""
+    use_alarm = timeout > 0 and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_job_timeout)
+        signal.alarm(timeout)
+    try:
+        return func(*args)
+    except _JobTimeout:
+        raise ImageProcessTimeout(f"图片处理超时（超过 {timeout} 秒），请尝试使用较小的图片")
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+
+class ImageProcessor:
+    """有界的图片处理进程池"""
+
+    # 超过该耗时（秒）记录警告
+    SLOW_THRESHOLD = 1.0
+
+    def __init__(self, workers: int, max_queue: int, queue_timeout: float,
+                 job_timeout: int, max_memory_mb: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.job_timeout = job_timeout
+        self.max_memory_mb = max_memory_mb
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        self._in_flight = 0
+        self._stats: Dict[str, Any] = {
+            "count": 0, "total_time": 0.0, "max_time": 0.0,
+            "rejected": 0, "timeouts": 0, "failed": 0,
+            "stages": {},
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn：子进程不继承父进程的事件循环、连接池和线程
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.max_memory_mb,),
+            )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # 信号量绑定事件循环；测试或 Celery 每次 asyncio.run 都会换新循环
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.workers)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def run(self, func: Callable[..., Tuple[Any, Dict[str, float]]], *args: Any) -> Any:
+        """在进程池中执行图片处理任务，饱和时抛出 ImageProcessorBusy
+
+        Returns:
+            任务结果（阶段耗时计入指标，不返回给调用方）
+        """
+        if self._in_flight >= self.workers + self.max_queue:
+            self._stats["rejected"] += 1
+            logger.warning(f"图片处理队列已满（在途 {self._in_flight}），拒绝请求")
+            raise ImageProcessorBusy()
+
+        self._in_flight += 1
+        try:
+            semaphore = self._get_semaphore()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._stats["rejected"] += 1
+                logger.warning(f"图片处理排队超时（{self.queue_timeout}s），拒绝请求")
+                raise ImageProcessorBusy()
+
+            try:
+                return await self._submit(func, args)
+            finally:
+                semaphore.release()
+        finally:
+            self._in_flight -= 1
+
+    async def _submit(self, func: Callable[..., Any], args: Tuple[Any, ...]) -> Any:
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), _run_job, func, self.job_timeout, args
+        )
+        try:
+            # 子进程内已有计时，这里的兜底超时只在子进程卡死（如信号无法送达）时触发
+            result, stages = await asyncio.wait_for(future, timeout=self.job_timeout + 5)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            logger.error("图片处理子进程无响应，重建进程池")
+            self._reset_executor()
+            raise ImageProcessTimeout("图片处理超时，请尝试使用较小的图片")
+        except BrokenProcessPool:
+            self._stats["failed"] += 1
+            logger.error("图片处理子进程异常退出（可能超出内存上限），重建进程池")
+            self._reset_executor()
+            raise ValueError("图片处理失败：内存不足，请尝试使用较小的图片")
+        except ImageProcessTimeout:
+            self._stats["timeouts"] += 1
+            raise
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+
+        self._record(time.perf_counter() - started, stages)
+        return result
+
+    def _record(self, elapsed: float, stages: Dict[str, float]) -> None:
+        self._stats["count"] += 1
+        self._stats["total_time"] += elapsed
+        self._stats["max_time"] = max(self._stats["max_time"], elapsed)
+        for stage, seconds in stages.items():
+            self._stats["stages"][stage] = self._stats["stages"].get(stage, 0.0) + seconds
+        logger.debug(
+            f"图片处理完成: {elapsed * 1000:.0f}ms ("
+            + ", ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in stages.items())
+            + ")"
+        )
+        if elapsed > self.SLOW_THRESHOLD:
+            logger.warning(f"图片处理耗时过长: {elapsed * 1000:.0f}ms")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取处理指标（阶段耗时为平均值）"""
+        count = self._stats["count"]
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "count": count,
+            "rejected": self._stats["rejected"],
+            "timeouts": self._stats["timeouts"],
+            "failed": self._stats["failed"],
+            "avg_ms": round(self._stats["total_time"] / count * 1000, 2) if count else 0.0,
+            "max_ms": round(self._stats["max_time"] * 1000, 2),
+            "stage_avg_ms": {
+                stage: round(total / count * 1000, 2)
+                for stage, total in self._stats["stages"].items()
+            } if count else {},
+        }
+
+    def _reset_executor(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        # 终止仍在运行的子进程（ProcessPoolExecutor 没有公开的终止接口）
+        for process in list(getattr(executor, "_processes", {}).values()):
+            try:
+                process.terminate()
+            except Exception:
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局单例
+image_processor = ImageProcessor(
+    workers=settings.IMAGE_PROCESS_WORKERS,
+    max_queue=settings.IMAGE_PROCESS_MAX_QUEUE,
+    queue_timeout=settings.IMAGE_PROCESS_QUEUE_TIMEOUT,
+    job_timeout=settings.IMAGE_PROCESS_TIMEOUT,
+    max_memory_mb=settings.IMAGE_PROCESS_MAX_MEMORY_MB,
+)
@@ -0,0 +1,119 @@
+"""Argon2 密码哈希卸载
+
+argon2 单次哈希/校验耗时数十毫秒，直接在 async 路由里执行会阻塞事件循环，
+登录高峰时 WebSocket 心跳和长轮询都会被拖住。这里把哈希放到有界线程池执行
+（argon2-cffi 计算期间释放 GIL，线程池即可并行，且比进程池省内存）：
+
+- 并发上限：PASSWORD_HASH_WORKERS 个线程同时计算
+- 排队上限：超过 workers + PASSWORD_HASH_MAX_QUEUE 个请求在途时直接拒绝（PasswordHasherBusy）
+- 等待超时：排队超过 PASSWORD_HASH_QUEUE_TIMEOUT 秒同样拒绝
+- 计时指标：次数、平均/最大耗时、拒绝次数（get_stats）
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """哈希线程池饱和"""
+
+
+class PasswordHasher:
+    """有界的密码哈希执行器"""
+
+    # 超过该耗时（秒）记录警告
+    SLOW_THRESHOLD = 0.5
+
+    def __init__(self, workers: int, max_queue: int, queue_timeout: float):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        self._in_flight = 0
+        self._stats = {"count": 0, "total_time": 0.0, "max_time": 0.0, "rejected": 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # 信号量绑定事件循环；测试或 Celery 每次 asyncio.run 都会换新循环
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.workers)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """在线程池中执行哈希函数，饱和时抛出 PasswordHasherBusy"""
+        if self._in_flight >= self.workers + self.max_queue:
+            self._stats["rejected"] += 1
+            logger.warning(f"密码哈希队列已满（在途 {self._in_flight}），拒绝请求")
+            raise PasswordHasherBusy()
+
+        self._in_flight += 1
+        try:
+            semaphore = self._get_semaphore()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._stats["rejected"] += 1
+                logger.warning(f"密码哈希排队超时（{self.queue_timeout}s），拒绝请求")
+                raise PasswordHasherBusy()
+
+            try:
+                started = time.perf_counter()
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._get_executor(), func, *args
+                )
+                elapsed = time.perf_counter() - started
+                self._record(elapsed)
+                return result
+            finally:
+                semaphore.release()
+        finally:
+            self._in_flight -= 1
+
+    def _record(self, elapsed: float) -> None:
+        self._stats["count"] += 1
+        self._stats["total_time"] += elapsed
+        self._stats["max_time"] = max(self._stats["max_time"], elapsed)
+        if elapsed > self.SLOW_THRESHOLD:
+            logger.warning(f"密码哈希耗时过长: {elapsed * 1000:.0f}ms")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取计时指标"""
+        count = self._stats["count"]
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "count": count,
+            "rejected": self._stats["rejected"],
+            "avg_ms": round(self._stats["total_time"] / count * 1000, 2) if count else 0.0,
+            "max_ms": round(self._stats["max_time"] * 1000, 2),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# 全局单例
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+)
@@ -0,0 +1,78 @@
+"""长轮询唤醒表
+
+/messages/poll 没有新消息时按 bipupu_id 挂起，新消息提交后被唤醒，
+唤醒后只查询一次数据库，替代每秒一次的轮询查询。
+
+- 进程内：每个挂起的请求持有一个 asyncio.Event
+- 跨进程：新消息事件经投递总线（app.core.delivery_bus）到达每个 API 进程，
+  由 ConnectionManager 调用 wake() 唤醒本进程的等待者
+"""
+import asyncio
+from contextlib import contextmanager
+from typing import Dict, Iterator, Set
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class PollWaiter:
+    """单个挂起的长轮询请求"""
+
+    def __init__(self, bipupu_id: str):
+        self.bipupu_id = bipupu_id
+        self._event = asyncio.Event()
+
+    def set(self) -> None:
+        self._event.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """等待唤醒，返回是否被唤醒（超时返回 False）；唤醒后自动复位"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._event.clear()
+        return True
+
+
+class PollWakeupRegistry:
+    """按 bipupu_id 组织的长轮询等待者"""
+
+    def __init__(self):
+        self._waiters: Dict[str, Set[PollWaiter]] = {}
+
+    @contextmanager
+    def listen(self, bipupu_id: str) -> Iterator[PollWaiter]:
+        """注册等待者
+
+        应在首次查询数据库之前注册，避免查询与挂起之间到达的消息丢失唤醒。
+        """
+        waiter = PollWaiter(bipupu_id)
+        self._waiters.setdefault(bipupu_id, set()).add(waiter)
+        try:
+            yield waiter
+        finally:
+            waiters = self._waiters.get(bipupu_id)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[bipupu_id]
+
+    def wake(self, bipupu_id: str) -> int:
+        """唤醒该用户的所有等待者，返回唤醒数量"""
+        waiters = self._waiters.get(bipupu_id)
+        if not waiters:
+            return 0
+        for waiter in waiters:
+            waiter.set()
+        logger.debug(f"唤醒长轮询: {bipupu_id} ({len(waiters)} 个)")
+        return len(waiters)
+
+    def get_waiting_count(self) -> int:
+        """获取挂起的长轮询请求数"""
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+
+# 全局单例
+poll_wakeups = PollWakeupRegistry()
@@ -0,0 +1,93 @@
+"""认证主体（Principal）与进程内主体缓存
+
+只需要身份信息的接口使用轻量的 Principal，而不加载 ORM User：
+- Principal：id、bipupu_id、username 及状态标记，不绑定数据库会话
+- PrincipalCache：按访问令牌缓存 Principal 的进程内 TTL 缓存（有界，LRU 淘汰），
+  命中时认证零网络往返（不查 Redis 黑名单、用户缓存，也不查数据库）
+
+失效：
+- 用户信息/密码变更、停用、删除时按用户名失效（UserService）
+- 登出时按令牌失效
+- 其他 worker 中的缓存由 TTL 兜底（默认 60 秒）
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class Principal:
+    """已认证用户的身份信息（来自认证缓存，不绑定数据库会话）"""
+
+    __slots__ = ('id', 'bipupu_id', 'username', 'nickname', 'is_active', 'is_superuser', 'timezone')
+
+    def __init__(self, data: Dict[str, Any]):
+        for field in self.__slots__:
+            setattr(self, field, data.get(field))
+
+    def __repr__(self) -> str:
+        return f"<Principal(id={self.id}, bipupu_id='{self.bipupu_id}')>"
+
+
+class PrincipalCache:
+    """按令牌缓存 Principal 的有界 TTL 缓存"""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+
+    def get(self, token: str) -> Optional[Principal]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if time.monotonic() > expires_at:
+            self._remove(token)
+            return None
+        self._entries.move_to_end(token)
+        return principal
+
+    def set(self, token: str, principal: Principal) -> None:
+        if token in self._entries:
+            self._remove(token)
+        self._entries[token] = (time.monotonic() + self.ttl, principal)
+        self._tokens_by_user.setdefault(str(principal.username), set()).add(token)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def invalidate_token(self, token: str) -> None:
+        """登出时调用"""
+        self._remove(token)
+
+    def invalidate_user(self, username: str) -> None:
+        """用户信息变更/停用时调用，失效该用户的所有令牌"""
+        for token in list(self._tokens_by_user.get(username, ())):
+            self._remove(token)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        username = str(entry[1].username)
+        tokens = self._tokens_by_user.get(username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[username]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 全局单例
+principal_cache = PrincipalCache()
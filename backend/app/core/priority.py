@@ -0,0 +1,37 @@
+"""投递优先级（通道）
+
+交互消息与服务号批量推送走不同的通道，互不排队：
+- Celery：每个优先级对应独立队列，可由不同 worker 消费（见 app.celery 与 docker-entrypoint.sh）
+- WebSocket：进程内发送队列按优先级出队（ConnectionManager）
+
+数值越小优先级越高，与 PushMessage.priority 一致。
+"""
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    HIGH = 1    # 用户间消息（/messages）、立即推送
+    NORMAL = 2  # 服务号广播、手动批量推送
+    LOW = 3     # 定时推送、预生成推送发布等后台批量流量
+
+
+# 优先级 → Celery 队列
+CELERY_QUEUES = {
+    Priority.HIGH: "push.high",
+    Priority.NORMAL: "default",
+    Priority.LOW: "push.bulk",
+}
+
+
+def normalize_priority(value) -> Priority:
+    """将 1/2/3 或 Priority 转换为 Priority，超出范围时按最接近的通道处理"""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return Priority.NORMAL
+    return Priority(min(max(value, Priority.HIGH), Priority.LOW))
+
+
+def queue_for(priority) -> str:
+    """优先级对应的 Celery 队列名"""
+    return CELERY_QUEUES[normalize_priority(priority)]
@@ -12,14 +12,17 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db_context
 from app.db.redis import get_redis
 from app.models.user import User
 from app.core.logging import get_logger
 from app.services.redis_service import RedisService
 from app.core.exceptions import AdminAuthException
+from app.core.principal import Principal, principal_cache
+from app.core.password_hasher import password_hasher, PasswordHasherBusy
 import json
 
 logger = get_logger(__name__)
@@ -35,16 +38,40 @@ security = HTTPBearer()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
+    """验证密码（同步，阻塞调用线程；async 路由请使用 verify_password_async）"""
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """获取密码哈希"""
+    """获取密码哈希（同步，阻塞调用线程；async 路由请使用 get_password_hash_async）"""
     return pwd_context.hash(password)
 
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+def _password_hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="服务繁忙，请稍后重试",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """验证密码（在哈希线程池中执行，不阻塞事件循环；饱和时返回 503）"""
+    try:
+        return await password_hasher.run(verify_password, plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy()
+
+
+async def get_password_hash_async(password: str) -> str:
+    """获取密码哈希（在哈希线程池中执行，不阻塞事件循环；饱和时返回 503）"""
+    try:
+        return await password_hasher.run(get_password_hash, password)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy()
+
+
+async def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     """验证用户凭据"""
     user = db.query(User).filter(
         User.username == username,
@@ -54,7 +81,7 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     if not user:
         return None
 
-    if not verify_password(password, str(user.hashed_password)):
+    if not await verify_password_async(password, str(user.hashed_password)):
         return None
 
     return user
@@ -120,18 +147,17 @@ def decode_token(token: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """获取当前用户（依赖注入）- 优化版本，支持缓存"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无效的认证凭据",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    token = credentials.credentials
+
+async def _username_from_token(token: str) -> str:
+    """校验访问令牌（黑名单、签名、类型），返回用户名"""
+    credentials_exception = _credentials_exception()
 
     # 检查令牌是否在黑名单中
     if await RedisService.is_token_blacklisted(token):
@@ -154,57 +180,46 @@ async def get_current_user(
         logger.warning("Token missing sub claim")
         raise credentials_exception
 
-    # 🆕 优化：先从缓存获取用户信息，避免数据库查询
-    cache_key = f"user_auth:{username}"
+    return username
+
+
+async def _get_cached_user_data(username: str) -> Optional[Dict[str, Any]]:
+    """从认证缓存中获取用户信息"""
     try:
         redis = await get_redis()
-        cached_user_data = await redis.get(cache_key)
-        
+        cached_user_data = await redis.get(f"user_auth:{username}")
         if cached_user_data:
-            try:
-                user_data = json.loads(cached_user_data) if isinstance(cached_user_data, str) else cached_user_data
-                # 使用缓存中的 id 从数据库加载持久化 ORM 对象，避免构造瞬态 User 导致后续 db.add() 时执行 INSERT
-                user_id = user_data.get('id')
-                if user_id:
-                    try:
-                        user = db.query(User).filter(User.id == user_id, User.is_active).first()
-                        if user:
-                            logger.debug(f"User from cache: {username}")
-                            return user
-                    except Exception as e:
-                        logger.warning(f"DB lookup failed for cached user id {user_id}: {e}")
-                # 如果无法从 DB 加载（缓存过期或数据不一致），继续后续的数据库查询流程
-            except Exception as e:
-                logger.warning(f"Failed to restore user from cache: {e}")
-                # 缓存损坏，继续从数据库查询
+            return json.loads(cached_user_data) if isinstance(cached_user_data, str) else cached_user_data
     except Exception as e:
-        logger.debug(f"Cache lookup failed: {e}")
+        logger.warning(f"Failed to restore user from cache: {e}")
+    return None
 
-    # 缓存未命中，从数据库查询
-    user = db.query(User).filter(
-        User.username == username,
-        User.is_active
-    ).first()
 
-    if user is None:
-        logger.warning(f"User not found: {username}")
-        raise credentials_exception
+async def _get_cached_user_id(username: str) -> Optional[int]:
+    """从认证缓存中获取用户 ID"""
+    user_data = await _get_cached_user_data(username)
+    return user_data.get('id') if user_data else None
+
+
+def _auth_user_dict(user: User) -> Dict[str, Any]:
+    return {
+        'id': user.id,
+        'bipupu_id': user.bipupu_id,
+        'username': user.username,
+        'nickname': user.nickname,
+        'is_active': user.is_active,
+        'is_superuser': user.is_superuser,
+        'timezone': user.timezone,
+    }
 
-    # 🆕 优化：将用户信息缓存 30 分钟，避免后续认证时的数据库查询
-    # 缩短缓存时间以减少一致性问题
+
+async def _cache_auth_user(username: str, user: User) -> None:
+    """将用户信息缓存 30 分钟，避免后续认证时的数据库查询（缩短缓存时间以减少一致性问题）"""
     try:
         redis = await get_redis()
-        user_dict = {
-            'id': user.id,
-            'bipupu_id': user.bipupu_id,
-            'username': user.username,
-            'nickname': user.nickname,
-            'is_active': user.is_active,
-            'is_superuser': user.is_superuser,
-            'timezone': user.timezone,
-        }
+        user_dict = _auth_user_dict(user)
         await redis.set(
-            cache_key,
+            f"user_auth:{username}",
             json.dumps(user_dict, default=str),
             ex=1800  # 30 分钟过期
         )
@@ -213,9 +228,82 @@ async def get_current_user(
         logger.warning(f"Failed to cache user: {e}")
         # 缓存失败不影响认证流程
 
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """获取当前用户（依赖注入）- 优化版本，支持缓存
+
+    返回的 User 绑定在请求的同步会话上，路由可直接修改并提交。
+    """
+    username = await _username_from_token(credentials.credentials)
+
+    # 🆕 优化：先从缓存获取用户 ID，按主键加载持久化 ORM 对象
+    # （避免构造瞬态 User 导致后续 db.add() 时执行 INSERT）
+    user_id = await _get_cached_user_id(username)
+    if user_id:
+        try:
+            user = db.query(User).filter(User.id == user_id, User.is_active).first()
+            if user:
+                logger.debug(f"User from cache: {username}")
+                return user
+        except Exception as e:
+            logger.warning(f"DB lookup failed for cached user id {user_id}: {e}")
+        # 如果无法从 DB 加载（缓存过期或数据不一致），继续后续的数据库查询流程
+
+    # 缓存未命中，从数据库查询
+    user = db.query(User).filter(
+        User.username == username,
+        User.is_active
+    ).first()
+
+    if user is None:
+        logger.warning(f"User not found: {username}")
+        raise _credentials_exception()
+
+    await _cache_auth_user(username, user)
     return user
 
 
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Principal:
+    """获取当前用户身份（缓存优先依赖）
+
+    查找顺序：
+    1. 进程内主体缓存（按令牌）：零网络往返
+    2. Redis 黑名单 + 认证缓存：不访问数据库，也不创建会话
+    3. 数据库（短会话），随后回填两级缓存
+
+    适用于只读取身份字段（id、bipupu_id、is_superuser 等）的路由；需要修改用户
+    或访问关系属性的路由仍使用 get_current_user。
+    """
+    token = credentials.credentials
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    username = await _username_from_token(token)
+
+    user_data = await _get_cached_user_data(username)
+    if not (user_data and user_data.get('id') and user_data.get('is_active', True)):
+        async with get_async_db_context() as db:
+            result = await db.execute(
+                select(User).where(User.username == username, User.is_active)
+            )
+            user = result.scalars().first()
+            if user is None:
+                logger.warning(f"User not found: {username}")
+                raise _credentials_exception()
+            user_data = _auth_user_dict(user)
+        await _cache_auth_user(username, user)
+
+    principal = Principal(user_data)
+    principal_cache.set(token, principal)
+    return principal
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
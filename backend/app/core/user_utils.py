@@ -1,38 +1,19 @@
 """用户工具函数"""
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from app.models.user import User
-import random
 
 
 def generate_bipupu_id(db: Session) -> str:
-    """生成唯一的 4 位数字 ID
-    
-    策略：
-    1. 从 0001 开始递增分配
-    2. 如果有空洞（删除的用户），可以复用
-    3. 确保唯一性（使用数据库唯一约束兜底）
-    
-    线程安全：
-    - 使用数据库唯一约束防止并发冲突
-    - 调用方需要捕获 IntegrityError 并重试
+    """分配唯一的数字 ID（默认 4 位，位数由 BIPUPU_ID_WIDTH 配置）
+
+    策略（见 app.services.bipupu_id_allocator）：
+    1. 优先复用空闲池中的空洞（删除的用户留下的 ID）
+    2. 否则从数据库序列按批预分配的号段中取号
+    3. 唯一性由序列与 SKIP LOCKED 保证，数据库唯一约束兜底
+
+    在调用方事务中执行：插入失败回滚后复用的 ID 会回到空闲池。
     """
-    # 先尝试获取最小的可用 ID（填补空洞）
-    # 查询所有已使用的 ID，找到第一个未使用的
-    used_ids = db.query(User.bipupu_id).filter(
-        User.bipupu_id.like('____')  # 只匹配 4 位数字
-    ).all()
-    
-    used_id_set = {str(row[0]) for row in used_ids if row[0] and str(row[0]).isdigit()}
-    
-    # 从 0001 开始找第一个未使用的 ID
-    for i in range(1, 10000):
-        bipupu_id = f"{i:04d}"
-        if bipupu_id not in used_id_set:
-            return bipupu_id
-    
-    # 如果所有 4 位数字都用完了，抛出异常
-    raise ValueError("ID pool exhausted: 所有 4 位数字 ID 已用尽")
+    from app.services.bipupu_id_allocator import bipupu_id_allocator
+    return bipupu_id_allocator.allocate(db)
 
 
 def is_service_account(bipupu_id: str) -> bool:
@@ -1,25 +1,63 @@
 """WebSocket 连接管理器"""
-from typing import Dict, Set
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
 from fastapi import WebSocket
 from datetime import datetime
+import itertools
 import json
 import asyncio
+import os
+import socket
+import time
+import uuid
 from app.core.logging import get_logger
+from app.core.poll_wakeup import poll_wakeups
+from app.core.priority import Priority, normalize_priority
 
 logger = get_logger(__name__)
 
 
+class LaneStats:
+    """单个优先级通道的排队延迟统计（最近 WINDOW 次发送）"""
+
+    WINDOW = 500
+
+    def __init__(self):
+        self.sent = 0
+        self.queued = 0
+        self.max_wait_ms = 0.0
+        self._recent: Deque[float] = deque(maxlen=self.WINDOW)
+
+    def record(self, wait_ms: float) -> None:
+        self.sent += 1
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self._recent.append(wait_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self._recent)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            "sent": self.sent,
+            "queued": self.queued,
+            "avg_wait_ms": round(sum(recent) / len(recent), 2) if recent else 0.0,
+            "p95_wait_ms": round(p95, 2),
+            "max_wait_ms": round(self.max_wait_ms, 2),
+        }
+
+
 class ConnectionManager:
     """WebSocket 连接管理器
     
     负责：
     - 管理活跃的 WebSocket 连接
     - 按 bipupu_id 组织连接
-    - 推送新消息到在线用户
+    - 推送新消息到在线用户（本进程直接发送，其他进程经投递总线转发）
+    - 本地发送经优先级队列出队：交互消息（HIGH）优先于服务号批量推送（NORMAL/LOW）
+    - 唤醒接收者挂起的长轮询请求
     - 处理心跳和断线重连
     """
     
-    def __init__(self):
+    def __init__(self, bus: Optional[Any] = None):
         # bipupu_id -> Set[WebSocket]
         # 一个用户可能有多个设备连接
         self.active_connections: Dict[str, Set[WebSocket]] = {}
@@ -27,6 +65,52 @@ class ConnectionManager:
         self.connection_users: Dict[WebSocket, str] = {}
         # 连接时间记录
         self.connection_times: Dict[WebSocket, datetime] = {}
+        # 投递总线：未指定时使用进程级总线（app.core.delivery_bus）
+        self.bus = bus
+        # 本进程在投递总线上的标识，用于跳过自己发布的消息
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # 本地发送队列：(priority, seq, enqueued_at, message_json, bipupu_id, future)
+        self._send_queue: Optional[asyncio.PriorityQueue] = None
+        self._send_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._senders: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        self.lane_stats: Dict[Priority, LaneStats] = {p: LaneStats() for p in Priority}
+    
+    SENDER_COUNT = 4  # 并发发送协程数（单个慢连接不阻塞整个队列）
+    
+    async def start_delivery(self):
+        """订阅投递总线，接收其他进程转发给本进程连接的消息（API 进程启动时调用）"""
+        bus = await self._get_bus()
+        await bus.subscribe(self.origin, self._on_bus_delivery)
+    
+    async def stop_delivery(self):
+        """取消订阅投递总线，停止本地发送协程"""
+        if self.bus is not None:
+            await self.bus.unsubscribe(self.origin)
+        for task in self._senders:
+            task.cancel()
+        self._senders = []
+        self._send_queue = None
+    
+    async def _get_bus(self):
+        if self.bus is None:
+            from app.core.delivery_bus import get_delivery_bus
+            self.bus = await get_delivery_bus()
+        return self.bus
+    
+    async def _on_bus_delivery(self, bipupu_id: str, message: dict, priority: Priority = Priority.NORMAL):
+        """投递总线回调：只投递给本进程持有的连接"""
+        self._wake_pollers(message, bipupu_id)
+        await self.send_local_message(message, bipupu_id, priority)
+    
+    @staticmethod
+    def _wake_pollers(message: dict, bipupu_id: str):
+        """新消息到达接收者时唤醒其挂起的长轮询（发送者多端同步不唤醒）"""
+        if message.get("type") != "new_message":
+            return
+        receiver = (message.get("message") or {}).get("receiver_bipupu_id")
+        if receiver is None or str(receiver) == bipupu_id:
+            poll_wakeups.wake(bipupu_id)
     
     async def connect(self, websocket: WebSocket, bipupu_id: str):
         """接受新的 WebSocket 连接"""
@@ -60,13 +144,74 @@ class ConnectionManager:
         
         logger.info(f"❌ WebSocket 连接断开: {bipupu_id} (总连接数: {len(self.connection_users)})")
     
-    async def send_personal_message(self, message: dict, bipupu_id: str):
-        """发送消息给特定用户的所有连接"""
+    async def send_personal_message(self, message: dict, bipupu_id: str,
+                                    priority: Priority = Priority.NORMAL) -> bool:
+        """发送消息给特定用户的所有连接（跨进程）
+
+        先投递本进程持有的连接，再发布到投递总线，由持有该用户连接的
+        其他 API 进程完成推送。Celery worker 中调用时只会走投递总线。
+        priority 决定本进程及接收进程发送队列中的出队顺序。
+
+        返回：本进程投递成功或至少有一个订阅进程收到消息
+        """
+        self._wake_pollers(message, bipupu_id)
+        delivered = await self.send_local_message(message, bipupu_id, priority)
+        
+        try:
+            bus = await self._get_bus()
+            receivers = await bus.publish(self.origin, bipupu_id, message, priority)
+        except Exception as e:
+            logger.warning(f"投递总线发布失败（仅本地投递）: {e}")
+            receivers = 0
+        
+        return delivered or receivers > 0
+    
+    async def send_local_message(self, message: dict, bipupu_id: str,
+                                 priority: Priority = Priority.NORMAL) -> bool:
+        """发送消息给本进程中特定用户的所有连接（经优先级发送队列，等待发送完成）"""
         if bipupu_id not in self.active_connections:
-            logger.debug(f"用户 {bipupu_id} 不在线，跳过 WebSocket 推送")
+            logger.debug(f"用户 {bipupu_id} 不在本进程在线，跳过本地推送")
             return False
         
+        priority = normalize_priority(priority)
+        queue = self._ensure_senders()
+        future = asyncio.get_running_loop().create_future()
         message_json = json.dumps(message, ensure_ascii=False)
+        queue.put_nowait((priority, next(self._seq), time.monotonic(), message_json, bipupu_id, future))
+        self.lane_stats[priority].queued += 1
+        return await future
+    
+    def _ensure_senders(self) -> asyncio.PriorityQueue:
+        """在当前事件循环中创建发送队列与发送协程（事件循环变化时重建）"""
+        loop = asyncio.get_running_loop()
+        if self._send_queue is None or self._send_loop is not loop:
+            self._send_queue = asyncio.PriorityQueue()
+            self._send_loop = loop
+            self._senders = [
+                loop.create_task(self._sender(self._send_queue)) for _ in range(self.SENDER_COUNT)
+            ]
+        return self._send_queue
+    
+    async def _sender(self, queue: asyncio.PriorityQueue):
+        while True:
+            priority, _, enqueued_at, message_json, bipupu_id, future = await queue.get()
+            stats = self.lane_stats[priority]
+            stats.queued -= 1
+            stats.record((time.monotonic() - enqueued_at) * 1000)
+            try:
+                success = await self._send_to_connections(message_json, bipupu_id)
+                if not future.done():
+                    future.set_result(success)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                queue.task_done()
+    
+    async def _send_to_connections(self, message_json: str, bipupu_id: str) -> bool:
+        """直接写入用户在本进程的所有连接"""
+        if bipupu_id not in self.active_connections:
+            return False
         connections = self.active_connections[bipupu_id].copy()  # 复制以避免迭代时修改
         
         success = False
@@ -93,7 +238,7 @@ class ConnectionManager:
                 self.disconnect(websocket)
     
     def is_user_online(self, bipupu_id: str) -> bool:
-        """检查用户是否在线"""
+        """检查用户是否在本进程在线"""
         return bipupu_id in self.active_connections and len(self.active_connections[bipupu_id]) > 0
     
     def get_online_count(self) -> int:
@@ -103,6 +248,10 @@ class ConnectionManager:
     def get_connection_count(self) -> int:
         """获取总连接数"""
         return len(self.connection_users)
+    
+    def get_lane_stats(self) -> Dict[str, Dict[str, Any]]:
+        """各优先级通道的本地发送排队延迟"""
+        return {p.name.lower(): self.lane_stats[p].snapshot() for p in Priority}
 
 
 # 全局单例
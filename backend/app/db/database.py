@@ -1,8 +1,15 @@
 """PostgreSQL 数据库连接管理模块
 
 独立的数据库连接，与 Redis 分离
+
+- 同步引擎（psycopg2）：SessionLocal / get_db，供 Celery 任务和一般路由使用
+- 异步引擎（asyncpg）：AsyncSessionLocal / get_async_db，供热点路由使用
+  （认证、发消息、收件箱/发件箱、长轮询、WebSocket 认证），数据库往返不阻塞事件循环
 """
-from sqlalchemy import create_engine, text
+import os
+
+from sqlalchemy import create_engine, text, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
@@ -14,10 +21,27 @@ logger = get_logger(__name__)
 
 
 # ========== 数据库连接池配置（1C1G 优化） ==========
+# DB_POOL_SIZE / DB_MAX_OVERFLOW 是每个进程的连接预算。API 进程同时使用两个引擎，
+# 其中 DB_ASYNC_POOL_SIZE / DB_ASYNC_MAX_OVERFLOW 划给异步引擎，其余留给同步引擎；
+# Celery 进程只使用同步引擎，独占全部预算。
+def _pool_budget() -> tuple:
+    """返回 ((同步 pool_size, max_overflow), (异步 pool_size, max_overflow))"""
+    if os.getenv("CONTAINER_ROLE", "backend") != "backend":
+        return (settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW), (1, 0)
+    async_size = min(settings.DB_ASYNC_POOL_SIZE, max(settings.DB_POOL_SIZE - 1, 1))
+    async_overflow = min(settings.DB_ASYNC_MAX_OVERFLOW, settings.DB_MAX_OVERFLOW)
+    return (
+        (max(settings.DB_POOL_SIZE - async_size, 1), settings.DB_MAX_OVERFLOW - async_overflow),
+        (async_size, async_overflow),
+    )
+
+
+(_SYNC_POOL_SIZE, _SYNC_MAX_OVERFLOW), (_ASYNC_POOL_SIZE, _ASYNC_MAX_OVERFLOW) = _pool_budget()
+
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_size=settings.DB_POOL_SIZE,           # 5 → 节省内存
-    max_overflow=settings.DB_MAX_OVERFLOW,     # 10 → 节省内存
+    pool_size=_SYNC_POOL_SIZE,
+    max_overflow=_SYNC_MAX_OVERFLOW,
     pool_pre_ping=True,                        # 检查连接有效性
     pool_recycle=settings.DB_POOL_RECYCLE,     # 1800 秒 = 30 分钟
     pool_timeout=settings.DB_POOL_TIMEOUT,     # 10 秒快速失败
@@ -30,6 +54,98 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# 异步引擎：连接按需建立，Celery 进程中不会实际使用
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    pool_size=_ASYNC_POOL_SIZE,
+    max_overflow=_ASYNC_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    echo=False,
+)
+
+# expire_on_commit=False：提交后仍可访问已加载的属性（异步会话不能隐式懒加载）
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+# ========== 惰性会话 ==========
+class LazySession:
+    """惰性同步会话代理
+
+    首次访问会话属性（query/add/execute 等）时才创建 Session；
+    未使用时 commit/rollback/close 均为空操作。完全由缓存应答的请求
+    不会创建会话，也不会占用连接池。
+    """
+
+    def __init__(self, factory=SessionLocal):
+        self._factory = factory
+        self._session = None
+
+    @property
+    def materialized(self) -> bool:
+        """是否已创建真实会话"""
+        return self._session is not None
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def __getattr__(self, name):
+        return getattr(self._get_session(), name)
+
+    def commit(self) -> None:
+        if self._session is not None:
+            self._session.commit()
+
+    def rollback(self) -> None:
+        if self._session is not None:
+            self._session.rollback()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class LazyAsyncSession:
+    """惰性异步会话代理（语义同 LazySession）"""
+
+    def __init__(self, factory=AsyncSessionLocal):
+        self._factory = factory
+        self._session = None
+
+    @property
+    def materialized(self) -> bool:
+        """是否已创建真实会话"""
+        return self._session is not None
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def __getattr__(self, name):
+        return getattr(self._get_session(), name)
+
+    async def commit(self) -> None:
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self) -> None:
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
 
 # ========== 统一依赖注入（1C1G 优化版） ==========
 @asynccontextmanager
@@ -46,8 +162,9 @@ async def get_db_context() -> AsyncGenerator:
     - 自动关闭连接
     - 异常安全
     - 内存占用低（使用后立即释放）
+    - 惰性创建：未执行 SQL 时不占用连接池
     """
-    db = SessionLocal()
+    db = LazySession(SessionLocal)
     try:
         yield db
         db.commit()
@@ -64,6 +181,31 @@ async def get_db():
         yield db
 
 
+@asynccontextmanager
+async def get_async_db_context() -> AsyncGenerator[AsyncSession, None]:
+    """异步数据库会话上下文管理器（自动提交/回滚/关闭，惰性创建）
+
+    用法：
+        async with get_async_db_context() as db:
+            result = await db.execute(select(User).where(User.id == 1))
+    """
+    db = LazyAsyncSession(AsyncSessionLocal)
+    try:
+        yield db
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+
+
+async def get_async_db():
+    """FastAPI 依赖注入版本 - 异步会话"""
+    async with get_async_db_context() as db:
+        yield db
+
+
 async def query_messages_for_user(
     user_bipupu_id: str,
     last_msg_id: int,
@@ -73,18 +215,21 @@ async def query_messages_for_user(
     轻量级消息查询函数 - 用于长轮询
     
     优势：
-    - 快速申请/释放连接（占用时间 < 100ms）
+    - 快速申请/释放连接（占用时间 < 100ms），使用异步会话不阻塞事件循环
     - 不持有会话状态
     - 内存占用极低
     - 立即序列化（避免持有 ORM 对象）
     """
-    async with get_db_context() as db:
+    async with get_async_db_context() as db:
         from app.models.message import Message
         
-        messages = db.query(Message).filter(
-            Message.receiver_bipupu_id == user_bipupu_id,
-            Message.id > last_msg_id
-        ).order_by(Message.id.asc()).limit(limit).all()
+        result = await db.execute(
+            select(Message).where(
+                Message.receiver_bipupu_id == user_bipupu_id,
+                Message.id > last_msg_id
+            ).order_by(Message.id.asc()).limit(limit)
+        )
+        messages = result.scalars().all()
         
         # 立即序列化后返回（避免持有 ORM 对象，节省内存）
         return [
@@ -136,3 +281,8 @@ async def init_db():
     except Exception as e:
         logger.error(f"❌ 数据库连接失败：{e}")
         raise
+
+
+async def close_db():
+    """释放异步引擎连接池"""
+    await async_engine.dispose()
@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session
 from datetime import time
 from app.models.user import User
 from app.models.service_account import ServiceAccount
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.core.logging import get_logger
 from app.core.config import settings
 
@@ -26,7 +26,7 @@ async def create_default_admin_user(db: Session):
         admin_user = User(
             username=admin_username,
             bipupu_id=bipupu_id,
-            hashed_password=get_password_hash(admin_password),
+            hashed_password=await get_password_hash_async(admin_password),
             is_active=True,
             is_superuser=True
         )
@@ -100,6 +100,12 @@ async def create_default_services(db: Session):
             logger.info(f"创建服务号: {service_name}")
 
     try:
+        db.flush()
+        # 默认推送时间可能变化；同时补齐尚未计算的订阅推送时间槽
+        from app.services.push.utils import refresh_push_slots
+        refreshed = refresh_push_slots(db)
+        if refreshed:
+            logger.info(f"刷新订阅推送时间槽: {refreshed} 条")
         db.commit()
         logger.info("默认服务号初始化完成")
     except Exception as e:
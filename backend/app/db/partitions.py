@@ -0,0 +1,150 @@
+"""按月范围分区维护（messages / push_logs）
+
+两张表在 PostgreSQL 中按 created_at 做 RANGE 分区（迁移 f1a6c3e9d204），每月一个分区：
+{table}_pYYYYMM，范围 [当月 1 日 00:00 UTC, 次月 1 日 00:00 UTC)。没有 DEFAULT 分区，
+维护任务（maintenance.partitions）每天预建未来 PARTITION_PREMAKE_MONTHS 个月的分区，
+并整块删除（或仅分离）超过保留期的分区，保留期清理不再需要 DELETE + VACUUM：
+
+- push_logs：PUSH_LOG_RETENTION_DAYS（默认 30 天）
+- messages：MESSAGE_RETENTION_DAYS（默认 0，永久保留）；删除分区前先删除指向其中消息的收藏
+
+保留期按整月生效：分区上界早于截止时间才会被删除，实际保留时长在保留期与保留期 + 1 个月之间。
+"""
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+PARTITIONED_TABLES = ("messages", "push_logs")
+_PARTITION_RE = re.compile(r"^(?P<table>\w+)_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_months(first: date, today: date, months_ahead: int) -> List[date]:
+    """first 所在月至 today 之后 months_ahead 个月（含）的每月 1 日"""
+    months = []
+    month, last = month_start(first), add_months(month_start(today), months_ahead)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def expired_months(months: List[date], cutoff: datetime) -> List[date]:
+    """上界（次月 1 日 00:00 UTC）不晚于 cutoff 的分区月份"""
+    return [
+        month for month in months
+        if datetime.combine(add_months(month, 1), datetime.min.time(), tzinfo=timezone.utc) <= cutoff
+    ]
+
+
+def create_partition_sql(table: str, month: date) -> str:
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, month)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+    )
+
+
+def ensure_partitions(conn, table: str, first: Optional[date] = None,
+                      months_ahead: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+    """创建缺失的月分区（不提交事务），返回新建的分区名"""
+    today = today or datetime.now(timezone.utc).date()
+    months_ahead = settings.PARTITION_PREMAKE_MONTHS if months_ahead is None else months_ahead
+    existing = {name for name, _ in list_partitions(conn, table)}
+    created = []
+    for month in partition_months(first or today, today, months_ahead):
+        name = partition_name(table, month)
+        if name not in existing:
+            conn.execute(text(create_partition_sql(table, month)))
+            created.append(name)
+    return created
+
+
+def list_partitions(conn, table: str) -> List[Tuple[str, date]]:
+    """按命名规则识别的月分区（按月份排序）"""
+    rows = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :table"
+    ), {"table": table}).scalars().all()
+
+    partitions = []
+    for name in rows:
+        match = _PARTITION_RE.match(name)
+        if match and match.group("table") == table:
+            partitions.append((name, date(int(match.group("year")), int(match.group("month")), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def drop_expired_partitions(db, table: str, retention_days: int,
+                            detach_only: Optional[bool] = None,
+                            now: Optional[datetime] = None) -> List[Dict[str, object]]:
+    """删除（或分离）超过保留期的分区，每个分区单独提交
+
+    Returns:
+        [{"partition": 分区名, "rows": 估算行数}, ...]
+    """
+    if retention_days <= 0:
+        return []
+    detach_only = settings.PARTITION_DETACH_ONLY if detach_only is None else detach_only
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    partitions = dict((month, name) for name, month in list_partitions(db, table))
+
+    removed = []
+    for month in expired_months(sorted(partitions), cutoff):
+        name = partitions[month]
+        try:
+            # 删除/分离分区需要父表上的排他锁，拿不到时跳过，避免阻塞在线写入
+            db.execute(text("SET LOCAL lock_timeout = '5s'"))
+            rows = db.execute(
+                text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = :name"),
+                {"name": name},
+            ).scalar() or 0
+            if table == "messages":
+                db.execute(text(f'DELETE FROM favorites WHERE message_id IN (SELECT id FROM "{name}")'))
+            if detach_only:
+                db.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+            else:
+                db.execute(text(f'DROP TABLE "{name}"'))
+            db.commit()
+            removed.append({"partition": name, "rows": int(rows)})
+            logger.info(f"{'分离' if detach_only else '删除'}过期分区 {name}（约 {rows} 行）")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"处理过期分区 {name} 失败: {e}")
+    return removed
+
+
+def maintain_partitions(db, now: Optional[datetime] = None) -> Dict[str, Dict[str, list]]:
+    """预建未来分区并清理过期分区（maintenance.partitions 每天执行）"""
+    now = now or datetime.now(timezone.utc)
+    retention = {
+        "messages": settings.MESSAGE_RETENTION_DAYS,
+        "push_logs": settings.PUSH_LOG_RETENTION_DAYS,
+    }
+    result = {}
+    for table in PARTITIONED_TABLES:
+        created = ensure_partitions(db, table, today=now.date())
+        db.commit()
+        removed = drop_expired_partitions(db, table, retention[table], now=now)
+        result[table] = {"created": created, "removed": removed}
+    return result
@@ -5,6 +5,7 @@
 from typing import Any, Optional
 import redis.asyncio as redis
 import asyncio
+import socket
 import time
 from app.core.config import settings
 from app.core.logging import get_logger
@@ -13,8 +14,29 @@ logger = get_logger(__name__)
 
 # Redis 客户端全局实例
 redis_client: Optional[Any] = None
+# 创建 redis_client 时所在的事件循环（Celery 任务每次 asyncio.run 都会新建循环）
+_redis_loop: Optional[asyncio.AbstractEventLoop] = None
 _redis_init_lock = asyncio.Lock()
 
+# 二进制 Redis 客户端（decode_responses=False，用于头像/海报等原始字节）
+binary_redis_client: Optional[Any] = None
+_binary_redis_loop: Optional[asyncio.AbstractEventLoop] = None
+_binary_redis_unavailable_until: float = 0.0
+
+
+def _bound_to_other_loop() -> bool:
+    """redis.asyncio 连接绑定在创建时的事件循环上，跨循环复用会报错
+
+    API 进程只有一个事件循环，不受影响；Celery 任务中每次 asyncio.run
+    都是新循环，需要重建客户端。内存缓存不依赖事件循环，无需重建。
+    """
+    if redis_client is None or isinstance(redis_client, MemoryCacheWrapper):
+        return False
+    try:
+        return asyncio.get_running_loop() is not _redis_loop
+    except RuntimeError:
+        return False
+
 
 class MemoryCacheWrapper:
     """
@@ -23,7 +45,7 @@ class MemoryCacheWrapper:
     优化点：
     1. 使用 asyncio.Lock 保护并发访问
     2. 集中过期检查（不创建定时任务）
-    3. 极简实现（代码量 < 150 行）
+    3. 极简实现（仅覆盖项目用到的命令，含时间线所需的有序集合子集）
     4. 惰性清理（访问时检查过期）
     """
     
@@ -80,12 +102,112 @@ class MemoryCacheWrapper:
             return key in self._cache
     
     async def incr(self, key: str) -> int:
-        """原子自增"""
+        """原子自增（与 Redis 一致：已过期的键从 0 开始，未过期的保留原 TTL）"""
         async with self._lock:
+            if key in self._expiry and time.time() > self._expiry[key]:
+                self._cache.pop(key, None)
+                del self._expiry[key]
             current = int(self._cache.get(key, 0))
             self._cache[key] = current + 1
             return current + 1
     
+    async def incrby(self, key: str, amount: int) -> int:
+        """原子增加指定值"""
+        async with self._lock:
+            if key in self._expiry and time.time() > self._expiry[key]:
+                self._cache.pop(key, None)
+                del self._expiry[key]
+            current = int(self._cache.get(key, 0))
+            self._cache[key] = current + amount
+            return current + amount
+    
+    async def decr(self, key: str) -> int:
+        """原子自减"""
+        async with self._lock:
+            if key in self._expiry and time.time() > self._expiry[key]:
+                self._cache.pop(key, None)
+                del self._expiry[key]
+            current = int(self._cache.get(key, 0))
+            self._cache[key] = current - 1
+            return current - 1
+    
+    async def mget(self, keys, *args) -> list:
+        """批量获取（与 Redis 一致：不存在的键返回 None）"""
+        if isinstance(keys, str):
+            keys = [keys]
+        keys = list(keys) + list(args)
+        return [await self.get(key) for key in keys]
+    
+    # ---- 有序集合（member → score，成员统一存为字符串，与 decode_responses=True 一致）----
+    
+    def _live_zset(self, key: str) -> dict:
+        """返回未过期的有序集合（调用方需持有锁）"""
+        if key in self._expiry and time.time() > self._expiry[key]:
+            self._cache.pop(key, None)
+            del self._expiry[key]
+        zset = self._cache.get(key)
+        return zset if isinstance(zset, dict) else {}
+    
+    def _sorted_members(self, key: str, desc: bool) -> list:
+        zset = self._live_zset(key)
+        return sorted(zset.items(), key=lambda item: (item[1], item[0]), reverse=desc)
+    
+    async def zadd(self, key: str, mapping: dict) -> int:
+        async with self._lock:
+            zset = self._live_zset(key)
+            added = sum(1 for member in mapping if str(member) not in zset)
+            zset.update({str(member): float(score) for member, score in mapping.items()})
+            self._cache[key] = zset
+            return added
+    
+    async def zrem(self, key: str, *members) -> int:
+        async with self._lock:
+            zset = self._live_zset(key)
+            return sum(1 for member in members if zset.pop(str(member), None) is not None)
+    
+    async def zcard(self, key: str) -> int:
+        async with self._lock:
+            return len(self._live_zset(key))
+    
+    async def zrevrange(self, key: str, start: int, end: int) -> list:
+        async with self._lock:
+            members = [member for member, _ in self._sorted_members(key, desc=True)]
+            end = len(members) if end == -1 else end + 1
+            return members[start:end]
+    
+    async def zrevrangebyscore(self, key: str, high, low, start: Optional[int] = None,
+                               num: Optional[int] = None) -> list:
+        """按分数降序返回；high/low 支持 '(' 开区间与 '+inf' / '-inf'"""
+        def bound(value):
+            text = str(value)
+            exclusive = text.startswith("(")
+            return float(text.lstrip("(")), exclusive
+        
+        hi, hi_exclusive = bound(high)
+        lo, lo_exclusive = bound(low)
+        async with self._lock:
+            members = [
+                member for member, score in self._sorted_members(key, desc=True)
+                if (score < hi if hi_exclusive else score <= hi)
+                and (score > lo if lo_exclusive else score >= lo)
+            ]
+            if start is not None and num is not None:
+                members = members[start:start + num]
+            return members
+    
+    async def zremrangebyrank(self, key: str, start: int, end: int) -> int:
+        """按升序排名删除（支持负数下标）"""
+        async with self._lock:
+            ordered = self._sorted_members(key, desc=False)
+            size = len(ordered)
+            lo = max(start + size if start < 0 else start, 0)
+            hi = end + size if end < 0 else end
+            removed = ordered[lo:hi + 1] if hi >= lo else []
+            zset = self._live_zset(key)
+            for member, _ in removed:
+                zset.pop(member, None)
+            return len(removed)
+    
     async def publish(self, channel: str, message: str) -> int:
         """发布消息到频道（内存缓存中模拟）"""
         logger.debug(f"MemoryCache: 发布到 {channel}（模拟）")
@@ -123,6 +245,10 @@ class MemoryCacheWrapper:
                 return True
             return False
     
+    def pipeline(self, transaction: bool = False) -> "_MemoryPipeline":
+        """与 redis.asyncio 管道接口一致：排队命令，execute 时依次执行并按顺序返回结果"""
+        return _MemoryPipeline(self)
+
     async def close(self):
         """关闭连接，清理缓存"""
         async with self._lock:
@@ -130,6 +256,26 @@ class MemoryCacheWrapper:
             self._expiry.clear()
 
 
+class _MemoryPipeline:
+    """MemoryCacheWrapper 的管道（内存缓存没有网络往返，仅保持调用方代码一致）"""
+
+    def __init__(self, cache: MemoryCacheWrapper):
+        self._cache = cache
+        self._commands: list = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self._cache, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self) -> list:
+        commands, self._commands = self._commands, []
+        return [await method(*args, **kwargs) for method, args, kwargs in commands]
+
+
 async def get_redis():
     """
     获取 Redis 客户端 - 1C1G 轻量化版本
@@ -140,17 +286,25 @@ async def get_redis():
     3. Redis 失败时优雅降级到内存缓存
     4. 双重检查锁定模式
     """
-    global redis_client
+    global redis_client, _redis_loop
     
     # 快速路径：已初始化
-    if redis_client is not None:
+    if redis_client is not None and not _bound_to_other_loop():
         return redis_client
     
     # 慢速路径：需要初始化
     async with _redis_init_lock:
         # 第二次检查（防止重复初始化）
-        if redis_client is not None:
+        if redis_client is not None and not _bound_to_other_loop():
             return redis_client
+
+        if redis_client is not None:
+            # 绑定在已结束循环上的客户端（Celery 每个任务一次 asyncio.run），关闭其连接池再重建
+            stale, redis_client = redis_client, None
+            try:
+                await _close_stale_client(stale)
+            except Exception as e:
+                logger.debug(f"关闭旧的 Redis 客户端失败: {e}")
         
         try:
             # 1C1G 轻量化配置
@@ -166,6 +320,7 @@ async def get_redis():
                 # 🔧 简化重试（1C1G 下快速失败更好）
                 retry_on_timeout=False,
             )
+            _redis_loop = asyncio.get_running_loop()
             
             # 测试连接（ping() 返回布尔值，不是协程）
             result = redis_client.ping()
@@ -183,7 +338,7 @@ async def get_redis():
 
 async def init_redis():
     """初始化 Redis 连接"""
-    global redis_client
+    global redis_client, _redis_loop
     try:
         redis_client = redis.Redis.from_url(
             settings.REDIS_URL,
@@ -193,6 +348,7 @@ async def init_redis():
             socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
             socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
         )
+        _redis_loop = asyncio.get_running_loop()
         
         result = redis_client.ping()
         if asyncio.iscoroutine(result):
@@ -212,9 +368,80 @@ async def get_redis_client():
     return redis_client
 
 
+async def _close_stale_client(client: Any) -> None:
+    """关闭绑定在其他事件循环上的客户端
+
+    Celery 任务每次 asyncio.run 结束后旧循环即关闭，aclose() 无法再关闭其传输层
+    （Event loop is closed），此时直接 shutdown 底层 socket，避免每个任务遗留一条连接。
+    """
+    pool = client.connection_pool
+    connections = [*getattr(pool, "_available_connections", []), *getattr(pool, "_in_use_connections", [])]
+    transports = [conn._writer.transport for conn in connections if getattr(conn, "_writer", None) is not None]
+    try:
+        await client.aclose()
+        return
+    except RuntimeError:
+        pass
+    for transport in transports:
+        sock = transport.get_extra_info("socket")
+        if sock is None:
+            continue
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+async def get_binary_redis() -> Optional[Any]:
+    """获取二进制 Redis 客户端（独立连接池，decode_responses=False）
+
+    文本客户端会把字节解码为字符串，无法存取图片数据，因此二进制数据走单独的连接池。
+    Redis 不可用时返回 None（调用方仅使用进程内缓存），60 秒后重试连接。
+    """
+    global binary_redis_client, _binary_redis_loop, _binary_redis_unavailable_until
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if binary_redis_client is not None and loop is _binary_redis_loop:
+        return binary_redis_client
+    if binary_redis_client is not None:
+        stale, binary_redis_client = binary_redis_client, None
+        try:
+            await _close_stale_client(stale)
+        except Exception as e:
+            logger.debug(f"关闭旧的二进制 Redis 客户端失败: {e}")
+    if binary_redis_client is None and time.monotonic() < _binary_redis_unavailable_until:
+        return None
+
+    try:
+        client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=False,
+            max_connections=settings.REDIS_BINARY_MAX_CONNECTIONS,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            retry_on_timeout=False,
+        )
+        await client.ping()
+        binary_redis_client = client
+        _binary_redis_loop = loop
+        return binary_redis_client
+    except Exception as e:
+        logger.warning(f"⚠️ 二进制 Redis 连接失败，仅使用进程内缓存：{e}")
+        binary_redis_client = None
+        _binary_redis_unavailable_until = time.monotonic() + 60
+        return None
+
+
 async def close_redis():
     """关闭 Redis 连接"""
-    global redis_client
+    global redis_client, binary_redis_client
     if redis_client and hasattr(redis_client, 'close'):
         await redis_client.close()
         logger.info("✅ Redis 连接已关闭")
+    if binary_redis_client is not None:
+        await binary_redis_client.close()
+        binary_redis_client = None
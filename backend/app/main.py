@@ -7,9 +7,13 @@ import os
 from app.api.router import api_router
 from app.api.routes.root import router as root_router
 from app.core.config import settings
-from app.db.database import init_db
+from app.db.database import init_db, close_db
 from app.db.redis import redis_client, MemoryCacheWrapper, init_redis, close_redis
 from app.db.init_data import init_default_data
+from app.core.websocket import manager
+from app.core.password_hasher import password_hasher
+from app.core.image_processor import image_processor
+from app.services.push.log_stream import push_log_writer
 from app.core.logging import get_logger
 import uvicorn
 from app.core.openapi_util import export_openapi_json
@@ -49,6 +53,10 @@ async def lifespan(app: FastAPI):
         await init_default_data()
         # 初始化Redis（失败时自动使用内存缓存）
         await init_redis()
+        # 订阅跨进程 WebSocket 投递总线
+        await manager.start_delivery()
+        # 推送日志后台落库（Redis Stream → push_logs）
+        push_log_writer.start()
 
         port = os.getenv("PORT", "8000")
         logger.info(f"📚 API文档地址:    http://localhost:{port}/api/docs")
@@ -77,11 +85,37 @@ async def lifespan(app: FastAPI):
     yield
 
     # 清理资源
+    try:
+        await manager.stop_delivery()
+    except Exception as e:
+        logger.error(f"❌ 停止投递总线时出错：{e}")
+
+    try:
+        await push_log_writer.stop()
+    except Exception as e:
+        logger.error(f"❌ 停止推送日志落库任务时出错：{e}")
+
     try:
         await close_redis()
     except Exception as e:
         logger.error(f"❌ 关闭 Redis 连接时出错：{e}")
 
+    try:
+        from app.db.database import SessionLocal
+        from app.services.bipupu_id_allocator import bipupu_id_allocator
+        with SessionLocal() as db:
+            bipupu_id_allocator.release_reserved(db)
+    except Exception as e:
+        logger.error(f"❌ 归还预分配 bipupu_id 时出错：{e}")
+
+    try:
+        await close_db()
+    except Exception as e:
+        logger.error(f"❌ 关闭数据库连接池时出错：{e}")
+
+    password_hasher.shutdown()
+    image_processor.shutdown()
+
     logger.info("🛑 服务停止中")
 
 def create_app() -> FastAPI:
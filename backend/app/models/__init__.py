@@ -10,6 +10,9 @@ from app.models.favorite import Favorite
 from app.models.service_account import ServiceAccount
 from app.models.poster import Poster
 from app.models.push_log import PushLog, PushStatus
+from app.models.bipupu_id_free import BipupuIdFree
+from app.models.avatar_rendition import AvatarRendition
+from app.models.staged_push import StagedPush
 
 __all__ = [
     "Base",
@@ -22,4 +25,7 @@ __all__ = [
     "Poster",
     "PushLog",
     "PushStatus",
+    "BipupuIdFree",
+    "AvatarRendition",
+    "StagedPush",
 ]
@@ -0,0 +1,26 @@
+"""头像多尺寸版本模型"""
+from sqlalchemy import Column, Integer, String, LargeBinary, UniqueConstraint
+from app.models.base import Base
+
+
+class AvatarRendition(Base):
+    """头像的预生成缩略版本（上传时生成）
+
+    owner_key 区分头像所属：user:{id} / service:{id}；
+    source_hash 为生成时原头像的内容哈希，与当前 avatar_hash 不一致时视为过期。
+    """
+    __tablename__ = "avatar_renditions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_key = Column(String(64), nullable=False, index=True)
+    source_hash = Column(String(32), nullable=False)
+    size = Column(Integer, nullable=False)  # 边长（像素）
+    format = Column(String(8), nullable=False)  # jpeg / webp
+    data = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('owner_key', 'size', 'format', name='unique_avatar_rendition'),
+    )
+
+    def __repr__(self):
+        return f"<AvatarRendition(owner_key='{self.owner_key}', size={self.size}, format='{self.format}')>"
@@ -0,0 +1,21 @@
+"""bipupu_id 空闲池模型"""
+from sqlalchemy import Column, Index, String, func
+from app.models.base import Base
+
+
+class BipupuIdFree(Base):
+    """可复用的 bipupu_id（删除用户留下的空洞、未使用的预分配 ID）
+
+    新 ID 由序列 bipupu_id_seq 分配，分配时优先从此表取出空洞复用。
+    """
+    __tablename__ = "bipupu_id_free"
+
+    bipupu_id = Column(String(8), primary_key=True)
+
+    __table_args__ = (
+        # 分配时按 (length, bipupu_id) 取最小的空闲 ID（数值序），索引扫描取第一条，无需排序全表
+        Index('ix_bipupu_id_free_length_id', func.length(bipupu_id), bipupu_id),
+    )
+
+    def __repr__(self):
+        return f"<BipupuIdFree(bipupu_id='{self.bipupu_id}')>"
@@ -9,10 +9,11 @@ class Favorite(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    message_id = Column(Integer, ForeignKey("messages.id"), nullable=False, index=True)
+    # messages 为分区表（主键含 created_at），无法建立数据库外键
+    message_id = Column(Integer, nullable=False, index=True)
     note = Column(String(255), nullable=True)  # 收藏备注
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # 关系
     user = relationship("User", back_populates="favorites")
-    message = relationship("Message")
+    message = relationship("Message", primaryjoin="Favorite.message_id == Message.id", foreign_keys=[message_id])
@@ -22,7 +22,7 @@ class Message(Base):
     __tablename__ = "messages"
 
     # 主键
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)  # 复合主键中需显式声明自增
 
     # 消息内容
     content = Column(Text, nullable=False)
@@ -42,14 +42,19 @@ class Message(Base):
     # 相比普通JSON，JSONB在PostgreSQL中存储效率更高，解析更快
     waveform = Column(JSONB, nullable=True)
 
-    # 时间戳
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    # 时间戳（分区键，与 id 组成主键）
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True, primary_key=True)
 
     # 复合索引 - 优化查询
     __table_args__ = (
         Index('idx_receiver_created', 'receiver_bipupu_id', 'created_at'),
         Index('idx_sender_created', 'sender_bipupu_id', 'created_at'),
         Index('idx_msg_type', 'message_type', 'created_at'),
+        # 游标分页：WHERE receiver/sender = ? AND id < ? ORDER BY id DESC
+        Index('idx_receiver_id', 'receiver_bipupu_id', 'id'),
+        Index('idx_sender_id', 'sender_bipupu_id', 'id'),
+        # 按月范围分区（app.db.partitions 维护分区与保留期）
+        {'postgresql_partition_by': 'RANGE (created_at)'},
     )
 
     def __repr__(self):
@@ -1,6 +1,7 @@
 """海报轮播模型 - 极简版本，使用base64存储图像"""
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, LargeBinary
 from sqlalchemy.sql import func
+from sqlalchemy.orm import deferred, validates
 from app.models.base import Base
 from typing import Optional, Dict, Any
 
@@ -15,8 +16,9 @@ class Poster(Base):
     # 基础信息
     title = Column(String(100), nullable=False, comment="海报标题")
 
-    # 图像存储 - 仿照avatar_data使用LargeBinary
-    image_data = Column(LargeBinary, nullable=False, comment="海报图像数据（base64编码）")
+    # 图像存储 - 仿照avatar_data使用LargeBinary，延迟加载，仅图片接口读取
+    image_data = deferred(Column(LargeBinary, nullable=False, comment="海报图像数据（base64编码）"))
+    image_hash = Column(String(32), nullable=True, comment="图像内容哈希，写入 image_data 时自动计算")
 
     # 链接信息
     link_url = Column(String(500), nullable=True, comment="点击跳转链接")
@@ -32,6 +34,21 @@ class Poster(Base):
     def __repr__(self):
         return f"<Poster(id={self.id}, title='{self.title}', active={self.is_active})>"
 
+    @validates("image_data")
+    def _set_image_hash(self, key, value):
+        from app.services.storage_service import StorageService
+        self.image_hash = StorageService.get_content_hash(value) if value else None
+        return value
+
+    @property
+    def image_url(self) -> Optional[str]:
+        """图片URL（按内容哈希版本化，内容不变则 URL 不变，可永久缓存）"""
+        if not self.id:
+            return None
+        if self.image_hash:
+            return f"/api/posters/{self.id}/image/{self.image_hash}"
+        return f"/api/posters/{self.id}/image"
+
     def model_dump(self, **kwargs) -> Dict[str, Any]:
         """将模型转换为字典 - 传统方案，兼容Pydantic v2
         
@@ -41,7 +58,7 @@ class Poster(Base):
             'id': self.id,
             'title': self.title,
             'link_url': self.link_url,
-            'image_url': f"/api/posters/{self.id}/image" if self.id else None,
+            'image_url': self.image_url,
             'display_order': self.display_order,
             'is_active': self.is_active,
             'created_at': self.created_at,
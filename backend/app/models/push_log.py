@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Index, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, Enum, text
 from sqlalchemy.dialects.postgresql import JSONB  # 针对 PG 的优化
 from sqlalchemy.sql import func
 from app.models.base import Base
@@ -14,7 +14,7 @@ class PushStatus(str, enum.Enum):
 class PushLog(Base):
     __tablename__ = "push_logs"
 
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)  # 复合主键中需显式声明自增
 
     # 推送基本信息
     service_name = Column(String(100), nullable=False) # 移除 index=True，由复合索引涵盖
@@ -41,9 +41,10 @@ class PushLog(Base):
     # 使用 JSONB 以获得更好的 PG 性能
     extra_data = Column(JSONB, nullable=True) 
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, primary_key=True)  # 分区键
     started_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
+    next_retry_at = Column(DateTime(timezone=True), nullable=True)  # 非空即在重试队列中（app.services.push.retry）
     
     __table_args__ = (
         # 1. 查找某个服务的推送历史
@@ -54,6 +55,10 @@ class PushLog(Base):
         Index('idx_push_status_created', 'status', 'created_at'),
         # 4. 根据任务 ID 精确查找
         Index('idx_push_task_id', 'task_id'),
+        # 5. 重试队列：只索引待重试的行，已结束的记录不进入索引
+        Index('ix_push_logs_next_retry_at', 'next_retry_at', postgresql_where=text('next_retry_at IS NOT NULL')),
+        # 按月范围分区，保留期清理为整块删除分区（app.db.partitions）
+        {'postgresql_partition_by': 'RANGE (created_at)'},
     )
 
     def __repr__(self):
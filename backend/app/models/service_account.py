@@ -1,7 +1,7 @@
 """服务号模型 - 增强版本，支持推送时间设置"""
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, LargeBinary, JSON, Table, ForeignKey, Time
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, Boolean, LargeBinary, JSON, Table, ForeignKey, Time, Index
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred, column_property, validates
 from app.models.base import Base
 
 # 增强的订阅关联表 - 支持推送时间设置
@@ -10,8 +10,11 @@ subscription_table = Table('subscriptions', Base.metadata,
     Column('service_account_id', Integer, ForeignKey('service_accounts.id'), primary_key=True),
     Column('push_time', Time, nullable=True),  # 推送时间，格式: HH:MM:SS
     Column('is_enabled', Boolean, default=True),  # 是否启用推送
+    # 生效推送时间换算到 UTC 的当日分钟数（0-1439），由 push.utils.refresh_push_slots 维护
+    Column('utc_push_minute', SmallInteger, nullable=True),
     Column('created_at', DateTime(timezone=True), server_default=func.now()),
-    Column('updated_at', DateTime(timezone=True), onupdate=func.now())
+    Column('updated_at', DateTime(timezone=True), onupdate=func.now()),
+    Index('ix_subscriptions_utc_push_minute', 'utc_push_minute')
 )
 
 class ServiceAccount(Base):
@@ -21,7 +24,9 @@ class ServiceAccount(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), unique=True, index=True, nullable=False) # 全局唯一服务名，如 cosmic.fortune
     description = Column(String(255), nullable=True)
-    avatar_data = Column(LargeBinary, nullable=True)
+    avatar_data = deferred(Column(LargeBinary, nullable=True))  # 延迟加载，仅头像接口读取
+    has_avatar = column_property(avatar_data.columns[0].isnot(None))
+    avatar_hash = Column(String(32), nullable=True)  # 头像内容哈希
     bot_logic = Column(JSON, nullable=True)  # 存储bot逻辑的配置
     is_active = Column(Boolean, default=True)
     default_push_time = Column(Time, nullable=True)  # 默认推送时间
@@ -37,10 +42,18 @@ class ServiceAccount(Base):
         back_populates="subscriptions"
     )
 
+    @validates("avatar_data")
+    def _set_avatar_hash(self, key, value):
+        from app.services.storage_service import StorageService
+        self.avatar_hash = StorageService.get_content_hash(value) if value else None
+        return value
+
     @property
     def avatar_url(self):
-        """生成头像URL"""
-        if self.avatar_data:
+        """生成头像URL（按内容哈希版本化）"""
+        if self.avatar_hash:
+            return f"/api/service_accounts/{self.name}/avatar/{self.avatar_hash}"
+        if self.has_avatar:
             return f"/api/service_accounts/{self.name}/avatar"
         return None
 
@@ -102,6 +115,8 @@ class ServiceAccount(Base):
                 )
 
                 db.execute(stmt)
+                from app.services.push.utils import refresh_push_slots
+                refresh_push_slots(db, user_id=user_id, service_account_id=self.id)
                 db.commit()
                 # 执行成功即返回True
                 return True
@@ -0,0 +1,32 @@
+"""预生成推送模型"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.models.base import Base
+
+
+class StagedPush(Base):
+    """低峰期预生成的定时推送，由释放任务在推送时间槽按速率发布
+
+    released_at 为空表示待发布；订阅推送时间槽变化时删除对应的待发布记录。
+    """
+    __tablename__ = "staged_pushes"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    service_account_id = Column(Integer, nullable=False)
+    service_name = Column(String(100), nullable=False)
+    receiver_bipupu_id = Column(String(50), nullable=False)
+    content = Column(Text, nullable=False)
+
+    scheduled_for = Column(DateTime(timezone=True), nullable=False)  # 推送时间槽（UTC）
+    release_at = Column(DateTime(timezone=True), nullable=False)  # 时间槽 + 抖动
+    released_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'service_account_id', 'scheduled_for', name='unique_staged_push'),
+        Index('ix_staged_pushes_pending_release_at', 'release_at', postgresql_where=released_at.is_(None)),
+    )
+
+    def __repr__(self):
+        return f"<StagedPush(service='{self.service_name}', receiver='{self.receiver_bipupu_id}', release_at={self.release_at})>"
@@ -1,9 +1,12 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, LargeBinary, Date, UniqueConstraint
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred, column_property, validates
 from typing import Optional
 from app.models.base import Base
 
+# 公共头像接口路径（/api + users 路由前缀 /users + 路由 /users/{bipupu_id}/avatar，见 app.api.routes.users）
+USER_AVATAR_PATH = "/api/users/users/{bipupu_id}/avatar"
+
 
 class User(Base):
     """用户模型"""
@@ -13,7 +16,11 @@ class User(Base):
     bipupu_id = Column(String(8), unique=True, index=True, nullable=False)  # 8位纯数字ID
     username = Column(String(50), unique=True, index=True, nullable=False)
     nickname = Column(String(50), nullable=True)
-    avatar_data = Column(LargeBinary, nullable=True)  # 存储图像二进制数据
+    # 存储图像二进制数据：延迟加载，仅头像接口显式 undefer，用户列表/鉴权等查询不读取
+    avatar_data = deferred(Column(LargeBinary, nullable=True))
+    # 是否有头像（SELECT 中计算 IS NOT NULL，不读取图像数据）
+    has_avatar = column_property(avatar_data.columns[0].isnot(None))
+    avatar_hash = Column(String(32), nullable=True)  # 头像内容哈希，写入 avatar_data 时自动计算
     hashed_password = Column(String(255), nullable=False)
 
     # CosmicProfile字段直接作为数据库字段
@@ -62,9 +69,17 @@ class User(Base):
         from datetime import datetime, timezone
         self.last_active = datetime.now(timezone.utc)
 
+    @validates("avatar_data")
+    def _set_avatar_hash(self, key, value):
+        from app.services.storage_service import StorageService
+        self.avatar_hash = StorageService.get_content_hash(value) if value else None
+        return value
+
     @property
     def avatar_url(self) -> Optional[str]:
-        """获取头像URL"""
-        if self.avatar_data is not None:
-            return f"/api/users/{self.bipupu_id}/avatar"
+        """获取头像URL（按内容哈希版本化，内容不变则 URL 不变，可永久缓存）"""
+        if self.avatar_hash:
+            return f"{USER_AVATAR_PATH.format(bipupu_id=self.bipupu_id)}/{self.avatar_hash}"
+        if self.has_avatar:
+            return USER_AVATAR_PATH.format(bipupu_id=self.bipupu_id)
         return None
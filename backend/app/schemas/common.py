@@ -79,6 +79,14 @@ class LiveResponse(BaseModel):
     timestamp: str = Field(..., description="检查时间")
 
 
+class MetricsResponse(BaseModel):
+    """本进程运行指标（管理员）"""
+    timestamp: str = Field(..., description="采集时间")
+    password_hasher: dict = Field(..., description="密码哈希线程池：排队/拒绝数与耗时")
+    blob_cache: dict = Field(..., description="图片二进制缓存：两级命中率与进程内占用")
+    image_processor: dict = Field(..., description="图片处理进程池：排队/拒绝/超时数与各阶段耗时")
+
+
 class ApiInfoResponse(BaseModel):
     """API信息响应"""
     message: str = Field(..., description="欢迎消息")
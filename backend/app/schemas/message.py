@@ -113,11 +113,18 @@ class MessageResponse(BaseModel):
 
 
 class MessageListResponse(BaseModel):
-    """消息列表响应"""
+    """消息列表响应
+
+    游标模式（before_id / after_id）下默认不统计总数，total 为 None；
+    翻页使用 next_cursor：before_id 模式下作为下一次的 before_id，
+    after_id 模式下作为下一次的 after_id。
+    """
     messages: List[MessageResponse] = Field(..., description="消息列表")
-    total: int = Field(..., ge=0, description="总消息数")
+    total: int | None = Field(default=None, ge=0, description="总消息数（游标模式下可选）")
     page: int = Field(..., ge=1, description="当前页码")
     page_size: int = Field(..., ge=1, description="每页数量")
+    has_more: bool = Field(default=False, description="沿翻页方向是否还有更多消息")
+    next_cursor: int | None = Field(default=None, description="下一页游标（消息ID）")
     
     model_config = ConfigDict(
         from_attributes=True,
@@ -126,7 +133,9 @@ class MessageListResponse(BaseModel):
                 "messages": [],
                 "total": 100,
                 "page": 1,
-                "page_size": 20
+                "page_size": 20,
+                "has_more": True,
+                "next_cursor": 1024
             }
         }
     )
@@ -0,0 +1,119 @@
+"""头像多尺寸版本服务
+
+上传头像时预生成 32/64/100 像素的 JPEG 和 WebP 版本（100 像素 JPEG 即原头像），
+头像接口按 size 参数与 Accept 头选择最合适的版本，联系人/收件箱列表无需下载原图再缩放。
+"""
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.avatar_rendition import AvatarRendition
+from app.services.storage_service import (
+    StorageService,
+    AVATAR_MAX_SIZE,
+    AVATAR_RENDITION_SIZES,
+)
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class AvatarRenditionService:
+    """头像多尺寸版本服务类"""
+
+    @staticmethod
+    def user_key(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def service_key(service_id: int) -> str:
+        return f"service:{service_id}"
+
+    @staticmethod
+    async def save_renditions(db: Session, owner_key: str, avatar_data: bytes) -> None:
+        """生成并保存头像的多尺寸版本（替换旧版本，调用方负责提交事务）
+
+        生成失败不影响头像上传，接口会回退到原头像。
+        """
+        try:
+            renditions = await StorageService.build_avatar_renditions(avatar_data)
+        except Exception as e:
+            logger.warning(f"生成头像多尺寸版本失败（非致命）: {owner_key}, {e}")
+            return
+
+        source_hash = StorageService.get_content_hash(avatar_data)
+        AvatarRenditionService.delete_renditions(db, owner_key)
+        db.add_all([
+            AvatarRendition(
+                owner_key=owner_key,
+                source_hash=source_hash,
+                size=size,
+                format=fmt,
+                data=data,
+            )
+            for (size, fmt), data in renditions.items()
+        ])
+
+    @staticmethod
+    def get_rendition(
+        db: Session, owner_key: str, source_hash: str, size: int, fmt: str
+    ) -> Optional[bytes]:
+        """读取与当前头像匹配的版本，不存在或已过期时返回 None"""
+        return db.query(AvatarRendition.data).filter(
+            AvatarRendition.owner_key == owner_key,
+            AvatarRendition.source_hash == source_hash,
+            AvatarRendition.size == size,
+            AvatarRendition.format == fmt,
+        ).scalar()
+
+    @staticmethod
+    def delete_renditions(db: Session, owner_key: str) -> None:
+        db.query(AvatarRendition).filter(
+            AvatarRendition.owner_key == owner_key
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def negotiate(size: Optional[int], accept: Optional[str]) -> Tuple[int, str]:
+        """选择版本：不小于请求尺寸的最小边长；客户端接受 WebP 时优先 WebP"""
+        chosen = AVATAR_MAX_SIZE
+        if size is not None:
+            for candidate in sorted(AVATAR_RENDITION_SIZES):
+                if candidate >= size:
+                    chosen = candidate
+                    break
+        fmt = "webp" if accept and "image/webp" in accept else "jpeg"
+        return chosen, fmt
+
+    @staticmethod
+    async def serve_avatar(
+        request,
+        db: Session,
+        owner_key: str,
+        cache_key: str,
+        content_hash: str,
+        load_original: Callable[[], Optional[bytes]],
+        size: Optional[int] = None,
+        immutable: bool = False
+    ):
+        """按 size 参数与 Accept 头响应头像版本，缺少对应版本时回退到原头像"""
+        rendition_size, fmt = AvatarRenditionService.negotiate(size, request.headers.get("accept"))
+        headers = {"Vary": "Accept"}
+
+        if rendition_size == AVATAR_MAX_SIZE and fmt == "jpeg":
+            return await StorageService.serve_image(
+                request, content_hash, load_original,
+                cache_key=cache_key, immutable=immutable, headers=headers
+            )
+
+        variant = f"{rendition_size}.{fmt}"
+
+        def load_rendition():
+            return AvatarRenditionService.get_rendition(
+                db, owner_key, content_hash, rendition_size, fmt
+            ) or load_original()
+
+        return await StorageService.serve_image(
+            request, content_hash, load_rendition,
+            cache_key=f"{cache_key}:{variant}", immutable=immutable,
+            headers=headers, variant=variant
+        )
@@ -0,0 +1,131 @@
+"""bipupu_id 分配器
+
+替代逐个扫描全部已用 ID 的做法，单次分配为 O(1)，并发下不会冲突：
+
+1. 空洞复用：从 bipupu_id_free 表取最小的空闲 ID
+   （DELETE ... FOR UPDATE SKIP LOCKED RETURNING，并发请求互不等待、不会取到同一个）
+   与用户插入在同一事务中，插入失败回滚后 ID 自动回到空闲池
+2. 新 ID：从 PostgreSQL 序列 bipupu_id_seq 取号，每个进程按批预分配（BIPUPU_ID_BATCH_SIZE）
+3. 释放：删除用户、插入失败、进程退出时未用完的预分配 ID 放回空闲池
+
+ID 位数由 BIPUPU_ID_WIDTH 控制（默认 4 位）。号段用尽时调大位数即可继续分配，
+已有的短 ID 不受影响（users.bipupu_id 列宽 8 位）。
+"""
+import threading
+from collections import deque
+from typing import Deque, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class BipupuIdExhausted(ValueError):
+    """当前位数的 ID 已用尽"""
+
+
+class BipupuIdAllocator:
+    """进程级 bipupu_id 分配器"""
+
+    SEQUENCE = "bipupu_id_seq"
+    MAX_WIDTH = 8
+
+    def __init__(self, width: int = 4, batch_size: int = 1):
+        if not 1 <= width <= self.MAX_WIDTH:
+            raise ValueError(f"BIPUPU_ID_WIDTH 必须在 1-{self.MAX_WIDTH} 之间")
+        self.width = width
+        self.batch_size = max(1, batch_size)
+        self._reserved: Deque[int] = deque()
+        self._lock = threading.Lock()
+
+    def format(self, number: int) -> str:
+        if number >= 10 ** self.width:
+            raise BipupuIdExhausted(f"ID pool exhausted: 所有 {self.width} 位数字 ID 已用尽")
+        return f"{number:0{self.width}d}"
+
+    def allocate(self, db: Session) -> str:
+        """分配一个 bipupu_id（在调用方事务中执行）"""
+        reused = self._take_free(db)
+        if reused is not None:
+            return reused
+
+        with self._lock:
+            if not self._reserved:
+                self._reserved.extend(self._reserve_from_sequence(db, self.batch_size))
+            number = self._reserved.popleft()
+        return self.format(number)
+
+    def release(self, db: Session, bipupu_ids: Iterable[str]) -> None:
+        """将 ID 放回空闲池（已被用户占用的 ID 会被忽略）
+
+        调用方负责提交事务。
+        """
+        ids = [str(bipupu_id) for bipupu_id in bipupu_ids if str(bipupu_id).isdigit()]
+        if not ids:
+            return
+        self._put_free(db, ids)
+
+    def release_reserved(self, db: Session) -> int:
+        """进程退出时归还未用完的预分配 ID"""
+        with self._lock:
+            numbers = list(self._reserved)
+            self._reserved.clear()
+        ids = []
+        for number in numbers:
+            try:
+                ids.append(self.format(number))
+            except BipupuIdExhausted:
+                continue
+        if ids:
+            self._put_free(db, ids)
+            db.commit()
+        return len(ids)
+
+    # ============ 数据库操作 ============
+
+    def _take_free(self, db: Session) -> Optional[str]:
+        row = db.execute(text(
+            """
+            DELETE FROM bipupu_id_free
+            WHERE bipupu_id = (
+                SELECT bipupu_id FROM bipupu_id_free
+                ORDER BY length(bipupu_id), bipupu_id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING bipupu_id
+            """
+        )).first()
+        return str(row[0]) if row else None
+
+    def _reserve_from_sequence(self, db: Session, count: int) -> List[int]:
+        rows = db.execute(
+            text(f"SELECT nextval('{self.SEQUENCE}') FROM generate_series(1, :count)"),
+            {"count": count},
+        ).all()
+        return sorted(int(row[0]) for row in rows)
+
+    def _put_free(self, db: Session, bipupu_ids: List[str]) -> None:
+        for bipupu_id in bipupu_ids:
+            db.execute(
+                text(
+                    """
+                    INSERT INTO bipupu_id_free (bipupu_id)
+                    SELECT :bipupu_id
+                    WHERE NOT EXISTS (SELECT 1 FROM users WHERE bipupu_id = :bipupu_id)
+                    ON CONFLICT DO NOTHING
+                    """
+                ),
+                {"bipupu_id": bipupu_id},
+            )
+
+
+# 全局单例
+bipupu_id_allocator = BipupuIdAllocator(
+    width=settings.BIPUPU_ID_WIDTH,
+    batch_size=settings.BIPUPU_ID_BATCH_SIZE,
+)
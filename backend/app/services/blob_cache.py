@@ -0,0 +1,119 @@
+"""图片二进制缓存（头像、海报）
+
+两级缓存，键中包含内容哈希，内容不可变，无需失效：
+- L1：进程内 LRU，按字节计量容量（BLOB_CACHE_L1_MAX_BYTES）
+- L2：Redis，经独立的二进制连接池（decode_responses=False）存取原始字节，
+  按 TTL 过期；超过单项上限（BLOB_CACHE_MAX_ITEM_BYTES）的图片两级都不缓存
+
+未命中时由调用方从数据库读取并回填。命中率见 get_stats()。
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.redis import get_binary_redis
+
+logger = get_logger(__name__)
+
+
+class BytesLRU:
+    """按字节计量容量的 LRU"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        self.pop(key)
+        self._entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def pop(self, key: str) -> None:
+        value = self._entries.pop(key, None)
+        if value is not None:
+            self.size -= len(value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class BlobCache:
+    """图片二进制两级缓存"""
+
+    KEY_PREFIX = "blob:"
+
+    def __init__(self, l1_max_bytes: int, max_item_bytes: int, ttl: int):
+        self.max_item_bytes = max_item_bytes
+        self.ttl = ttl
+        self._l1 = BytesLRU(l1_max_bytes)
+        self._stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self._l1.get(key)
+        if value is not None:
+            self._stats["l1_hits"] += 1
+            return value
+
+        try:
+            client = await get_binary_redis()
+            if client is not None:
+                value = await client.get(self.KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning(f"读取图片缓存失败（非致命）: {e}")
+            value = None
+
+        if value is not None:
+            self._stats["l2_hits"] += 1
+            self._l1.set(key, value)
+            return value
+
+        self._stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: bytes) -> None:
+        value = bytes(value)
+        if len(value) > self.max_item_bytes:
+            return
+        self._l1.set(key, value)
+        try:
+            client = await get_binary_redis()
+            if client is not None:
+                await client.set(self.KEY_PREFIX + key, value, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"写入图片缓存失败（非致命）: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """命中率统计"""
+        total = sum(self._stats.values())
+        hits = self._stats["l1_hits"] + self._stats["l2_hits"]
+        return {
+            **self._stats,
+            "hit_rate": hits / total if total else 0.0,
+            "l1_entries": len(self._l1),
+            "l1_bytes": self._l1.size,
+        }
+
+
+# 全局单例
+blob_cache = BlobCache(
+    l1_max_bytes=settings.BLOB_CACHE_L1_MAX_BYTES,
+    max_item_bytes=settings.BLOB_CACHE_MAX_ITEM_BYTES,
+    ttl=settings.BLOB_CACHE_TTL,
+)
@@ -4,10 +4,14 @@
 - 消息列表缓存（收件箱、发件箱）
 - 缓存键生成
 - 缓存失效管理
-- 使用 SCAN 替代 KEYS（防止 Redis 阻塞）
+
+缓存失效采用版本号（generation counter）：
+- 每个用户的 inbox / sent / favorites 各有一个版本号 cache_ver:{scope}:{owner}
+- 缓存键中嵌入当前版本号，失效时只需一次 INCR，不再 SCAN 整个键空间
+- 旧版本的缓存不会再被读取，由 TTL 自然过期
 """
 
-from typing import Optional
+from typing import Any, Optional
 from app.db.redis import get_redis
 from app.schemas.message import MessageListResponse
 from app.core.logging import get_logger
@@ -23,24 +27,56 @@ class CacheService:
     DEFAULT_MESSAGE_TTL = 300  # 消息列表缓存 5 分钟
     DEFAULT_UNREAD_TTL = 60    # 未读计数缓存 1 分钟
     
+    # 版本号作用域
+    SCOPE_INBOX = "inbox"
+    SCOPE_SENT = "sent"
+    SCOPE_FAVORITES = "favorites"
+    
+    @staticmethod
+    def _version_key(scope: str, owner: Any) -> str:
+        return f"cache_ver:{scope}:{owner}"
+    
+    @staticmethod
+    async def get_cache_version(scope: str, owner: Any) -> int:
+        """获取缓存版本号（不存在时为 0）"""
+        try:
+            redis = await get_redis()
+            value = await redis.get(CacheService._version_key(scope, owner))
+            return int(value) if value else 0
+        except Exception as e:
+            logger.error(f"获取缓存版本号失败：{e}")
+            return 0
+    
+    @staticmethod
+    async def bump_cache_version(scope: str, owner: Any) -> int:
+        """递增缓存版本号，使该作用域下的所有缓存键失效（O(1)）"""
+        try:
+            redis = await get_redis()
+            return int(await redis.incr(CacheService._version_key(scope, owner)))
+        except Exception as e:
+            logger.error(f"递增缓存版本号失败：{e}")
+            return 0
+    
     @staticmethod
-    def generate_inbox_cache_key(user_id: int, page: int, page_size: int) -> str:
+    async def generate_inbox_cache_key(user_id: int, page: int, page_size: int) -> str:
         """生成收件箱缓存键"""
-        return f"inbox:user:{user_id}:page{page}:size{page_size}"
+        version = await CacheService.get_cache_version(CacheService.SCOPE_INBOX, user_id)
+        return f"inbox:user:{user_id}:v{version}:page{page}:size{page_size}"
     
     @staticmethod
-    def generate_sent_cache_key(user_id: int, page: int, page_size: int) -> str:
+    async def generate_sent_cache_key(user_id: int, page: int, page_size: int) -> str:
         """生成发件箱缓存键"""
-        return f"sent:user:{user_id}:page{page}:size{page_size}"
+        version = await CacheService.get_cache_version(CacheService.SCOPE_SENT, user_id)
+        return f"sent:user:{user_id}:v{version}:page{page}:size{page_size}"
     
     @staticmethod
-    def generate_message_cache_key(user_id: int, page: int, page_size: int, 
-                                   direction: str = "inbox") -> str:
+    async def generate_message_cache_key(user_id: int, page: int, page_size: int, 
+                                         direction: str = "inbox") -> str:
         """生成消息列表缓存键"""
         if direction == "sent":
-            return CacheService.generate_sent_cache_key(user_id, page, page_size)
+            return await CacheService.generate_sent_cache_key(user_id, page, page_size)
         else:
-            return CacheService.generate_inbox_cache_key(user_id, page, page_size)
+            return await CacheService.generate_inbox_cache_key(user_id, page, page_size)
     
     @staticmethod
     async def get_message_list(cache_key: str) -> Optional[MessageListResponse]:
@@ -80,38 +116,14 @@ class CacheService:
     
     @staticmethod
     async def invalidate_user_message_cache(user_id: int) -> None:
-        """清除用户的所有消息相关缓存 - 使用 SCAN 避免阻塞
+        """清除用户的所有消息相关缓存（收件箱、发件箱、收藏）
         
         Args:
             user_id: 用户 ID
         """
-        try:
-            redis = await get_redis()
-            pattern = f"*:user:{user_id}:*"
-            
-            # ✅ 使用 SCAN 迭代扫描（1C1G 下每次 50 个键）
-            cursor = 0
-            deleted_count = 0
-            
-            while True:
-                cursor, keys = await redis.scan(
-                    cursor=cursor,
-                    match=pattern,
-                    count=50
-                )
-                
-                if keys:
-                    await redis.delete(*keys)
-                    deleted_count += len(keys)
-                
-                if cursor == 0:  # 扫描完成
-                    break
-            
-            if deleted_count > 0:
-                logger.debug(f"已清除用户 {user_id} 的消息缓存，共 {deleted_count} 个")
-                
-        except Exception as e:
-            logger.error(f"清除用户缓存失败：{e}")
+        for scope in (CacheService.SCOPE_INBOX, CacheService.SCOPE_SENT, CacheService.SCOPE_FAVORITES):
+            await CacheService.bump_cache_version(scope, user_id)
+        logger.debug(f"已清除用户 {user_id} 的消息缓存")
     
     @staticmethod
     async def invalidate_message_cache(cache_key: str) -> bool:
@@ -130,34 +142,15 @@ class CacheService:
     
     @staticmethod
     async def invalidate_user_inbox_cache(user_id: int) -> None:
-        """清除用户的收件箱缓存 - 使用 SCAN 避免阻塞"""
-        try:
-            redis = await get_redis()
-            pattern = f"inbox:user:{user_id}:*"
-            
-            # ✅ 使用 SCAN 迭代扫描
-            cursor = 0
-            deleted_count = 0
-            
-            while True:
-                cursor, keys = await redis.scan(
-                    cursor=cursor,
-                    match=pattern,
-                    count=50
-                )
-                
-                if keys:
-                    await redis.delete(*keys)
-                    deleted_count += len(keys)
-                
-                if cursor == 0:
-                    break
-            
-            if deleted_count > 0:
-                logger.debug(f"已清除用户 {user_id} 的收件箱缓存")
-                
-        except Exception as e:
-            logger.error(f"清除收件箱缓存失败：{e}")
+        """清除用户的收件箱缓存"""
+        await CacheService.bump_cache_version(CacheService.SCOPE_INBOX, user_id)
+        logger.debug(f"已清除用户 {user_id} 的收件箱缓存")
+    
+    @staticmethod
+    async def invalidate_user_sent_cache(user_id: int) -> None:
+        """清除用户的发件箱缓存"""
+        await CacheService.bump_cache_version(CacheService.SCOPE_SENT, user_id)
+        logger.debug(f"已清除用户 {user_id} 的发件箱缓存")
     
     @staticmethod
     async def invalidate_unread_cache(user_id: int) -> None:
@@ -1,7 +1,11 @@
-"""消息缓存管理器 - 统一处理消息列表的缓存操作"""
+"""消息缓存管理器 - 统一处理消息列表的缓存操作
+
+缓存键嵌入版本号（与 CacheService 共用 cache_ver:* 计数器），失效时 INCR 版本号即可。
+"""
 
 from typing import Optional, List, Dict, Any
 from app.services.redis_service import RedisService
+from app.services.cache_service import CacheService
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -15,8 +19,15 @@ class MessageCacheManager:
     FAVORITE_CACHE_EXPIRE = 600  # 收藏消息缓存10分钟
     SERVICE_CACHE_EXPIRE = 86400  # 服务号信息缓存24小时
     
+    # 服务号信息为全局缓存，使用固定的版本号归属
+    SERVICE_VERSION_OWNER = "all"
+    
+    @staticmethod
+    def _direction_scope(direction: str) -> str:
+        return CacheService.SCOPE_SENT if direction == "sent" else CacheService.SCOPE_INBOX
+    
     @staticmethod
-    def make_message_cache_key(user_id: int, direction: str, page: int, page_size: int) -> str:
+    async def make_message_cache_key(user_id: int, direction: str, page: int, page_size: int) -> str:
         """构造消息缓存key
         
         Args:
@@ -25,17 +36,24 @@ class MessageCacheManager:
             page: 页码
             page_size: 每页数量
         """
-        return f"user:{user_id}:messages:{direction}:p{page}:ps{page_size}"
+        version = await CacheService.get_cache_version(
+            MessageCacheManager._direction_scope(direction), user_id
+        )
+        return f"user:{user_id}:messages:{direction}:v{version}:p{page}:ps{page_size}"
     
     @staticmethod
-    def make_favorites_cache_key(user_id: int, page: int, page_size: int) -> str:
+    async def make_favorites_cache_key(user_id: int, page: int, page_size: int) -> str:
         """构造收藏消息缓存key"""
-        return f"user:{user_id}:favorites:p{page}:ps{page_size}"
+        version = await CacheService.get_cache_version(CacheService.SCOPE_FAVORITES, user_id)
+        return f"user:{user_id}:favorites:v{version}:p{page}:ps{page_size}"
     
     @staticmethod
-    def make_service_info_cache_key(service_name: str) -> str:
+    async def make_service_info_cache_key(service_name: str) -> str:
         """构造服务号信息缓存key"""
-        return f"service:{service_name}:info"
+        version = await CacheService.get_cache_version(
+            "service_info", MessageCacheManager.SERVICE_VERSION_OWNER
+        )
+        return f"service:{service_name}:v{version}:info"
     
     @staticmethod
     async def get_messages_from_cache(
@@ -53,7 +71,7 @@ class MessageCacheManager:
                 'timestamp': 缓存时间戳
             }
         """
-        cache_key = MessageCacheManager.make_message_cache_key(
+        cache_key = await MessageCacheManager.make_message_cache_key(
             user_id, direction, page, page_size
         )
         cached_data = await RedisService.get_cache_json(cache_key)
@@ -73,7 +91,7 @@ class MessageCacheManager:
         total: int,
     ) -> bool:
         """将消息列表存入缓存"""
-        cache_key = MessageCacheManager.make_message_cache_key(
+        cache_key = await MessageCacheManager.make_message_cache_key(
             user_id, direction, page, page_size
         )
         
@@ -102,7 +120,7 @@ class MessageCacheManager:
         page_size: int,
     ) -> Optional[Dict[str, Any]]:
         """从缓存获取收藏消息"""
-        cache_key = MessageCacheManager.make_favorites_cache_key(user_id, page, page_size)
+        cache_key = await MessageCacheManager.make_favorites_cache_key(user_id, page, page_size)
         return await RedisService.get_cache_json(cache_key)
     
     @staticmethod
@@ -114,7 +132,7 @@ class MessageCacheManager:
         total: int,
     ) -> bool:
         """将收藏消息存入缓存"""
-        cache_key = MessageCacheManager.make_favorites_cache_key(user_id, page, page_size)
+        cache_key = await MessageCacheManager.make_favorites_cache_key(user_id, page, page_size)
         
         from datetime import datetime, timezone
         cache_data = {
@@ -132,7 +150,7 @@ class MessageCacheManager:
     @staticmethod
     async def get_service_info_from_cache(service_name: str) -> Optional[Dict[str, Any]]:
         """从缓存获取服务号信息"""
-        cache_key = MessageCacheManager.make_service_info_cache_key(service_name)
+        cache_key = await MessageCacheManager.make_service_info_cache_key(service_name)
         return await RedisService.get_cache_json(cache_key)
     
     @staticmethod
@@ -141,7 +159,7 @@ class MessageCacheManager:
         service_info: Dict[str, Any],
     ) -> bool:
         """将服务号信息存入缓存"""
-        cache_key = MessageCacheManager.make_service_info_cache_key(service_name)
+        cache_key = await MessageCacheManager.make_service_info_cache_key(service_name)
         return await RedisService.set_cache_json(
             cache_key,
             service_info,
@@ -155,31 +173,34 @@ class MessageCacheManager:
         Args:
             user_id: 用户ID
             direction: 方向，如果为None则失效所有方向的消息缓存
+        
+        Returns:
+            新的版本号（失效多个方向时为最后一个）
         """
         if direction:
-            pattern = f"user:{user_id}:messages:{direction}:*"
+            scopes = [MessageCacheManager._direction_scope(direction)]
         else:
-            pattern = f"user:{user_id}:messages:*"
-        
-        deleted_count = await RedisService.delete_keys_by_pattern(pattern)
+            scopes = [CacheService.SCOPE_INBOX, CacheService.SCOPE_SENT]
         
-        if deleted_count > 0:
-            logger.info(f"Invalidated {deleted_count} message caches for user {user_id}")
+        version = 0
+        for scope in scopes:
+            version = await CacheService.bump_cache_version(scope, user_id)
         
-        return deleted_count
+        logger.info(f"Invalidated message caches for user {user_id} ({', '.join(scopes)})")
+        return version
     
     @staticmethod
     async def invalidate_favorites_cache(user_id: int) -> int:
         """失效用户的所有收藏缓存"""
-        pattern = f"user:{user_id}:favorites:*"
-        return await RedisService.delete_keys_by_pattern(pattern)
+        return await CacheService.bump_cache_version(CacheService.SCOPE_FAVORITES, user_id)
     
     @staticmethod
     async def invalidate_service_cache(service_name: Optional[str] = None) -> int:
         """失效服务号缓存"""
         if service_name:
-            pattern = f"service:{service_name}:info"
-        else:
-            pattern = "service:*:info"
+            cache_key = await MessageCacheManager.make_service_info_cache_key(service_name)
+            return 1 if await RedisService.delete_cache(cache_key) else 0
         
-        return await RedisService.delete_keys_by_pattern(pattern)
+        return await CacheService.bump_cache_version(
+            "service_info", MessageCacheManager.SERVICE_VERSION_OWNER
+        )
@@ -8,16 +8,20 @@
 5. 频率限制和防滥用
 """
 
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional, List, cast
 from datetime import datetime, timedelta, timezone
 from app.models.message import Message
 from app.models.user import User
 from app.models.service_account import ServiceAccount
-from app.schemas.message import MessageCreate
+from app.schemas.message import MessageCreate, MessageResponse, MessageListResponse
 from app.core.websocket import manager
+from app.core.priority import Priority
 from app.core.logging import get_logger
 from app.services.cache_service import CacheService
+from app.services.timeline_cache import TimelineCache
 from app.core.user_utils import is_service_account
 
 logger = get_logger(__name__)
@@ -41,7 +45,7 @@ class MessageService:
         2. 验证接收者存在
         3. 如果接收者是真实用户，检查黑名单
         4. 存入数据库
-        5. WebSocket推送（如果接收者在线）
+        5. 写入消息时间线缓存，WebSocket推送并唤醒长轮询
         6. 清除缓存
         """
 
@@ -123,7 +127,8 @@ class MessageService:
 
         # 异步操作：WebSocket推送和缓存清除
         try:
-            await MessageService._push_to_websocket(message)
+            await TimelineCache.record_message(message)
+            await MessageService.push_new_message(message)
             await MessageService._invalidate_receiver_cache(message.receiver_bipupu_id, db)
         except Exception as e:
             logger.error(f"后置处理失败（非致命）: {e}")
@@ -131,8 +136,12 @@ class MessageService:
         return message
 
     @staticmethod
-    async def _push_to_websocket(message: Message) -> None:
-        """推送消息到 WebSocket（如果接收者在线）"""
+    async def push_new_message(message: Message) -> None:
+        """推送新消息事件（提交后调用）
+
+        经 ConnectionManager 投递到接收者的 WebSocket 连接（跨进程），
+        同时唤醒接收者挂起的长轮询请求。
+        """
         try:
             ws_payload = {
                 "type": "new_message",
@@ -146,9 +155,11 @@ class MessageService:
                 }
             }
 
+            # 用户间消息走高优先级通道，不在服务号批量推送之后排队
             success = await manager.send_personal_message(
                 ws_payload, 
-                str(message.receiver_bipupu_id)
+                str(message.receiver_bipupu_id),
+                Priority.HIGH,
             )
 
             if success:
@@ -175,6 +186,136 @@ class MessageService:
         except Exception as e:
             logger.error(f"清除缓存失败（非致命）: {e}")
 
+    @staticmethod
+    async def get_message_page(
+        db: AsyncSession,
+        bipupu_id: str,
+        direction: str = "received",
+        page: int = 1,
+        page_size: int = 20,
+        since_id: int = 0,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        include_total: Optional[bool] = None
+    ) -> MessageListResponse:
+        """获取收件箱/发件箱消息列表：优先从时间线缓存组装，超出范围或不适用时回源数据库
+
+        增量同步（since_id）与 after_id 游标直接查询数据库，参数含义见 list_messages。
+        """
+        if since_id == 0 and after_id is None:
+            try:
+                response = await TimelineCache.get_page(
+                    db,
+                    bipupu_id,
+                    direction=direction,
+                    page=page,
+                    page_size=page_size,
+                    before_id=before_id,
+                    include_total=include_total if include_total is not None else before_id is None
+                )
+                if response is not None:
+                    return response
+            except Exception as e:
+                logger.warning(f"时间线缓存读取失败，回源数据库: {e}")
+
+        return await MessageService.list_messages(
+            db,
+            bipupu_id,
+            direction=direction,
+            page=page,
+            page_size=page_size,
+            since_id=since_id,
+            before_id=before_id,
+            after_id=after_id,
+            include_total=include_total
+        )
+
+    @staticmethod
+    async def list_messages(
+        db: AsyncSession,
+        bipupu_id: str,
+        direction: str = "received",
+        page: int = 1,
+        page_size: int = 20,
+        since_id: int = 0,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        include_total: Optional[bool] = None
+    ) -> MessageListResponse:
+        """获取收件箱/发件箱消息列表
+
+        两种分页方式：
+        - 页码模式（默认）：OFFSET 分页，兼容旧客户端
+        - 游标模式（传入 before_id 或 after_id）：按 (bipupu_id, id) 键集分页，
+          命中 idx_receiver_id / idx_sender_id，深翻页耗时与历史消息数无关
+
+        结果统一按 id 降序返回（id 单调递增，与创建时间顺序一致）。
+
+        Args:
+            direction: 'received'（收件箱）或 'sent'（发件箱）
+            since_id: 增量同步，只返回 id > since_id 的消息（页码模式）
+            before_id: 游标，返回 id < before_id 的更早消息
+            after_id: 游标，返回 id > after_id 的更新消息（最早的 page_size 条），
+                此时 has_more / next_cursor 指向更新的方向
+            include_total: 是否统计总数；页码模式默认统计，游标模式默认不统计
+        """
+        column = Message.sender_bipupu_id if direction == "sent" else Message.receiver_bipupu_id
+        conditions = [column == bipupu_id]
+
+        cursor_mode = before_id is not None or after_id is not None
+        if include_total is None:
+            include_total = not cursor_mode
+
+        if since_id > 0:
+            conditions.append(Message.id > since_id)
+
+        total = None
+        if include_total:
+            total = (await db.execute(
+                select(func.count(Message.id)).where(*conditions)
+            )).scalar_one()
+
+        query = select(Message).where(*conditions)
+        if cursor_mode:
+            if after_id is not None:
+                # 取紧接游标之后的一段，再翻转为降序
+                rows = (await db.execute(
+                    query.where(Message.id > after_id)
+                    .order_by(Message.id.asc())
+                    .limit(page_size + 1)
+                )).scalars().all()
+                has_more = len(rows) > page_size
+                messages = list(reversed(rows[:page_size]))
+                next_cursor = cast(int, messages[0].id) if has_more else None
+            else:
+                if before_id is not None:
+                    query = query.where(Message.id < before_id)
+                rows = (await db.execute(
+                    query.order_by(Message.id.desc()).limit(page_size + 1)
+                )).scalars().all()
+                has_more = len(rows) > page_size
+                messages = rows[:page_size]
+                next_cursor = cast(int, messages[-1].id) if has_more else None
+            page = 1
+        else:
+            rows = (await db.execute(
+                query.order_by(Message.id.desc())
+                .offset((page - 1) * page_size)
+                .limit(page_size + 1)
+            )).scalars().all()
+            has_more = len(rows) > page_size
+            messages = rows[:page_size]
+            next_cursor = cast(int, messages[-1].id) if has_more else None
+
+        return MessageListResponse(
+            messages=[MessageResponse.model_validate(msg) for msg in messages],
+            total=total,
+            page=page,
+            page_size=page_size,
+            has_more=has_more,
+            next_cursor=next_cursor
+        )
+
     @staticmethod
     async def mark_as_read(
         db: Session,
@@ -209,9 +209,14 @@ class PosterService:
 
     @staticmethod
     def get_poster(db: Session, poster_id: int) -> Optional[Poster]:
-        """获取单个海报"""
+        """获取单个海报（image_data 延迟加载，不随海报信息读取）"""
         return db.query(Poster).filter(Poster.id == poster_id).first()
 
+    @staticmethod
+    def get_poster_image_data(db: Session, poster_id: int) -> Optional[bytes]:
+        """单独读取海报图像数据"""
+        return db.query(Poster.image_data).filter(Poster.id == poster_id).scalar()
+
     @staticmethod
     def get_active_posters(
         db: Session,
@@ -5,10 +5,56 @@
 - CONTENT_REGISTRY 注册表将服务名/前缀映射到生成函数，避免 if/elif 堆叠
 - 新增内置服务只需在 _register_builtin 中添加一行，无需新建文件
 - 真正动态/外部服务的内容由调用方（API 层）传入，ContentGenerator 只处理内置服务
+- 运势/天气按（类型, 种子/城市, 日期）记忆化：同一天种子相同的用户、同一城市的所有订阅者
+  共享一份内容；每次生成使用独立的 random.Random 实例，不触碰全局随机状态，线程安全
+- generate_batch 为一个接收者分块批量生成内容，推送链路使用模块级单例 content_generator
 """
 import random
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Hashable, List, Optional
+
+
+class ContentMemo:
+    """生成内容的有界 LRU 缓存（线程安全）"""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], str]) -> str:
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return content
+            self.misses += 1
+
+        # 生成在锁外进行；并发下同一键可能重复生成，结果相同
+        content = factory()
+        with self._lock:
+            self._entries[key] = content
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return content
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class ContentGenerator:
@@ -77,7 +123,10 @@ class ContentGenerator:
         "重庆": {"climate": "亚热带季风气候", "temp_adjust": 6, "humidity_adjust": 30}
     }
 
+    MEMO_MAX_SIZE = 4096
+
     def __init__(self):
+        self.memo = ContentMemo(self.MEMO_MAX_SIZE)
         # 注册表：服务名（精确匹配）或前缀（以 "." 分割判断）→ 生成函数
         # 函数签名：(self, service_name, user_id, current_time, extra_data) → str
         self._registry: Dict[str, Any] = {}
@@ -110,14 +159,20 @@ class ContentGenerator:
     def generate_fortune(self, user_id: str, current_time: datetime) -> str:
         """生成运势内容（无 emoji，适配嵌入式小屏）。"""
         seed = sum(ord(c) for c in user_id) + current_time.year * 10000 + current_time.month * 100 + current_time.day
-        random.seed(seed)
+        return self.memo.get_or_create(
+            ("fortune", seed, current_time.date()),
+            lambda: self._render_fortune(seed, current_time),
+        )
+
+    def _render_fortune(self, seed: int, current_time: datetime) -> str:
+        rng = random.Random(seed)
 
-        level_name, level_desc = random.choice(self.FORTUNE_LEVELS)
-        selected_areas = random.sample(self.FORTUNE_AREAS, 3)
-        lucky_number = random.randint(1, 99)
+        level_name, level_desc = rng.choice(self.FORTUNE_LEVELS)
+        selected_areas = rng.sample(self.FORTUNE_AREAS, 3)
+        lucky_number = rng.randint(1, 99)
         lucky_colors = ["红色", "金色", "蓝色", "绿色", "紫色", "白色", "黑色"]
-        lucky_color = random.choice(lucky_colors)
-        advice = random.choice([
+        lucky_color = rng.choice(lucky_colors)
+        advice = rng.choice([
             "保持积极心态，好事自然来",
             "今天适合学习新知识或技能",
             "关心身边的人，传递温暖",
@@ -132,7 +187,7 @@ class ContentGenerator:
             "-- 今日运势 --",
         ]
         for area_name, tips in selected_areas:
-            lines.append(f"  {area_name}: {random.choice(tips)}")
+            lines.append(f"  {area_name}: {rng.choice(tips)}")
         lines += [
             "",
             "-- 幸运指南 --",
@@ -146,21 +201,27 @@ class ContentGenerator:
         return "\n".join(lines)
 
     def generate_weather(self, location: str, current_time: datetime) -> str:
-        """生成天气内容（无 emoji，适配嵌入式小屏）。"""
+        """生成天气内容（无 emoji，适配嵌入式小屏）。同一城市同一小时的内容对所有订阅者相同。"""
+        return self.memo.get_or_create(
+            ("weather", location, current_time.date(), current_time.hour),
+            lambda: self._render_weather(location, current_time),
+        )
+
+    def _render_weather(self, location: str, current_time: datetime) -> str:
         city_info = self.CITY_WEATHER.get(location, self.CITY_WEATHER["北京"])
 
         seed = sum(ord(c) for c in location) + current_time.year * 10000 + current_time.month * 100 + current_time.day
-        random.seed(seed)
+        rng = random.Random(seed)
 
-        weather_name, weather_desc = random.choice(self.WEATHER_TYPES)
+        weather_name, weather_desc = rng.choice(self.WEATHER_TYPES)
 
-        base_temp = random.randint(15, 30)
+        base_temp = rng.randint(15, 30)
         temperature = base_temp + city_info["temp_adjust"]
-        base_humidity = random.randint(40, 80)
+        base_humidity = rng.randint(40, 80)
         humidity = max(30, min(95, base_humidity + city_info["humidity_adjust"]))
-        wind_speed = random.randint(1, 5)
+        wind_speed = rng.randint(1, 5)
 
-        aqi = random.randint(20, 150)
+        aqi = rng.randint(20, 150)
         aqi_level = "优" if aqi <= 50 else ("良" if aqi <= 100 else ("轻度污染" if aqi <= 150 else "中度污染"))
 
         weather_advice = {
@@ -191,8 +252,8 @@ class ContentGenerator:
             "-- 未来3小时 --",
         ]
         for i in range(1, 4):
-            hour_temp = temperature + random.randint(-2, 2)
-            hour_trend = random.choice(["持平", "略有变化", "逐渐转好"])
+            hour_temp = temperature + rng.randint(-2, 2)
+            hour_trend = rng.choice(["持平", "略有变化", "逐渐转好"])
             lines.append(f"  {(current_time.hour + i) % 24:02d}:00  {hour_temp} °C  {hour_trend}")
         lines += [
             "",
@@ -246,16 +307,39 @@ class ContentGenerator:
         except Exception as e:
             return f"内容生成失败: {str(e)}"
 
-    def get_service_content(self, service_name: str, user_id: str,
-                           current_time: datetime,
-                           extra_data: Optional[Dict[str, Any]] = None) -> str:
-        """根据服务名从注册表分发内容生成；未注册服务返回默认内容。"""
+    def _resolve(self, service_name: str) -> Optional[Callable[..., str]]:
         # 精确匹配
         if service_name in self._registry:
-            return self._registry[service_name](service_name, user_id, current_time, extra_data)
+            return self._registry[service_name]
         # 前缀匹配（如 notification.xxx）
         for key, fn in self._registry.items():
             if key.endswith(".") and service_name.startswith(key):
-                return fn(service_name, user_id, current_time, extra_data)
+                return fn
+        return None
+
+    def get_service_content(self, service_name: str, user_id: str,
+                           current_time: datetime,
+                           extra_data: Optional[Dict[str, Any]] = None) -> str:
+        """根据服务名从注册表分发内容生成；未注册服务返回默认内容。"""
+        fn = self._resolve(service_name)
+        if fn is not None:
+            return fn(service_name, user_id, current_time, extra_data)
         # 默认兜底
         return f"来自 {service_name} 的推送\n时间: {current_time.strftime('%Y-%m-%d %H:%M')}\n感谢您的订阅。"
+
+    def generate_batch(self, service_name: str, user_ids: List[str],
+                       current_time: datetime,
+                       extra_data: Optional[Dict[str, Any]] = None) -> List[str]:
+        """为一个接收者分块批量生成内容（顺序与 user_ids 一致）。
+
+        注册表只解析一次；运势/天气命中记忆缓存，同一内容键在分块内只渲染一次。
+        """
+        fn = self._resolve(service_name)
+        if fn is None:
+            default = self.get_service_content(service_name, "", current_time, extra_data)
+            return [default] * len(user_ids)
+        return [fn(service_name, user_id, current_time, extra_data) for user_id in user_ids]
+
+
+# 推送链路共享的生成器实例（记忆缓存跨消息、跨分块复用）
+content_generator = ContentGenerator()
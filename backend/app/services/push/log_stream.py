@@ -0,0 +1,294 @@
+"""推送日志写后落库（Redis Stream）
+
+推送热路径不再为每条推送单独提交 PushLog，而是把推送结果追加到 Redis Stream，
+由后台消费者批量写入 push_logs：
+
+- push:logs                     Stream，每条记录一个字段 log（JSON），按 PUSH_LOG_STREAM_MAXLEN 近似裁剪
+- push-log-writers              消费组；API 进程的 PushLogWriter 与 Celery 的 flush_push_logs_task
+                                均以该组消费，空闲超过 CLAIM_IDLE_MS 的未确认记录由其他消费者认领
+
+Redis 不可用（内存缓存降级）或 XADD 失败时写入进程内环形缓冲，由同一进程落库；
+缓冲溢出时丢弃最旧的记录。管理端 /push/logs 直接读取最近的记录。
+"""
+import asyncio
+import itertools
+import json
+import os
+import socket
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.redis import get_redis, MemoryCacheWrapper
+from app.models.push_log import PushLog, PushStatus
+
+logger = get_logger(__name__)
+
+_DATETIME_FIELDS = ("created_at", "started_at", "completed_at", "next_retry_at")
+
+
+def encode_entry(row: Dict[str, Any]) -> str:
+    """PushLog 行（_push_log_row 格式）→ JSON"""
+    entry = dict(row)
+    status = entry.get("status")
+    entry["status"] = status.value if isinstance(status, PushStatus) else status
+    entry.setdefault("created_at", entry.get("completed_at") or entry.get("started_at"))
+    return json.dumps(entry, ensure_ascii=False, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+
+
+def decode_entry(raw: str) -> Dict[str, Any]:
+    """JSON → 可直接 INSERT 的 PushLog 行"""
+    row = json.loads(raw)
+    row["status"] = PushStatus(row["status"])
+    for field in _DATETIME_FIELDS:
+        if row.get(field):
+            row[field] = datetime.fromisoformat(row[field])
+    # 旧格式记录缺少重试字段，补齐以保证同一批 INSERT 的列一致
+    row.setdefault("max_retries", settings.PUSH_RETRY_MAX_ATTEMPTS)
+    row.setdefault("next_retry_at", None)
+    row.setdefault("extra_data", None)
+    return row
+
+
+class PushLogStream:
+    """推送日志 Stream 的写入、读取与批量落库"""
+
+    STREAM_KEY = "push:logs"
+    GROUP = "push-log-writers"
+    FIELD = "log"
+    RING_MAX = 10000           # 进程内环形缓冲容量
+    RECENT_SCAN = 5000         # /push/logs 最多扫描的最近记录数
+    CLAIM_IDLE_MS = 60_000     # 未确认超过该时长的记录可被其他消费者认领
+    MAX_ROUNDS = 20            # 单次 flush 最多读取的批次数
+
+    def __init__(self):
+        self.consumer = f"{socket.gethostname()}:{os.getpid()}"
+        self._ring: Deque[Tuple[int, str]] = deque(maxlen=self.RING_MAX)
+        self._seq = itertools.count(1)
+        self._flushed_seq = 0
+        self._group_ready = False
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    async def record(self, rows: List[Dict[str, Any]]) -> None:
+        """追加推送结果；不抛出异常，日志写入失败不影响推送"""
+        if not rows:
+            return
+        entries = [encode_entry(row) for row in rows]
+        try:
+            redis = await get_redis()
+            if not isinstance(redis, MemoryCacheWrapper):
+                pipe = redis.pipeline(transaction=False)
+                for entry in entries:
+                    pipe.xadd(
+                        self.STREAM_KEY, {self.FIELD: entry},
+                        maxlen=settings.PUSH_LOG_STREAM_MAXLEN, approximate=True,
+                    )
+                await pipe.execute()
+                return
+        except Exception as e:
+            logger.warning(f"推送日志写入 Stream 失败，暂存进程内缓冲: {e}")
+        self._append_ring(entries)
+
+    def _append_ring(self, entries: List[str]) -> None:
+        unflushed = self._ring[-1][0] - self._flushed_seq if self._ring else 0
+        dropped = unflushed + len(entries) - self.RING_MAX
+        if dropped > 0:
+            logger.warning(f"推送日志缓冲已满，{dropped} 条未落库记录被丢弃")
+        for entry in entries:
+            self._ring.append((next(self._seq), entry))
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    async def recent(
+        self,
+        limit: int = 50,
+        skip: int = 0,
+        service_name: Optional[str] = None,
+        receiver_id: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """最近 RECENT_SCAN 条记录（及进程内缓冲）中按条件筛选（新的在前）
+
+        Returns:
+            (当前页, 匹配总数)
+        """
+        raw: List[Tuple[str, str]] = [(f"local-{seq}", entry) for seq, entry in reversed(self._ring)]
+        try:
+            redis = await get_redis()
+            if not isinstance(redis, MemoryCacheWrapper):
+                scanned = await redis.xrevrange(self.STREAM_KEY, count=self.RECENT_SCAN)
+                raw.extend((entry_id, fields.get(self.FIELD)) for entry_id, fields in scanned)
+        except Exception as e:
+            logger.warning(f"读取推送日志 Stream 失败: {e}")
+
+        matches = []
+        for entry_id, entry in raw:
+            if not entry:
+                continue
+            row = json.loads(entry)
+            if service_name and row.get("service_name") != service_name:
+                continue
+            if receiver_id and row.get("receiver_bipupu_id") != receiver_id:
+                continue
+            if status and row.get("status") != status:
+                continue
+            row["id"] = entry_id
+            row.setdefault("retry_count", 0)
+            matches.append(row)
+        matches.sort(key=lambda r: r.get("created_at") or "", reverse=True)
+        return matches[skip:skip + limit], len(matches)
+
+    # ------------------------------------------------------------------
+    # 落库
+    # ------------------------------------------------------------------
+
+    def _pending_ring(self) -> Tuple[List[str], int]:
+        """进程内缓冲中未落库的记录及其最大序号"""
+        pending = [entry for seq, entry in self._ring if seq > self._flushed_seq]
+        return pending, (self._ring[-1][0] if pending else self._flushed_seq)
+
+    def flush_ring(self, db: Session) -> int:
+        """把进程内缓冲中未落库的记录批量写入 push_logs（同步调用方使用）"""
+        pending, last_seq = self._pending_ring()
+        if not pending or not self._insert(db, pending):
+            return 0
+        self._flushed_seq = max(self._flushed_seq, last_seq)
+        return len(pending)
+
+    async def flush(self, db: Session, batch_size: Optional[int] = None) -> int:
+        """消费 Stream（及进程内缓冲）并批量写入 push_logs，返回写入条数
+
+        同步会话的写入在线程池中执行，不阻塞事件循环（API 进程中 WebSocket 投递、长轮询不受影响）；
+        缓冲快照在事件循环线程中取，写入期间新追加的记录留待下次落库。
+        """
+        written = 0
+        pending, last_seq = self._pending_ring()
+        if pending and await asyncio.to_thread(self._insert, db, pending):
+            self._flushed_seq = max(self._flushed_seq, last_seq)
+            written = len(pending)
+        try:
+            redis = await get_redis()
+        except Exception as e:
+            logger.warning(f"推送日志落库获取 Redis 失败: {e}")
+            return written
+        if isinstance(redis, MemoryCacheWrapper):
+            return written
+
+        batch_size = batch_size or settings.PUSH_LOG_FLUSH_BATCH
+        try:
+            await self._ensure_group(redis)
+            # 先认领其他消费者超时未确认的记录（进程退出或落库失败）
+            claimed = await redis.xautoclaim(
+                self.STREAM_KEY, self.GROUP, self.consumer,
+                min_idle_time=self.CLAIM_IDLE_MS, start_id="0-0", count=batch_size,
+            )
+            written += await self._write_batch(redis, db, claimed[1])
+
+            for _ in range(self.MAX_ROUNDS):
+                response = await redis.xreadgroup(
+                    self.GROUP, self.consumer, {self.STREAM_KEY: ">"}, count=batch_size
+                )
+                batch = response[0][1] if response else []
+                if not batch:
+                    break
+                written += await self._write_batch(redis, db, batch)
+                if len(batch) < batch_size:
+                    break
+        except Exception as e:
+            # Stream 被淘汰或 Redis 重启后消费组需要重建
+            self._group_ready = False
+            logger.warning(f"推送日志 Stream 落库失败: {e}")
+        return written
+
+    async def _ensure_group(self, redis) -> None:
+        if self._group_ready:
+            return
+        try:
+            await redis.xgroup_create(self.STREAM_KEY, self.GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def _write_batch(self, redis, db: Session, batch) -> int:
+        if not batch:
+            return 0
+        ids = [entry_id for entry_id, _ in batch]
+        entries = [fields.get(self.FIELD) for _, fields in batch if fields and fields.get(self.FIELD)]
+        if entries and not await asyncio.to_thread(self._insert, db, entries):
+            return 0  # 不确认，CLAIM_IDLE_MS 后重新认领
+        await redis.xack(self.STREAM_KEY, self.GROUP, *ids)
+        return len(entries)
+
+    @staticmethod
+    def _insert(db: Session, entries: List[str]) -> bool:
+        rows = []
+        for entry in entries:
+            try:
+                rows.append(decode_entry(entry))
+            except (TypeError, ValueError, KeyError) as e:
+                logger.error(f"丢弃无法解析的推送日志: {e}: {entry!r}")
+        if not rows:
+            return True
+        try:
+            db.execute(insert(PushLog), rows)
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.error(f"推送日志批量写入失败 ({len(entries)} 条): {e}")
+            return False
+
+
+class PushLogWriter:
+    """API 进程内的后台落库循环，每 PUSH_LOG_FLUSH_INTERVAL 秒消费一次"""
+
+    def __init__(self, stream: PushLogStream):
+        self.stream = stream
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("✅ 推送日志落库任务已启动")
+
+    async def stop(self) -> None:
+        """停止循环并落库剩余记录"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush_once()
+
+    async def flush_once(self) -> int:
+        from app.db.database import SessionLocal
+
+        with SessionLocal() as db:
+            return await self.stream.flush(db)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.PUSH_LOG_FLUSH_INTERVAL)
+            try:
+                written = await self.flush_once()
+                if written:
+                    logger.debug(f"推送日志落库 {written} 条")
+            except Exception as e:
+                logger.warning(f"推送日志落库失败: {e}")
+
+
+push_log_stream = PushLogStream()
+push_log_writer = PushLogWriter(push_log_stream)
@@ -21,7 +21,7 @@ class PushMessage:
     receiver_id: str         # 接收者BIPUPU ID
     content: str             # 消息内容
     message_type: str = "SYSTEM"  # 消息类型
-    priority: int = 1        # 优先级：1-高，2-中，3-低
+    priority: int = 1        # 优先级：1-高，2-中，3-低（app.core.priority.Priority，决定投递通道）
     retry_count: int = 0     # 重试次数
     max_retries: int = 3     # 最大重试次数
     metadata: Dict[str, Any] = field(default_factory=dict)  # 最小化元数据
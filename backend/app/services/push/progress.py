@@ -0,0 +1,105 @@
+"""推送运行进度（Redis）
+
+一次定时推送（某服务号的一个时间窗口）称为一次运行（run），接收者被拆分为多个
+Celery 子任务并行执行，各子任务完成时累加计数，chord 回调汇总后标记完成：
+
+- push:run:{run_id}              运行元数据 JSON（服务号、通道、总人数、分块数、状态、起止时间）
+- push:run:{run_id}:{counter}    chunks_done / success / failed 计数，queue_wait_ms 为各分块在队列中等待的累计毫秒数
+- push:runs                      有序集合，member 为 run_id，score 为开始时间戳，保留最近 RUNS_MAX 次
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from app.db.redis import get_redis
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class PushProgress:
+    """推送运行进度跟踪"""
+
+    RUNS_KEY = "push:runs"
+    RUNS_MAX = 50               # 保留最近的运行记录数
+    PROGRESS_TTL = 86400        # 进度数据保留 1 天
+
+    COUNTERS = ("chunks_done", "success", "failed", "queue_wait_ms")
+
+    @staticmethod
+    def run_key(run_id: str) -> str:
+        return f"push:run:{run_id}"
+
+    @staticmethod
+    def counter_key(run_id: str, counter: str) -> str:
+        return f"push:run:{run_id}:{counter}"
+
+    @staticmethod
+    async def start(run_id: str, service_name: str, total: int, chunks: int,
+                    lane: Optional[str] = None) -> None:
+        """登记一次运行（lane 为所在 Celery 队列）"""
+        redis = await get_redis()
+        started_at = time.time()
+        meta = {
+            "run_id": run_id,
+            "service_name": service_name,
+            "lane": lane,
+            "total": total,
+            "chunks": chunks,
+            "status": "running",
+            "started_at": started_at,
+            "finished_at": None,
+        }
+        await redis.set(PushProgress.run_key(run_id), json.dumps(meta), ex=PushProgress.PROGRESS_TTL)
+        await redis.zadd(PushProgress.RUNS_KEY, {run_id: started_at})
+        await redis.zremrangebyrank(PushProgress.RUNS_KEY, 0, -PushProgress.RUNS_MAX - 1)
+
+    @staticmethod
+    async def record_chunk(run_id: str, success: int, failed: int, queue_wait_ms: int = 0) -> None:
+        """累加一个子任务的结果及其排队等待时间"""
+        redis = await get_redis()
+        for counter, amount in (
+            ("chunks_done", 1), ("success", success), ("failed", failed), ("queue_wait_ms", queue_wait_ms),
+        ):
+            key = PushProgress.counter_key(run_id, counter)
+            await redis.incrby(key, amount)
+            await redis.expire(key, PushProgress.PROGRESS_TTL)
+
+    @staticmethod
+    async def finish(run_id: str, status: str = "completed") -> None:
+        """chord 回调中标记运行结束"""
+        redis = await get_redis()
+        raw = await redis.get(PushProgress.run_key(run_id))
+        if not raw:
+            return
+        meta = json.loads(raw)
+        meta["status"] = status
+        meta["finished_at"] = time.time()
+        await redis.set(PushProgress.run_key(run_id), json.dumps(meta), ex=PushProgress.PROGRESS_TTL)
+
+    @staticmethod
+    async def get_run(run_id: str) -> Optional[Dict[str, Any]]:
+        """读取运行元数据与当前计数"""
+        redis = await get_redis()
+        raw = await redis.get(PushProgress.run_key(run_id))
+        if not raw:
+            return None
+        meta = json.loads(raw)
+        values = await redis.mget([PushProgress.counter_key(run_id, c) for c in PushProgress.COUNTERS])
+        for counter, value in zip(PushProgress.COUNTERS, values):
+            meta[counter] = int(value) if value is not None else 0
+        meta["avg_queue_wait_ms"] = meta["queue_wait_ms"] // meta["chunks_done"] if meta["chunks_done"] else 0
+        return meta
+
+    @staticmethod
+    async def get_recent_runs(limit: int = 10) -> List[Dict[str, Any]]:
+        """最近的运行（新的在前）"""
+        redis = await get_redis()
+        run_ids = await redis.zrevrange(PushProgress.RUNS_KEY, 0, limit - 1)
+        runs = []
+        for run_id in run_ids:
+            run = await PushProgress.get_run(run_id)
+            if run:
+                runs.append(run)
+        return runs
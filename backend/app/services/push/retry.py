@@ -0,0 +1,188 @@
+"""失败推送的退避重试队列
+
+push_logs.next_retry_at 非空即表示该记录在重试队列中（部分索引 ix_push_logs_next_retry_at 只覆盖这些行），
+成功、重试次数用尽的记录 next_retry_at 为空，不会再被扫描：
+
+1. 记录失败时（service_accounts._push_log_row）按退避时间写入 next_retry_at，并在 extra_data 中保存完整内容
+2. 重试任务（subscriptions.retry_failed_pushes，每分钟）按 next_retry_at 顺序领取到期记录
+   （FOR UPDATE SKIP LOCKED，并发任务互不重复），领取时 retry_count + 1，
+   next_retry_at 推迟 LEASE_SECONDS 作为租约，任务中途退出时租约到期后重新领取
+3. 按服务号经 send_push_batch 批量重发（保存了内容的按原内容、其余重新生成，两组各自整组写入），
+   成功的记录标记为 SUCCESS，失败的按新的退避时间重新排队，
+   retry_count 达到 max_retries 后保持 FAILED 并移出队列
+
+退避：PUSH_RETRY_BASE_SECONDS * 2^retry_count，上限 PUSH_RETRY_MAX_DELAY_SECONDS，在 [delay/2, delay] 内随机抖动。
+"""
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, case
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.priority import Priority
+from app.models.push_log import PushLog, PushStatus
+
+logger = get_logger(__name__)
+
+LEASE_SECONDS = 300  # 领取后的租约时长
+
+
+def retry_delay(retry_count: int, rng: random.Random = random) -> float:
+    """第 retry_count 次重试前的等待秒数（指数退避 + 抖动）"""
+    delay = min(settings.PUSH_RETRY_BASE_SECONDS * (2 ** retry_count), settings.PUSH_RETRY_MAX_DELAY_SECONDS)
+    return rng.uniform(delay / 2, delay)
+
+
+def next_retry_at(retry_count: int, max_retries: int, now: datetime) -> Optional[datetime]:
+    """下一次重试时间；重试次数已用尽时返回 None（移出重试队列）"""
+    if retry_count >= max_retries:
+        return None
+    return now + timedelta(seconds=retry_delay(retry_count))
+
+
+def claim_due_retries(
+    db: Session,
+    limit: int,
+    now: Optional[datetime] = None,
+    max_retries: Optional[int] = None,
+) -> List[dict]:
+    """领取至多 limit 条到期的重试记录（同一事务提交）
+
+    Args:
+        max_retries: 额外限制 retry_count 上限（手动重试接口使用）
+
+    Returns:
+        [{"id", "service_name", "receiver_bipupu_id", "content", "retry_count", "max_retries"}, ...]
+    """
+    now = now or datetime.now(timezone.utc)
+    stmt = select(
+        PushLog.id,
+        PushLog.service_name,
+        PushLog.receiver_bipupu_id,
+        PushLog.extra_data,
+        PushLog.retry_count,
+        PushLog.max_retries,
+    ).where(
+        PushLog.next_retry_at <= now,
+    )
+    if max_retries is not None:
+        stmt = stmt.where(PushLog.retry_count < max_retries)
+    rows = db.execute(
+        stmt.order_by(PushLog.next_retry_at).limit(limit).with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        db.commit()
+        return []
+
+    db.execute(
+        update(PushLog)
+        .where(PushLog.id.in_([row.id for row in rows]))
+        .values(
+            status=PushStatus.PROCESSING,
+            retry_count=PushLog.retry_count + 1,
+            next_retry_at=now + timedelta(seconds=LEASE_SECONDS),
+            started_at=now,
+        )
+    )
+    db.commit()
+    return [
+        {
+            "id": row.id,
+            "service_name": row.service_name,
+            "receiver_bipupu_id": row.receiver_bipupu_id,
+            "content": (row.extra_data or {}).get("content"),
+            "retry_count": row.retry_count + 1,
+            "max_retries": row.max_retries,
+        }
+        for row in rows
+    ]
+
+
+def settle_retries(db: Session, succeeded: List[dict], failed: List[dict],
+                   error_message: str, now: Optional[datetime] = None) -> None:
+    """写回重试结果：成功的移出队列，失败的按退避重新排队或在次数用尽后移出"""
+    now = now or datetime.now(timezone.utc)
+    if succeeded:
+        db.execute(
+            update(PushLog)
+            .where(PushLog.id.in_([item["id"] for item in succeeded]))
+            .values(status=PushStatus.SUCCESS, next_retry_at=None, error_message=None, completed_at=now)
+        )
+    if failed:
+        schedule = {item["id"]: next_retry_at(item["retry_count"], item["max_retries"], now) for item in failed}
+        rescheduled = {log_id: at for log_id, at in schedule.items() if at is not None}
+        exhausted = [log_id for log_id, at in schedule.items() if at is None]
+        values = {"status": PushStatus.FAILED, "error_message": error_message, "completed_at": now}
+        if rescheduled:
+            db.execute(
+                update(PushLog)
+                .where(PushLog.id.in_(list(rescheduled)))
+                .values(next_retry_at=case(rescheduled, value=PushLog.id), **values)
+            )
+        if exhausted:
+            db.execute(update(PushLog).where(PushLog.id.in_(exhausted)).values(next_retry_at=None, **values))
+            logger.warning(f"推送重试次数已用尽，移出重试队列: {len(exhausted)} 条")
+    db.commit()
+
+
+async def retry_due_pushes(
+    db: Session,
+    batch_size: Optional[int] = None,
+    time_budget: float = 50.0,
+    max_retries: Optional[int] = None,
+) -> Dict[str, int]:
+    """领取并重发到期的失败推送，直到没有到期记录或用完时间预算"""
+    from app.services.service_accounts import send_push_batch
+
+    batch_size = batch_size or settings.PUSH_RETRY_BATCH_SIZE
+    deadline = time.monotonic() + time_budget
+    stats = {"total_retries": 0, "successful_retries": 0, "failed_retries": 0}
+
+    while time.monotonic() < deadline:
+        claimed = claim_due_retries(db, batch_size, max_retries=max_retries)
+        if not claimed:
+            break
+
+        by_service: Dict[str, List[dict]] = defaultdict(list)
+        for item in claimed:
+            by_service[item["service_name"]].append(item)
+
+        for service_name, items in by_service.items():
+            # 逐条决定：保存了原始内容的按原内容重发，其余重新生成，分两次发送
+            saved = [item for item in items if item["content"]]
+            fresh = [item for item in items if not item["content"]]
+            succeeded: List[dict] = []
+            failed: List[dict] = []
+            for group, contents in ((saved, [item["content"] for item in saved]), (fresh, None)):
+                if not group:
+                    continue
+                messages = await send_push_batch(
+                    db,
+                    service_name,
+                    [item["receiver_bipupu_id"] for item in group],
+                    contents=contents,
+                    task_name="subscriptions.retry_failed_pushes",
+                    # 整组一块写入：要么全部成功（消息按输入顺序返回），要么整组回滚
+                    chunk_size=len(group),
+                    priority=Priority.LOW,
+                    record_logs=False,
+                )
+                if len(messages) == len(group):
+                    succeeded.extend(group)
+                else:
+                    failed.extend(group)
+            settle_retries(db, succeeded, failed, "重试发送失败")
+
+            stats["total_retries"] += len(items)
+            stats["successful_retries"] += len(succeeded)
+            stats["failed_retries"] += len(failed)
+
+        if len(claimed) < batch_size:
+            break
+
+    return stats
@@ -4,6 +4,8 @@
 直接委托给 service_accounts.send_push()，不再引入独立的推送引擎。
 定时推送由 Celery Beat 执行（subscriptions.check_push_times_task），此处不启动任何调度循环。
 """
+import asyncio
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Any
 
@@ -12,6 +14,7 @@ from sqlalchemy.orm import Session
 from app.services import service_accounts
 from app.models.service_account import ServiceAccount
 from app.core.logging import get_logger
+from app.core.priority import Priority, normalize_priority, queue_for
 
 logger = get_logger(__name__)
 
@@ -31,12 +34,13 @@ class PushService:
         service_name: str,
         user_id: str,
         content: Optional[str] = None,
-        priority: int = 2,
+        priority: int = Priority.NORMAL,
     ) -> Dict[str, Any]:
         """向指定用户发送一条推送。content 为 None 时由 service_accounts 自动生成。"""
         try:
             msg = await service_accounts.send_push(
-                self.db, service_name, user_id, content=content
+                self.db, service_name, user_id, content=content,
+                priority=normalize_priority(priority),
             )
             return {
                 "success": True,
@@ -56,20 +60,15 @@ class PushService:
         service_name: str,
         user_ids: List[str],
         content: Optional[str] = None,
-        priority: int = 2,
+        priority: int = Priority.NORMAL,
     ) -> Dict[str, Any]:
-        """批量发送推送（串行，按顺序发送，小并发下最安全可靠）。"""
-        success_count = 0
-        failed_count = 0
-        for user_id in user_ids:
-            try:
-                await service_accounts.send_push(
-                    self.db, service_name, user_id, content=content
-                )
-                success_count += 1
-            except Exception as e:
-                failed_count += 1
-                logger.warning(f"批量推送单条失败: {service_name} -> {user_id}: {e}")
+        """批量发送推送（按 PUSH_BATCH_SIZE 分块，每块一次多行 INSERT 并一次提交）。"""
+        messages = await service_accounts.send_push_batch(
+            self.db, service_name, user_ids, content=content,
+            priority=normalize_priority(priority),
+        )
+        success_count = len(messages)
+        failed_count = len(user_ids) - success_count
 
         return {
             "success": success_count > 0 or len(user_ids) == 0,
@@ -83,14 +82,14 @@ class PushService:
         self,
         service_name: str,
         content: Optional[str] = None,
-        priority: int = 2,
+        priority: int = Priority.NORMAL,
     ) -> Dict[str, Any]:
-        """向服务号所有订阅者广播推送。"""
-        service = self.db.query(ServiceAccount).filter(
-            ServiceAccount.name == service_name
-        ).first()
+        """向服务号所有订阅者广播推送。
 
-        if not service:
+        投递到 priority 对应的 Celery 队列分块执行（进度见 get_push_runs），
+        不占用 API 进程；入队失败（如 broker 不可用）时在当前请求内同步发送。
+        """
+        if not service_accounts.service_exists(self.db, service_name):
             return {
                 "success": False,
                 "error": f"服务不存在: {service_name}",
@@ -99,11 +98,7 @@ class PushService:
                 "failed": 0,
             }
 
-        subscribers = [
-            str(u.bipupu_id)
-            for u in service.subscribers
-            if getattr(u, "bipupu_id", None)
-        ]
+        subscribers = service_accounts.get_subscriber_ids(self.db, service_name)
 
         if not subscribers:
             return {
@@ -114,7 +109,35 @@ class PushService:
                 "failed": 0,
             }
 
-        return await self.send_batch(service_name, subscribers, content, priority)
+        from app.services.push.progress import PushProgress
+        from app.tasks.subscriptions import enqueue_push_run, split_push_run
+
+        priority = normalize_priority(priority)
+        chunks = split_push_run([(0, bipupu_id) for bipupu_id in subscribers])
+        run_id = uuid.uuid4().hex
+        try:
+            await PushProgress.start(run_id, service_name, len(subscribers), len(chunks), lane=queue_for(priority))
+        except Exception as e:
+            logger.warning(f"记录推送进度失败 [{service_name}]: {e}")
+
+        try:
+            # Celery 投递是阻塞 I/O，放到线程中执行
+            await asyncio.to_thread(enqueue_push_run, service_name, chunks, run_id, priority, content)
+        except Exception as e:
+            logger.warning(f"广播入队失败，改为同步发送 [{service_name}]: {e}")
+            try:
+                await PushProgress.finish(run_id, status="inline")
+            except Exception:
+                pass
+            return await self.send_batch(service_name, subscribers, content, priority)
+
+        return {
+            "success": True,
+            "queued": True,
+            "run_id": run_id,
+            "queue": queue_for(priority),
+            "total": len(subscribers),
+        }
 
     # ------------------------------------------------------------------
     # 测试推送
@@ -127,7 +150,7 @@ class PushService:
             f"时间: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M')}\n\n"
             "这是一个测试消息，用于验证推送系统是否正常工作。"
         )
-        return await self.send_push(service_name, user_id, test_content, priority=1)
+        return await self.send_push(service_name, user_id, test_content, priority=Priority.HIGH)
 
     # ------------------------------------------------------------------
     # 手动触发定时推送
@@ -135,32 +158,22 @@ class PushService:
 
     async def check_and_send_scheduled(self) -> Dict[str, Any]:
         """手动触发一次定时推送检查（供 POST /push/scheduled/run 接口调用）。"""
-        from app.services.push.content import ContentGenerator
-        from app.services.push.utils import get_users_for_push_time
+        from app.core.config import settings
+        from app.services.push.utils import get_due_subscriptions
 
         current_time = datetime.now(timezone.utc)
-        content_gen = ContentGenerator()
-        services = self.db.query(ServiceAccount.name).filter(
-            ServiceAccount.is_active.is_(True)
-        ).all()
+        due = get_due_subscriptions(
+            self.db, current_time.hour, current_time.minute,
+            exclude_staged=settings.PUSH_STAGING_ENABLED,
+        )
 
         details = []
-        for (svc_name,) in services:
-            users = get_users_for_push_time(
-                self.db, svc_name, current_time.hour, current_time.minute
+        for svc_name, users in due.items():
+            messages = await service_accounts.send_push_batch(
+                self.db, svc_name, [bipupu_id for _, bipupu_id in users],
+                priority=Priority.LOW,
             )
-            if not users:
-                continue
-            ok = 0
-            for _, bipupu_id in users:
-                content = content_gen.get_service_content(svc_name, bipupu_id, current_time)
-                try:
-                    await service_accounts.send_push(
-                        self.db, svc_name, bipupu_id, content=content
-                    )
-                    ok += 1
-                except Exception as e:
-                    logger.warning(f"[{svc_name}] 手动定时推送失败 -> {bipupu_id}: {e}")
+            ok = len(messages)
             details.append({
                 "service_name": svc_name,
                 "total_users": len(users),
@@ -184,61 +197,27 @@ class PushService:
     # ------------------------------------------------------------------
 
     async def retry_failed(self, max_retries: int = 3) -> Dict[str, Any]:
-        """重试失败的推送（每次最多 100 条）。"""
-        from app.models.push_log import PushLog, PushStatus
-
-        failed_logs = (
-            self.db.query(PushLog)
-            .filter(PushLog.status == PushStatus.FAILED, PushLog.retry_count < max_retries)
-            .limit(100)
-            .all()
-        )
+        """立即执行一轮失败推送重试（只处理 next_retry_at 已到期且 retry_count < max_retries 的记录）。
 
-        if not failed_logs:
-            return {"total_retries": 0, "successful_retries": 0, "failed_retries": 0}
+        日常重试由 subscriptions.retry_failed_pushes 每分钟执行，见 push.retry。
+        """
+        from app.services.push.retry import retry_due_pushes
 
-        ok = 0
-        for log in failed_logs:
-            try:
-                await service_accounts.send_push(
-                    self.db,
-                    str(log.service_name or ""),
-                    str(log.receiver_bipupu_id or ""),
-                )
-                log.status = PushStatus.SUCCESS
-                log.completed_at = datetime.now(timezone.utc)
-                ok += 1
-            except Exception as e:
-                log.error_message = str(e)
-            finally:
-                log.retry_count = (int(log.retry_count) if log.retry_count is not None else 0) + 1
-
-        self.db.commit()
-        logger.info(f"重试完成: 成功 {ok}/{len(failed_logs)}")
-        return {
-            "total_retries": len(failed_logs),
-            "successful_retries": ok,
-            "failed_retries": len(failed_logs) - ok,
-        }
+        result = await retry_due_pushes(self.db, time_budget=20.0, max_retries=max_retries)
+        logger.info(f"重试完成: 成功 {result['successful_retries']}/{result['total_retries']}")
+        return result
 
     async def cleanup_old_logs(self, days: int = 30) -> Dict[str, Any]:
-        """删除早于 N 天的 success/failed 推送日志。"""
-        from app.models.push_log import PushLog
+        """删除整月早于 N 天的推送日志分区（分区元数据操作，不逐行 DELETE）。"""
+        from app.db.partitions import drop_expired_partitions
 
         cutoff = datetime.now(timezone.utc) - timedelta(days=days)
         try:
-            deleted = (
-                self.db.query(PushLog)
-                .filter(
-                    PushLog.created_at < cutoff,
-                    PushLog.status.in_(["success", "failed"]),
-                )
-                .delete()
-            )
-            self.db.commit()
+            removed = drop_expired_partitions(self.db, "push_logs", days)
             return {
                 "success": True,
-                "deleted_count": deleted,
+                "deleted_count": sum(r["rows"] for r in removed),
+                "partitions": [r["partition"] for r in removed],
                 "cutoff_date": cutoff.isoformat(),
                 "timestamp": datetime.now(timezone.utc).isoformat(),
             }
@@ -251,6 +230,16 @@ class PushService:
     # 状态
     # ------------------------------------------------------------------
 
+    async def get_push_runs(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """最近的定时推送运行进度（Celery 分块扇出，见 subscriptions.dispatch_push_run）。"""
+        from app.services.push.progress import PushProgress
+
+        try:
+            return await PushProgress.get_recent_runs(limit)
+        except Exception as e:
+            logger.warning(f"读取推送进度失败: {e}")
+            return []
+
     def get_service_status(self) -> Dict[str, Any]:
         """获取服务状态（供 REST API 使用）。"""
         try:
@@ -261,7 +250,7 @@ class PushService:
                 service_list.append({
                     "name": str(svc.name or ""),
                     "is_active": bool(svc.is_active),
-                    "subscribers": len(svc.subscribers),
+                    "subscribers": service_accounts.get_subscriber_count(self.db, str(svc.name)),
                     "default_push_time": pt.strftime("%H:%M") if pt and hasattr(pt, "strftime") else (str(pt) if pt else None),
                 })
             return {
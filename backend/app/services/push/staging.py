@@ -0,0 +1,234 @@
+"""定时推送预生成与限速发布
+
+服务号默认推送时间集中（如 09:00），到点时内容生成、消息写入、推送日志与 WebSocket 投递
+会在同一分钟内集中爆发。这里把定时推送拆为两个阶段：
+
+1. 预生成（stage_pushes）：低峰期为未来 24 小时内的每个到期订阅生成内容，写入 staged_pushes，
+   发布时间 = 推送时间槽 + [0, PUSH_RELEASE_JITTER_SECONDS) 随机抖动
+2. 发布（release_due_pushes）：每分钟运行，按令牌桶速率（PUSH_RELEASE_RATE，容量 PUSH_RELEASE_BURST）
+   取出已到发布时间的记录（FOR UPDATE SKIP LOCKED），标记已发布后批量写入消息
+
+预生成之后新增的订阅、修改推送时间的订阅（refresh_push_slots 会删除其待发布记录）
+仍由 check_push_times_task 按时间窗口实时发送，已预生成的订阅在时间窗口查询中被排除。
+"""
+import asyncio
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, delete, update, and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.priority import Priority
+from app.models.service_account import ServiceAccount, subscription_table
+from app.models.staged_push import StagedPush
+from app.models.user import User
+from app.services.push.content import content_generator
+
+logger = get_logger(__name__)
+
+STAGE_INSERT_BATCH = 1000
+STAGED_RETENTION = timedelta(days=1)  # 已发布/过期记录保留时间
+
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，capacity 为桶容量（允许的突发量）"""
+
+    def __init__(self, rate: float, capacity: int, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, n: int) -> int:
+        """取出至多 n 个令牌，返回实际取到的数量"""
+        self._refill()
+        granted = min(n, int(self._tokens))
+        self._tokens -= granted
+        return granted
+
+    def wait_time(self, n: int = 1) -> float:
+        """距离桶内有 n 个令牌还需等待的秒数"""
+        self._refill()
+        missing = min(n, self.capacity) - self._tokens
+        return max(0.0, missing / self.rate)
+
+
+def next_slot_time(utc_push_minute: int, now: datetime) -> datetime:
+    """utc_push_minute 在 now 之后（不含）的下一次发生时间"""
+    slot = now.replace(hour=utc_push_minute // 60, minute=utc_push_minute % 60, second=0, microsecond=0)
+    if slot <= now:
+        slot += timedelta(days=1)
+    return slot
+
+
+def stage_pushes(db: Session, now: Optional[datetime] = None) -> int:
+    """预生成未来 24 小时内到期的定时推送（幂等：重复运行不会重复写入）
+
+    Returns:
+        int: 本次新写入的记录数
+    """
+    now = now or datetime.now(timezone.utc)
+    jitter = settings.PUSH_RELEASE_JITTER_SECONDS
+
+    stmt = select(
+        subscription_table.c.user_id,
+        subscription_table.c.service_account_id,
+        subscription_table.c.utc_push_minute,
+        ServiceAccount.name,
+        User.bipupu_id,
+    ).select_from(subscription_table).join(
+        User, User.id == subscription_table.c.user_id
+    ).join(
+        ServiceAccount, ServiceAccount.id == subscription_table.c.service_account_id
+    ).where(and_(
+        subscription_table.c.utc_push_minute.isnot(None),
+        ServiceAccount.is_active.is_(True),
+        subscription_table.c.is_enabled.is_(True) | subscription_table.c.is_enabled.is_(None),
+    ))
+
+    staged = 0
+    rows: List[dict] = []
+    for user_id, service_account_id, utc_push_minute, service_name, bipupu_id in db.execute(stmt).all():
+        if not bipupu_id:
+            continue
+        scheduled_for = next_slot_time(utc_push_minute, now)
+        rows.append({
+            "user_id": user_id,
+            "service_account_id": service_account_id,
+            "service_name": service_name,
+            "receiver_bipupu_id": bipupu_id,
+            "content": content_generator.get_service_content(service_name, bipupu_id, scheduled_for),
+            "scheduled_for": scheduled_for,
+            "release_at": scheduled_for + timedelta(seconds=random.uniform(0, jitter)),
+        })
+        if len(rows) >= STAGE_INSERT_BATCH:
+            staged += _insert_staged(db, rows)
+            rows = []
+    if rows:
+        staged += _insert_staged(db, rows)
+
+    db.commit()
+    return staged
+
+
+def _insert_staged(db: Session, rows: List[dict]) -> int:
+    result = db.execute(
+        pg_insert(StagedPush).values(rows).on_conflict_do_nothing(
+            constraint="unique_staged_push"
+        )
+    )
+    return result.rowcount or 0
+
+
+def cleanup_staged_pushes(db: Session, now: Optional[datetime] = None) -> int:
+    """删除已发布和错过发布时间过久的预生成记录"""
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - STAGED_RETENTION
+    result = db.execute(
+        delete(StagedPush).where(or_(
+            StagedPush.released_at < cutoff,
+            StagedPush.release_at < cutoff,
+        ))
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def claim_due_pushes(db: Session, limit: int, now: Optional[datetime] = None) -> Dict[str, List[Tuple[str, str]]]:
+    """领取至多 limit 条已到发布时间的预生成推送并标记为已发布（同一事务提交）
+
+    订阅已取消或已关闭推送的记录直接删除。并发的发布任务通过 SKIP LOCKED 互不重复领取。
+
+    Returns:
+        {service_name: [(receiver_bipupu_id, content), ...]}
+    """
+    now = now or datetime.now(timezone.utc)
+    staged = db.execute(
+        select(
+            StagedPush.id,
+            StagedPush.service_name,
+            StagedPush.receiver_bipupu_id,
+            StagedPush.content,
+            subscription_table.c.user_id.label("subscribed"),
+            subscription_table.c.is_enabled,
+        ).outerjoin(
+            subscription_table,
+            and_(
+                subscription_table.c.user_id == StagedPush.user_id,
+                subscription_table.c.service_account_id == StagedPush.service_account_id,
+            ),
+        ).where(
+            StagedPush.released_at.is_(None),
+            StagedPush.release_at <= now,
+        ).order_by(StagedPush.release_at).limit(limit).with_for_update(of=StagedPush, skip_locked=True)
+    ).all()
+
+    claimed: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+    released_ids, dropped_ids = [], []
+    for row in staged:
+        if row.subscribed is None or row.is_enabled is False:
+            dropped_ids.append(row.id)
+            continue
+        released_ids.append(row.id)
+        claimed[row.service_name].append((row.receiver_bipupu_id, row.content))
+
+    if released_ids:
+        db.execute(update(StagedPush).where(StagedPush.id.in_(released_ids)).values(released_at=now))
+    if dropped_ids:
+        db.execute(delete(StagedPush).where(StagedPush.id.in_(dropped_ids)))
+    db.commit()
+    return dict(claimed)
+
+
+async def release_due_pushes(
+    db: Session,
+    time_budget: float = 55.0,
+    bucket: Optional[TokenBucket] = None,
+) -> int:
+    """按令牌桶速率发布到期的预生成推送，直到没有到期记录或用完时间预算
+
+    Returns:
+        int: 成功写入的消息数
+    """
+    from app.services.service_accounts import send_push_batch
+
+    bucket = bucket or TokenBucket(settings.PUSH_RELEASE_RATE, settings.PUSH_RELEASE_BURST)
+    deadline = time.monotonic() + time_budget
+    released = 0
+
+    while time.monotonic() < deadline:
+        wait = bucket.wait_time(bucket.capacity)
+        if wait > 0:
+            await asyncio.sleep(min(wait, max(0.0, deadline - time.monotonic())))
+            if time.monotonic() >= deadline:
+                break
+
+        tokens = bucket.take(bucket.capacity)
+        claimed = claim_due_pushes(db, tokens)
+        if not claimed:
+            break
+
+        for service_name, items in claimed.items():
+            messages = await send_push_batch(
+                db,
+                service_name,
+                [bipupu_id for bipupu_id, _ in items],
+                contents=[text for _, text in items],
+                task_name="subscriptions.release_staged_pushes",
+                priority=Priority.LOW,
+            )
+            released += len(messages)
+
+    return released
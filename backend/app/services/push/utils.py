@@ -2,11 +2,16 @@
 
 被任务层（app.tasks.subscriptions）和推送引擎（push.engine）共同使用，
 提取到此处以避免循环依赖和逻辑重复。
+
+推送时间槽：subscriptions.utc_push_minute 保存每个订阅的生效推送时间
+（订阅个人设置 > 服务号默认推送时间）换算到 UTC 后的当日分钟数（0-1439），
+在订阅、修改推送设置、修改时区、修改服务号默认时间及夏令时切换时刷新，
+定时检查只需对该索引列做范围查询。
 """
-from datetime import datetime, timezone
-from typing import List, Tuple
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, delete, exists, and_, or_, bindparam
 from sqlalchemy.orm import Session
 
 from app.core.logging import get_logger
@@ -16,6 +21,194 @@ import pytz
 
 logger = get_logger(__name__)
 
+DEFAULT_TIMEZONE = "Asia/Shanghai"
+MINUTES_PER_DAY = 24 * 60
+PUSH_WINDOW_MINUTES = 15  # 推送时间窗口（±15 分钟）
+
+
+def compute_utc_push_minute(
+    push_time: Optional[time],
+    user_timezone: Optional[str],
+    on_date: date,
+) -> Optional[int]:
+    """将用户本地推送时间换算为指定日期的 UTC 当日分钟数
+
+    Returns:
+        0-1439；未设置推送时间或时区无效时返回 None
+    """
+    if not push_time:
+        return None
+    try:
+        tz = pytz.timezone(user_timezone or DEFAULT_TIMEZONE)
+    except pytz.UnknownTimeZoneError:
+        logger.error(f"无效时区，跳过推送时间槽: {user_timezone}")
+        return None
+    utc_time = tz.localize(datetime.combine(on_date, push_time)).astimezone(timezone.utc)
+    return utc_time.hour * 60 + utc_time.minute
+
+
+def refresh_push_slots(
+    db: Session,
+    user_id: Optional[int] = None,
+    service_account_id: Optional[int] = None,
+    timezones: Optional[Iterable[str]] = None,
+    on_date: Optional[date] = None,
+) -> int:
+    """重新计算订阅的 UTC 推送时间槽，只写回发生变化的行
+
+    不提交事务，由调用方与触发变更的写操作一起提交。
+
+    Args:
+        db: 数据库会话
+        user_id: 仅刷新该用户的订阅
+        service_account_id: 仅刷新该服务号的订阅
+        timezones: 仅刷新这些时区用户的订阅（夏令时切换）
+        on_date: 计算所用的 UTC 日期，默认今天
+
+    Returns:
+        int: 更新的行数
+    """
+    on_date = on_date or datetime.now(timezone.utc).date()
+
+    stmt = select(
+        subscription_table.c.user_id,
+        subscription_table.c.service_account_id,
+        subscription_table.c.utc_push_minute,
+        subscription_table.c.push_time,
+        ServiceAccount.default_push_time,
+        User.timezone,
+    ).join(
+        User, User.id == subscription_table.c.user_id
+    ).join(
+        ServiceAccount, ServiceAccount.id == subscription_table.c.service_account_id
+    )
+    if user_id is not None:
+        stmt = stmt.where(subscription_table.c.user_id == user_id)
+    if service_account_id is not None:
+        stmt = stmt.where(subscription_table.c.service_account_id == service_account_id)
+    if timezones is not None:
+        timezones = list(timezones)
+        if not timezones:
+            return 0
+        stmt = stmt.where(User.timezone.in_(timezones))
+
+    slots: Dict[Tuple[Optional[time], Optional[str]], Optional[int]] = {}
+    changes = []
+    for row in db.execute(stmt).all():
+        key = (row.push_time or row.default_push_time, row.timezone)
+        if key not in slots:
+            slots[key] = compute_utc_push_minute(key[0], key[1], on_date)
+        if slots[key] != row.utc_push_minute:
+            changes.append({
+                "b_user_id": row.user_id,
+                "b_service_account_id": row.service_account_id,
+                "b_utc_push_minute": slots[key],
+            })
+
+    if changes:
+        from app.models.staged_push import StagedPush
+
+        # 时间槽已变化的订阅：删除按旧时间槽预生成的待发布推送，改由时间窗口检查实时发送
+        db.execute(
+            delete(StagedPush).where(
+                StagedPush.user_id == bindparam("b_user_id"),
+                StagedPush.service_account_id == bindparam("b_service_account_id"),
+                StagedPush.released_at.is_(None),
+            ),
+            [{"b_user_id": c["b_user_id"], "b_service_account_id": c["b_service_account_id"]} for c in changes],
+        )
+        db.execute(
+            update(subscription_table)
+            .where(
+                subscription_table.c.user_id == bindparam("b_user_id"),
+                subscription_table.c.service_account_id == bindparam("b_service_account_id"),
+            )
+            .values(utc_push_minute=bindparam("b_utc_push_minute")),
+            changes,
+        )
+    return len(changes)
+
+
+def get_dst_changed_timezones(db: Session, on_date: Optional[date] = None) -> List[str]:
+    """返回在 on_date 前一天与当天之间 UTC 偏移发生变化的订阅用户时区"""
+    on_date = on_date or datetime.now(timezone.utc).date()
+    noon = time(12, 0)
+    rows = db.execute(
+        select(User.timezone).distinct().join(
+            subscription_table, User.id == subscription_table.c.user_id
+        )
+    ).all()
+
+    changed = []
+    for (tz_name,) in rows:
+        try:
+            tz = pytz.timezone(tz_name or DEFAULT_TIMEZONE)
+        except pytz.UnknownTimeZoneError:
+            continue
+        before = tz.localize(datetime.combine(on_date - timedelta(days=1), noon)).utcoffset()
+        after = tz.localize(datetime.combine(on_date, noon)).utcoffset()
+        if before != after:
+            changed.append(tz_name)
+    return changed
+
+
+def _push_window_clause(target_minute: int):
+    """UTC 时间槽 ±PUSH_WINDOW_MINUTES 的范围条件（跨零点时拆为两段）"""
+    column = subscription_table.c.utc_push_minute
+    low = target_minute - PUSH_WINDOW_MINUTES
+    high = target_minute + PUSH_WINDOW_MINUTES
+    if low < 0:
+        return or_(column >= low + MINUTES_PER_DAY, column <= high)
+    if high >= MINUTES_PER_DAY:
+        return or_(column >= low, column <= high - MINUTES_PER_DAY)
+    return column.between(low, high)
+
+
+def get_due_subscriptions(
+    db: Session,
+    target_hour_utc: int,
+    target_minute_utc: int,
+    exclude_staged: bool = False,
+) -> Dict[str, List[Tuple[int, str]]]:
+    """一条语句查询所有活跃服务号在指定 UTC 时间窗口（±15 分钟）内到期的订阅
+
+    Args:
+        exclude_staged: 排除该时间窗口内已预生成（staged_pushes）的订阅，由发布任务负责发送
+
+    Returns:
+        {service_name: [(user_id, bipupu_id), ...]}
+    """
+    stmt = select(
+        ServiceAccount.name,
+        User.id,
+        User.bipupu_id,
+    ).select_from(subscription_table).join(
+        User, User.id == subscription_table.c.user_id
+    ).join(
+        ServiceAccount, ServiceAccount.id == subscription_table.c.service_account_id
+    ).where(and_(
+        _push_window_clause(target_hour_utc * 60 + target_minute_utc),
+        ServiceAccount.is_active.is_(True),
+        subscription_table.c.is_enabled.is_(True) | subscription_table.c.is_enabled.is_(None),
+    ))
+    if exclude_staged:
+        from app.models.staged_push import StagedPush
+
+        target = datetime.now(timezone.utc).replace(
+            hour=target_hour_utc, minute=target_minute_utc, second=0, microsecond=0
+        )
+        window = timedelta(minutes=PUSH_WINDOW_MINUTES)
+        stmt = stmt.where(~exists().where(
+            StagedPush.user_id == subscription_table.c.user_id,
+            StagedPush.service_account_id == subscription_table.c.service_account_id,
+            StagedPush.scheduled_for.between(target - window, target + window),
+        ))
+
+    due: Dict[str, List[Tuple[int, str]]] = {}
+    for service_name, user_id, bipupu_id in db.execute(stmt).all():
+        due.setdefault(service_name, []).append((user_id, bipupu_id))
+    return due
+
 
 def get_users_for_push_time(
     db: Session,
@@ -37,46 +230,18 @@ def get_users_for_push_time(
     Returns:
         List of (user_id, bipupu_id)
     """
-    service = db.query(ServiceAccount).filter(
-        ServiceAccount.name == service_name,
-        ServiceAccount.is_active.is_(True),
-    ).first()
-    if not service:
-        return []
-
     stmt = select(
         User.id,
         User.bipupu_id,
-        User.timezone,
-        subscription_table.c.push_time,
-        ServiceAccount.default_push_time,
     ).join(
         subscription_table, User.id == subscription_table.c.user_id
     ).join(
         ServiceAccount, ServiceAccount.id == subscription_table.c.service_account_id
     ).where(and_(
-        subscription_table.c.service_account_id == service.id,
+        ServiceAccount.name == service_name,
+        ServiceAccount.is_active.is_(True),
+        _push_window_clause(target_hour_utc * 60 + target_minute_utc),
         subscription_table.c.is_enabled.is_(True) | subscription_table.c.is_enabled.is_(None),
     ))
 
-    current_utc = datetime.now(timezone.utc)
-    target_time_utc = current_utc.replace(
-        hour=target_hour_utc, minute=target_minute_utc, second=0, microsecond=0
-    )
-
-    target_users: List[Tuple[int, str]] = []
-    for user_id, bipupu_id, user_timezone, sub_push_time, svc_push_time in db.execute(stmt).all():
-        push_time = sub_push_time or svc_push_time
-        if not push_time:
-            continue
-        try:
-            tz = pytz.timezone(user_timezone or "Asia/Shanghai")
-            user_target_utc = tz.localize(
-                datetime.combine(target_time_utc.date(), push_time)
-            ).astimezone(timezone.utc)
-            if abs((user_target_utc - target_time_utc).total_seconds()) <= 900:
-                target_users.append((user_id, bipupu_id))
-        except Exception as e:
-            logger.error(f"处理用户时区失败 {bipupu_id}: {e}")
-
-    return target_users
+    return [(user_id, bipupu_id) for user_id, bipupu_id in db.execute(stmt).all()]
@@ -12,19 +12,21 @@ class RedisService:
 
     @staticmethod
     async def publish_message(message: Message):
-        """发布新消息通知"""
+        """发布新消息通知
+
+        经投递总线（频道 user:{bipupu_id}:messages）转发到持有接收者
+        WebSocket 连接的 API 进程；同时推送给发送者，用于多端同步。
+        """
         try:
-            redis = await get_redis()
-            # 为接收者发布消息（使用 bipupu_id 作为 channel 识别）
-            channel = f"user:{message.receiver_bipupu_id}:messages"
+            from app.core.priority import Priority
+            from app.core.websocket import manager
 
-            # 构建消息数据
             data = {
-                "event": "new_message",
-                "data": {
+                "type": "new_message",
+                "message": {
                     "id": message.id,
-                    "sender_id": message.sender_bipupu_id,
-                    "receiver_id": message.receiver_bipupu_id,
+                    "sender_bipupu_id": message.sender_bipupu_id,
+                    "receiver_bipupu_id": message.receiver_bipupu_id,
                     "content": message.content,
                     "message_type": str(message.message_type) if message.message_type is not None else None,
                     "created_at": message.created_at.isoformat() if message.created_at is not None else None,
@@ -32,12 +34,11 @@ class RedisService:
                 }
             }
 
-            await redis.publish(channel, json.dumps(data))
-            logger.info(f"Published message {message.id} to channel {channel}")
+            await manager.send_personal_message(data, str(message.receiver_bipupu_id), Priority.HIGH)
+            logger.info(f"Published message {message.id} to {message.receiver_bipupu_id}")
 
             # 同时也为发送者发布（用于多端同步）
-            sender_channel = f"user:{message.sender_bipupu_id}:messages"
-            await redis.publish(sender_channel, json.dumps(data))
+            await manager.send_personal_message(data, str(message.sender_bipupu_id), Priority.HIGH)
 
         except Exception as e:
             logger.error(f"Failed to publish message to Redis: {e}")
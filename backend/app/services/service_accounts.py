@@ -1,11 +1,16 @@
 """服务号推送服务 - 简化版本，只负责发送推送，不处理用户消息"""
 from typing import Optional, List
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.models.message import Message
-from app.models.service_account import ServiceAccount
-from app.models.push_log import PushLog, PushStatus
+from app.models.service_account import ServiceAccount, subscription_table
+from app.models.push_log import PushStatus
+from app.services.timeline_cache import TimelineCache
+from app.services.push.log_stream import push_log_stream
+from app.services.push.retry import next_retry_at
 from app.core.logging import get_logger
+from app.core.priority import Priority
 import asyncio
 from datetime import datetime, timezone
 
@@ -21,6 +26,7 @@ async def send_push(
     message_type: str = "SYSTEM",
     task_id: Optional[str] = None,
     task_name: Optional[str] = None,
+    priority: Priority = Priority.NORMAL,
 ) -> Message:
     """向用户发送服务号推送消息
 
@@ -33,36 +39,23 @@ async def send_push(
         message_type: 消息类型，默认为 SYSTEM
         task_id: Celery任务ID（用于日志追踪）
         task_name: Celery任务名称（用于日志追踪）
+        priority: WebSocket 投递优先级
 
     Returns:
         Message: 创建的消息对象
     """
     from app.core.websocket import manager
 
-    # 创建推送日志记录
-    push_log = PushLog(
-        service_name=service_name,
-        receiver_bipupu_id=receiver_bipupu_id,
-        status=PushStatus.PROCESSING,
-        task_id=task_id,
-        task_name=task_name,
-        started_at=datetime.now(timezone.utc),
-    )
+    started_at = datetime.now(timezone.utc)
 
     try:
         # 如果内容为空，根据服务号类型自动生成
         if content is None:
-            from app.services.push.content import ContentGenerator
-            content = ContentGenerator().get_service_content(
-                service_name, receiver_bipupu_id, datetime.now(timezone.utc)
+            from app.services.push.content import content_generator
+            content = content_generator.get_service_content(
+                service_name, receiver_bipupu_id, started_at
             )
 
-        # 记录内容预览
-        if content:
-            push_log.content_preview = content[:200] if len(content) > 200 else content
-        else:
-            push_log.content_preview = None
-
         # 创建推送消息
         new_message = Message(
             sender_bipupu_id=service_name,
@@ -78,6 +71,9 @@ async def send_push(
 
         logger.info(f"Service push sent: {service_name} -> {receiver_bipupu_id}")
 
+        # 写入收件箱时间线缓存
+        await TimelineCache.record_message(new_message)
+
         # 推送到 WebSocket (确保 receiver_bipupu_id 在线时能收到)
         try:
             ws_message = {
@@ -92,33 +88,198 @@ async def send_push(
                     "created_at": new_message.created_at.isoformat()
                 }
             }
-            await manager.send_personal_message(ws_message, receiver_bipupu_id)
+            await manager.send_personal_message(ws_message, receiver_bipupu_id, priority)
         except Exception as e:
             logger.warning(f"WebSocket push failed: {e}")
 
-        # 更新推送日志为成功
-        push_log.status = PushStatus.SUCCESS
-        push_log.completed_at = datetime.now(timezone.utc)
-        db.add(push_log)
-        db.commit()
+        # 推送日志写入 Redis Stream，由后台消费者批量落库
+        await push_log_stream.record([
+            _push_log_row(service_name, receiver_bipupu_id, content, PushStatus.SUCCESS,
+                          task_id, task_name, started_at, datetime.now(timezone.utc))
+        ])
 
         return new_message
 
     except Exception as e:
-        # 记录失败信息
-        push_log.status = PushStatus.FAILED
-        push_log.error_message = str(e)
-        push_log.completed_at = datetime.now(timezone.utc)
-        db.add(push_log)
-        try:
-            db.commit()
-        except Exception as log_error:
-            logger.error(f"Failed to save push log: {log_error}")
+        db.rollback()
+        await push_log_stream.record([
+            _push_log_row(service_name, receiver_bipupu_id, content, PushStatus.FAILED,
+                          task_id, task_name, started_at, datetime.now(timezone.utc), str(e))
+        ])
 
         logger.error(f"Service push failed: {service_name} -> {receiver_bipupu_id}: {e}")
         raise
 
 
+async def send_push_batch(
+    db: Session,
+    service_name: str,
+    receiver_bipupu_ids: List[str],
+    content: Optional[str] = None,
+    pattern: Optional[dict] = None,
+    message_type: str = "SYSTEM",
+    task_id: Optional[str] = None,
+    task_name: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    contents: Optional[List[str]] = None,
+    priority: Priority = Priority.NORMAL,
+    record_logs: bool = True,
+) -> List[Message]:
+    """批量发送服务号推送
+
+    按 chunk_size（默认 PUSH_BATCH_SIZE）分块，每块：
+    1. 在内存中构建全部消息（contents 为逐个接收者的预生成内容；
+       均为空时由 content_generator.generate_batch 批量生成）
+    2. 一条多行 INSERT ... RETURNING 写入消息，一次提交（返回的消息已移出会话，提交后不会过期回查）
+    3. 提交后写入时间线缓存并经 WebSocket 按 priority 投递，推送日志写入 Redis Stream（见 push.log_stream）
+
+    contents 与 receiver_bipupu_ids 长度不一致时抛出 ValueError（不静默截断）。
+    某块写入失败时回滚该块并批量记录失败日志（失败日志进入重试队列，见 push.retry），继续处理后续块。
+    record_logs=False 时不写推送日志，由调用方更新已有日志（重试任务）。
+
+    Returns:
+        List[Message]: 成功写入的消息（按接收者输入顺序）
+    """
+    from app.core.config import settings
+
+    chunk_size = chunk_size or settings.PUSH_BATCH_SIZE
+    if contents is not None:
+        if len(contents) != len(receiver_bipupu_ids):
+            raise ValueError(
+                f"contents 与接收者数量不一致: {len(contents)} != {len(receiver_bipupu_ids)}"
+            )
+        pairs = [(bipupu_id, text) for bipupu_id, text in zip(receiver_bipupu_ids, contents) if bipupu_id]
+        receivers = [bipupu_id for bipupu_id, _ in pairs]
+        contents = [text for _, text in pairs]
+    else:
+        receivers = [bipupu_id for bipupu_id in receiver_bipupu_ids if bipupu_id]
+    from app.services.push.content import content_generator
+
+    delivered: List[Message] = []
+    for start in range(0, len(receivers), chunk_size):
+        chunk = receivers[start:start + chunk_size]
+        started_at = datetime.now(timezone.utc)
+        if contents is not None:
+            chunk_contents = contents[start:start + chunk_size]
+        elif content is None:
+            chunk_contents = content_generator.generate_batch(service_name, chunk, started_at)
+        else:
+            chunk_contents = [content] * len(chunk)
+
+        try:
+            messages = db.scalars(
+                # 按参数顺序返回，第 i 条消息对应 chunk[i]
+                insert(Message).returning(Message, sort_by_parameter_order=True),
+                [
+                    {
+                        "sender_bipupu_id": service_name,
+                        "receiver_bipupu_id": bipupu_id,
+                        "content": text,
+                        "message_type": message_type,
+                        "pattern": pattern or {},
+                    }
+                    for bipupu_id, text in zip(chunk, chunk_contents)
+                ],
+            ).all()
+            # RETURNING 已带回全部列：提交前移出会话，避免提交时过期、投递时逐条 SELECT 回查
+            for message in messages:
+                db.expunge(message)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Batch push failed: {service_name} -> {len(chunk)} receivers: {e}")
+            if record_logs:
+                await _record_batch_logs(service_name, chunk, chunk_contents, PushStatus.FAILED,
+                                         task_id, task_name, started_at, str(e))
+            continue
+
+        await _fan_out(messages, priority)
+        if record_logs:
+            await _record_batch_logs(service_name, chunk, chunk_contents, PushStatus.SUCCESS,
+                                     task_id, task_name, started_at)
+        delivered.extend(messages)
+
+    logger.info(f"Service batch push sent: {service_name} -> {len(delivered)}/{len(receivers)}")
+    return delivered
+
+
+def _push_log_row(
+    service_name: str,
+    receiver_bipupu_id: str,
+    content: Optional[str],
+    status: PushStatus,
+    task_id: Optional[str],
+    task_name: Optional[str],
+    started_at: datetime,
+    completed_at: datetime,
+    error_message: Optional[str] = None,
+) -> dict:
+    """推送日志行；失败记录保存完整内容并按退避时间进入重试队列"""
+    from app.core.config import settings
+
+    failed = status == PushStatus.FAILED
+    max_retries = settings.PUSH_RETRY_MAX_ATTEMPTS
+    return {
+        "service_name": service_name,
+        "receiver_bipupu_id": receiver_bipupu_id,
+        "content_preview": content[:200] if content else None,
+        "status": status,
+        "error_message": error_message,
+        "task_id": task_id,
+        "task_name": task_name,
+        "started_at": started_at,
+        "completed_at": completed_at,
+        "max_retries": max_retries,
+        "next_retry_at": next_retry_at(0, max_retries, completed_at) if failed else None,
+        "extra_data": {"content": content} if failed and content else None,
+    }
+
+
+async def _record_batch_logs(
+    service_name: str,
+    receivers: List[str],
+    contents: List[Optional[str]],
+    status: PushStatus,
+    task_id: Optional[str],
+    task_name: Optional[str],
+    started_at: datetime,
+    error_message: Optional[str] = None,
+) -> None:
+    """批量记录推送日志（写入 Redis Stream，后台批量落库）"""
+    completed_at = datetime.now(timezone.utc)
+    await push_log_stream.record([
+        _push_log_row(service_name, bipupu_id, text, status,
+                      task_id, task_name, started_at, completed_at, error_message)
+        for bipupu_id, text in zip(receivers, contents)
+    ])
+
+
+async def _fan_out(messages: List[Message], priority: Priority = Priority.NORMAL) -> None:
+    """提交后写入时间线缓存并投递到接收者的 WebSocket 连接（失败不影响已写入的消息）"""
+    from app.core.websocket import manager
+
+    await TimelineCache.record_messages(messages)
+
+    async def _deliver(message: Message) -> None:
+        try:
+            await manager.send_personal_message({
+                "type": "new_message",
+                "message": {
+                    "id": message.id,
+                    "sender_bipupu_id": message.sender_bipupu_id,
+                    "receiver_bipupu_id": message.receiver_bipupu_id,
+                    "content": message.content,
+                    "message_type": str(message.message_type) if message.message_type else None,
+                    "pattern": message.pattern,
+                    "created_at": message.created_at.isoformat()
+                }
+            }, str(message.receiver_bipupu_id), priority)
+        except Exception as e:
+            logger.warning(f"WebSocket push failed: {e}")
+
+    await asyncio.gather(*(_deliver(message) for message in messages))
+
+
 async def broadcast_push(
     db: Session,
     service_name: str,
@@ -142,30 +303,23 @@ async def broadcast_push(
     Returns:
         int: 发送成功的订阅者数量
     """
-    service = db.query(ServiceAccount).filter(ServiceAccount.name == service_name).first()
-    if not service:
+    if not service_exists(db, service_name):
         logger.error(f"Cannot broadcast: Service {service_name} not found")
         return 0
 
-    subscribers = service.subscribers
-    if not subscribers:
+    subscriber_ids = get_subscriber_ids(db, service_name)
+    if not subscriber_ids:
         return 0
 
-    logger.info(f"Broadcasting from {service_name} to {len(subscribers)} subscribers")
-
-    # 并发发送（asyncio.gather 在单线程事件循环中安全，DB session 无并发竞争）
-    tasks = [
-        send_push(db, service_name, user.bipupu_id, content, pattern, message_type, task_id, task_name)
-        for user in subscribers
-        if user.bipupu_id
-    ]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    logger.info(f"Broadcasting from {service_name} to {len(subscriber_ids)} subscribers")
 
-    count = sum(1 for r in results if not isinstance(r, Exception))
-    errors = sum(1 for r in results if isinstance(r, Exception))
+    messages = await send_push_batch(
+        db, service_name, subscriber_ids, content, pattern, message_type, task_id, task_name
+    )
+    errors = len(subscriber_ids) - len(messages)
     if errors:
-        logger.warning(f"Broadcast {service_name}: {errors} failed out of {len(tasks)}")
-    return count
+        logger.warning(f"Broadcast {service_name}: {errors} failed out of {len(subscriber_ids)}")
+    return len(messages)
 
 
 async def broadcast_to_users(
@@ -193,20 +347,21 @@ async def broadcast_to_users(
     Returns:
         int: 发送成功的用户数量
     """
-    from app.models.user import User
-
-    count = 0
     logger.info(f"Batch pushing from {service_name} to {len(user_ids)} users")
 
+    existing = {
+        bipupu_id for (bipupu_id,) in
+        db.query(User.bipupu_id).filter(User.bipupu_id.in_(user_ids)).all()
+    }
     for bipupu_id in user_ids:
-        user = db.query(User).filter(User.bipupu_id == bipupu_id).first()
-        if user:
-            await send_push(db, service_name, bipupu_id, content, pattern, message_type, task_id, task_name)
-            count += 1
-        else:
+        if bipupu_id not in existing:
             logger.warning(f"User {bipupu_id} not found, skip push")
 
-    return count
+    messages = await send_push_batch(
+        db, service_name, [bipupu_id for bipupu_id in user_ids if bipupu_id in existing],
+        content, pattern, message_type, task_id, task_name
+    )
+    return len(messages)
 
 
 def get_subscribers(db: Session, service_name: str) -> List[User]:
@@ -226,6 +381,26 @@ def get_subscribers(db: Session, service_name: str) -> List[User]:
     return service.subscribers
 
 
+def get_subscriber_ids(db: Session, service_name: str) -> List[str]:
+    """获取服务号所有订阅者的 BIPUPU ID（只查询 ID 列，不加载用户对象）
+
+    Args:
+        db: 数据库会话
+        service_name: 服务号名称
+
+    Returns:
+        List[str]: 订阅者 BIPUPU ID 列表
+    """
+    rows = (
+        db.query(User.bipupu_id)
+        .join(subscription_table, subscription_table.c.user_id == User.id)
+        .join(ServiceAccount, ServiceAccount.id == subscription_table.c.service_account_id)
+        .filter(ServiceAccount.name == service_name)
+        .all()
+    )
+    return [str(bipupu_id) for (bipupu_id,) in rows if bipupu_id]
+
+
 def get_subscriber_count(db: Session, service_name: str) -> int:
     """获取服务号的订阅者数量
 
@@ -236,11 +411,14 @@ def get_subscriber_count(db: Session, service_name: str) -> int:
     Returns:
         int: 订阅者数量
     """
-    service = db.query(ServiceAccount).filter(ServiceAccount.name == service_name).first()
-    if not service:
-        return 0
-
-    return len(service.subscribers)
+    from sqlalchemy import func
+
+    return (
+        db.query(func.count(subscription_table.c.user_id))
+        .join(ServiceAccount, ServiceAccount.id == subscription_table.c.service_account_id)
+        .filter(ServiceAccount.name == service_name)
+        .scalar()
+    ) or 0
 
 
 def service_exists(db: Session, service_name: str) -> bool:
@@ -1,9 +1,12 @@
 """图片存储服务 - 简化版本，专注数据库存储"""
 import os
+import tempfile
+import time
 from PIL import Image, ImageFile
 from fastapi import UploadFile
 from io import BytesIO
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple, Union
+from app.core.config import settings
 from app.core.logging import get_logger
 
 # 配置PIL以处理大图片
@@ -18,6 +21,23 @@ AVATAR_MIN_SIZE = 50   # 头像最小尺寸（像素）
 AVATAR_MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB，头像最大文件大小
 AVATAR_QUALITY = 70    # JPEG压缩质量
 AVATAR_ASPECT_RATIO_TOLERANCE = 0.1  # 宽高比容差（10%）
+AVATAR_MAX_DIMENSION = 5000  # 头像原图最大边长
+# 头像预生成版本：边长（不含原尺寸 AVATAR_MAX_SIZE）与格式
+AVATAR_RENDITION_SIZES = (32, 64)
+AVATAR_RENDITION_FORMATS = ("jpeg", "webp")
+AVATAR_WEBP_QUALITY = 70
+POSTER_MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB，海报原图最大文件大小
+POSTER_MAX_DIMENSION = 10000  # 海报原图最大边长
+
+# 上传读取：分块大小；图片头嗅探最多缓存的字节数
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_SNIFF_LIMIT = 256 * 1024
+# 支持的图片签名：JPEG、PNG、GIF、BMP、TIFF（WebP 单独判断 RIFF....WEBP）
+IMAGE_SIGNATURES = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a", b"BM", b"II*\x00", b"MM\x00*")
+
+# 缓存控制：带内容哈希的 URL 内容永不变化，可永久缓存；不带哈希的旧 URL 需要重新验证
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=86400"
 
 
 class StorageService:
@@ -28,15 +48,20 @@ class StorageService:
         """保存用户头像到数据库并进行压缩，返回二进制数据
 
         流程：
-        1. 读取文件内容到内存，验证文件大小
-        2. 验证图片格式、安全性和宽高比（强制1:1）
-        3. 裁剪并压缩图片到正方形（最大100x100像素）
-        4. 转换为JPEG格式，质量70%
-        5. 返回压缩后的二进制数据
+        1. 分块读取上传文件，边读边检查大小与图片头（见 _ingest_upload），
+           大文件落盘到临时文件，内存占用与文件大小无关
+        2. 在图片处理进程池中验证、裁剪并压缩到正方形（最大100x100像素，JPEG 质量70%）
+        3. 返回压缩后的二进制数据
         """
-        # 读取文件内容到内存
-        content = await file.read()
-        return await StorageService.save_avatar_bytes(content)
+        source = await StorageService._ingest_upload(
+            file, AVATAR_MAX_FILE_SIZE, AVATAR_MAX_DIMENSION, "头像文件过大"
+        )
+        try:
+            compressed_data = await StorageService._run_image_job(StorageService._process_avatar, source)
+        finally:
+            StorageService._discard_source(source)
+        logger.info(f"头像处理完成: 压缩后={len(compressed_data)//1024}KB")
+        return compressed_data
 
     @staticmethod
     async def save_avatar_bytes(content: bytes) -> bytes:
@@ -44,17 +69,171 @@ class StorageService:
 
         流程：
         1. 验证文件大小
-        2. 验证图片格式、安全性和宽高比（强制1:1）
-        3. 裁剪并压缩图片到正方形（最大100x100像素）
-        4. 转换为JPEG格式，质量70%
-        5. 返回压缩后的二进制数据
+        2. 在图片处理进程池中解码、裁剪、压缩（不阻塞事件循环），见 _process_avatar
+        3. 返回压缩后的二进制数据
         """
         # 验证文件大小
         if len(content) > AVATAR_MAX_FILE_SIZE:
             raise ValueError(f"头像文件过大，最大支持 {AVATAR_MAX_FILE_SIZE // (1024*1024)}MB")
 
-        # 直接从内存数据解码图片，避免文件系统操作
-        image_buffer = BytesIO(content)
+        compressed_data = await StorageService._run_image_job(StorageService._process_avatar, content)
+        logger.info(f"头像处理完成: 原始={len(content)//1024}KB, 压缩后={len(compressed_data)//1024}KB")
+        return compressed_data
+
+    @staticmethod
+    async def save_poster(file: UploadFile) -> bytes:
+        """保存海报图片到数据库并进行优化，返回二进制数据
+
+        流程：
+        1. 分块读取上传文件，边读边检查大小与图片头，大文件落盘到临时文件
+        2. 在图片处理进程池中解码、缩放、压缩（不阻塞事件循环），见 _process_poster
+        3. 返回优化后的二进制数据
+        """
+        source = await StorageService._ingest_upload(
+            file, POSTER_MAX_FILE_SIZE, POSTER_MAX_DIMENSION, "图片文件过大"
+        )
+        try:
+            compressed_data = await StorageService._run_image_job(StorageService._process_poster, source)
+        finally:
+            StorageService._discard_source(source)
+        logger.debug(f"海报图片优化完成: 优化后={len(compressed_data)//1024}KB")
+        return compressed_data
+
+    @staticmethod
+    async def _ingest_upload(
+        file: UploadFile,
+        max_bytes: int,
+        max_dimension: int,
+        too_large_message: str
+    ) -> Union[bytes, str]:
+        """分块读取上传文件
+
+        - 超过 max_bytes 立即中止，不再继续读取
+        - 首批数据到达后检查图片签名和图片头中的尺寸，非图片或尺寸过大提前拒绝
+        - 不超过 UPLOAD_SPOOL_THRESHOLD 的文件留在内存，超过后写入临时文件
+
+        Returns:
+            图片数据（bytes）或临时文件路径（str，调用方处理完后用 _discard_source 删除）
+        """
+        limit_message = f"{too_large_message}，最大支持 {max_bytes // (1024*1024)}MB"
+        if file.size is not None and file.size > max_bytes:
+            raise ValueError(limit_message)
+
+        spool_threshold = settings.UPLOAD_SPOOL_THRESHOLD
+        buffer = bytearray()
+        head = bytearray()
+        header_checked = False
+        temp_file = None
+        total = 0
+
+        try:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_bytes:
+                    raise ValueError(limit_message)
+
+                if not header_checked:
+                    head += chunk
+                    header_checked = StorageService._check_image_header(bytes(head), max_dimension)
+                    if header_checked:
+                        head = bytearray()
+
+                if temp_file is None and total > spool_threshold:
+                    temp_file = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".img", delete=False)
+                    temp_file.write(buffer)
+                    buffer = bytearray()
+                if temp_file is not None:
+                    temp_file.write(chunk)
+                else:
+                    buffer += chunk
+
+            if total == 0:
+                raise ValueError("上传文件为空")
+            if not header_checked:
+                StorageService._check_image_header(bytes(head), max_dimension, final=True)
+        except BaseException:
+            if temp_file is not None:
+                temp_file.close()
+                StorageService._discard_source(temp_file.name)
+            raise
+
+        if temp_file is not None:
+            temp_file.close()
+            return temp_file.name
+        return bytes(buffer)
+
+    @staticmethod
+    def _check_image_header(head: bytes, max_dimension: int, final: bool = False) -> bool:
+        """检查图片签名与尺寸，返回是否已完成检查（数据不足时返回 False 等待更多数据）"""
+        if len(head) < 12 and not final:
+            return False
+        if not head.startswith(IMAGE_SIGNATURES) and not (head[:4] == b"RIFF" and head[8:12] == b"WEBP"):
+            raise ValueError("请上传图片文件（支持JPG、PNG等格式）")
+
+        try:
+            with Image.open(BytesIO(head)) as image:
+                width, height = image.size
+        except Exception:
+            # 图片头尚未读完；超过嗅探上限后交给完整解码阶段验证
+            return final or len(head) >= UPLOAD_SNIFF_LIMIT
+
+        if width > max_dimension or height > max_dimension:
+            raise ValueError(f"图片尺寸过大，请将边长限制在{max_dimension}像素以内")
+        return True
+
+    @staticmethod
+    def _discard_source(source: Union[bytes, str]) -> None:
+        """删除 _ingest_upload 生成的临时文件"""
+        if isinstance(source, str):
+            try:
+                os.unlink(source)
+            except OSError:
+                pass
+
+    @staticmethod
+    async def build_avatar_renditions(avatar_data: bytes) -> Dict[Tuple[int, str], bytes]:
+        """由处理后的头像生成多尺寸版本（在图片处理进程池中执行）
+
+        Returns:
+            {(边长, 格式): 图片数据}，包含 AVATAR_RENDITION_SIZES 的 JPEG/WebP
+            和原尺寸的 WebP；原尺寸 JPEG 即 avatar_data 本身，不重复生成
+        """
+        return await StorageService._run_image_job(StorageService._process_avatar_renditions, avatar_data)
+
+    @staticmethod
+    async def _run_image_job(job, content: Union[bytes, str]) -> bytes:
+        """在图片处理进程池中执行，饱和时返回 503"""
+        from fastapi import HTTPException
+        from app.core.image_processor import image_processor, ImageProcessorBusy
+
+        try:
+            return await image_processor.run(job, content)
+        except ImageProcessorBusy:
+            raise HTTPException(
+                status_code=503,
+                detail="图片处理繁忙，请稍后重试",
+                headers={"Retry-After": "5"},
+            )
+
+    # ============ 以下在图片处理子进程中执行（同步，返回 (结果, 阶段耗时)） ============
+
+    @staticmethod
+    def _process_avatar(content: Union[bytes, str]) -> Tuple[bytes, Dict[str, float]]:
+        """头像处理
+
+        1. 验证图片格式、安全性和尺寸
+        2. JPEG 使用 draft() 按目标尺寸降采样解码，避免完整解码大图
+        3. 裁剪为正方形（强制1:1）并压缩到最大100x100像素
+        4. 转换为JPEG格式，质量70%
+        """
+        stages: Dict[str, float] = {}
+        started = time.perf_counter()
+
+        # 内存数据或 _ingest_upload 落盘的临时文件
+        image_buffer = StorageService._open_source(content)
 
         try:
             # 直接从内存缓冲区打开图片
@@ -68,9 +247,13 @@ class StorageService:
             image = Image.open(image_buffer)
 
             # 检查图片尺寸，防止超大图片
-            MAX_DIMENSION = 5000  # 最大边长
-            if image.width > MAX_DIMENSION or image.height > MAX_DIMENSION:
-                raise ValueError(f"图片尺寸过大，请将边长限制在{MAX_DIMENSION}像素以内")
+            if image.width > AVATAR_MAX_DIMENSION or image.height > AVATAR_MAX_DIMENSION:
+                raise ValueError(f"图片尺寸过大，请将边长限制在{AVATAR_MAX_DIMENSION}像素以内")
+
+            # JPEG 降采样解码：短边不小于目标尺寸即可
+            image.draft("RGB", (AVATAR_MAX_SIZE, AVATAR_MAX_SIZE))
+            image.load()
+            stages["decode"] = time.perf_counter() - started
 
             # 检查宽高比，强制1:1比例
             aspect_ratio = image.width / image.height
@@ -85,15 +268,19 @@ class StorageService:
 
             # 压缩到目标尺寸
             image = StorageService._resize_avatar(image)
+            stages["resize"] = time.perf_counter() - started - stages["decode"]
 
             # 保存到内存中的BytesIO，质量设置为70%符合MVP需求
             output = BytesIO()
             image.save(output, "JPEG", quality=AVATAR_QUALITY, optimize=True)
             compressed_data = output.getvalue()
+            stages["encode"] = time.perf_counter() - started - stages["decode"] - stages["resize"]
 
-            logger.info(f"头像处理完成: 原始={len(content)//1024}KB, 压缩后={len(compressed_data)//1024}KB, 尺寸={image.width}x{image.height}")
-            return compressed_data
+            return compressed_data, stages
 
+        except MemoryError:
+            logger.error("处理头像时内存不足")
+            raise ValueError("头像图片处理失败：内存不足，请尝试使用较小的图片")
         except Exception as e:
             # 图片解码失败，抛出更详细的错误信息
             logger.error(f"头像图片处理失败: {str(e)}")
@@ -103,35 +290,47 @@ class StorageService:
             image_buffer.close()
 
     @staticmethod
-    async def save_poster(file: UploadFile) -> bytes:
-        """保存海报图片到数据库并进行优化，返回二进制数据
+    def _process_avatar_renditions(avatar_data: bytes) -> Tuple[Dict[Tuple[int, str], bytes], Dict[str, float]]:
+        """生成头像缩略版本（输入为 _process_avatar 的输出，已是正方形小图）"""
+        started = time.perf_counter()
+        renditions: Dict[Tuple[int, str], bytes] = {}
+        with Image.open(BytesIO(avatar_data)) as source:
+            source = source.convert("RGB")
+            for size in AVATAR_RENDITION_SIZES + (AVATAR_MAX_SIZE,):
+                image = source if size >= source.width else source.resize((size, size), Image.Resampling.LANCZOS)
+                for fmt in AVATAR_RENDITION_FORMATS:
+                    if size == AVATAR_MAX_SIZE and fmt == "jpeg":
+                        continue
+                    output = BytesIO()
+                    if fmt == "webp":
+                        image.save(output, "WEBP", quality=AVATAR_WEBP_QUALITY, method=4)
+                    else:
+                        image.save(output, "JPEG", quality=AVATAR_QUALITY, optimize=True)
+                    renditions[(size, fmt)] = output.getvalue()
+        return renditions, {"renditions": time.perf_counter() - started}
 
-        流程：
-        1. 读取文件内容到内存
-        2. 验证图片格式和安全性
-        3. 优化图片尺寸，保持宽高比
+    @staticmethod
+    def _process_poster(content: Union[bytes, str]) -> Tuple[bytes, Dict[str, float]]:
+        """海报处理
+
+        1. 验证图片格式和安全性
+        2. JPEG 使用 draft() 按目标尺寸降采样解码
+        3. 优化图片尺寸，保持宽高比（最大 1200x800）
         4. 转换为JPEG格式，质量85%
-        5. 返回优化后的二进制数据
         """
-        # 读取文件内容到内存
-        content = await file.read()
+        stages: Dict[str, float] = {}
+        started = time.perf_counter()
 
-        # 检查文件大小，防止内存溢出
-        MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
-        if len(content) > MAX_MEMORY_SIZE:
-            raise ValueError(f"图片文件过大，请压缩到{MAX_MEMORY_SIZE // (1024*1024)}MB以内")
-
-        # 直接从内存数据解码图片，避免文件系统操作
-        image_buffer = BytesIO(content)
+        # 内存数据或 _ingest_upload 落盘的临时文件
+        image_buffer = StorageService._open_source(content)
 
         try:
             # 直接从内存缓冲区打开图片
             image = Image.open(image_buffer)
 
             # 检查图片尺寸，防止超大图片
-            MAX_DIMENSION = 10000  # 最大边长
-            if image.width > MAX_DIMENSION or image.height > MAX_DIMENSION:
-                raise ValueError(f"图片尺寸过大，请将边长限制在{MAX_DIMENSION}像素以内")
+            if image.width > POSTER_MAX_DIMENSION or image.height > POSTER_MAX_DIMENSION:
+                raise ValueError(f"图片尺寸过大，请将边长限制在{POSTER_MAX_DIMENSION}像素以内")
 
             # 验证图片完整性
             image.verify()
@@ -140,15 +339,20 @@ class StorageService:
             image_buffer.seek(0)
             image = Image.open(image_buffer)
 
-            # 转换为RGB以保存为JPEG
-            if image.mode in ("RGBA", "P", "LA"):
-                image = image.convert("RGB")
-
             # 海报图片优化设置
             # 保持宽高比，限制最大宽度为1200像素
             MAX_WIDTH = 1200
             MAX_HEIGHT = 800
 
+            # JPEG 降采样解码：解码结果各边不小于目标尺寸，后续仍用 LANCZOS 精确缩放
+            image.draft("RGB", (MAX_WIDTH, MAX_HEIGHT))
+            image.load()
+            stages["decode"] = time.perf_counter() - started
+
+            # 转换为RGB以保存为JPEG
+            if image.mode in ("RGBA", "P", "LA"):
+                image = image.convert("RGB")
+
             # 计算缩放比例
             width, height = image.size
             if width > MAX_WIDTH or height > MAX_HEIGHT:
@@ -162,6 +366,7 @@ class StorageService:
 
                 # 使用高质量缩放
                 image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            stages["resize"] = time.perf_counter() - started - stages["decode"]
 
             # 保存到内存中的BytesIO，质量设置为85%保证海报清晰度
             output = BytesIO()
@@ -177,8 +382,8 @@ class StorageService:
                     image.save(output, "JPEG", quality=75, optimize=True, progressive=True)
                     compressed_data = output.getvalue()
 
-                logger.debug(f"海报图片优化完成: 原始大小={len(content)//1024}KB, 优化后={len(compressed_data)//1024}KB, 尺寸={image.size}")
-                return compressed_data
+                stages["encode"] = time.perf_counter() - started - stages["decode"] - stages["resize"]
+                return compressed_data, stages
             finally:
                 output.close()
 
@@ -196,6 +401,13 @@ class StorageService:
             # 确保缓冲区被正确清理
             image_buffer.close()
 
+    @staticmethod
+    def _open_source(source: Union[bytes, str]):
+        """打开图片数据源：bytes 使用内存缓冲区，str 为临时文件路径"""
+        if isinstance(source, str):
+            return open(source, "rb")
+        return BytesIO(source)
+
     @staticmethod
     def _crop_to_square(image: Image.Image) -> Image.Image:
         """将图片裁剪为正方形
@@ -275,14 +487,83 @@ class StorageService:
         return abs(aspect_ratio - 1.0) <= AVATAR_ASPECT_RATIO_TOLERANCE
 
     @staticmethod
-    def get_avatar_cache_key(bipupu_id: str) -> str:
+    def get_avatar_cache_key(bipupu_id: str, content_hash: Optional[str] = None) -> str:
         """获取头像缓存键
 
-        格式: avatar:{bipupu_id}
-        用于Redis缓存
+        格式: avatar:{bipupu_id}[:{content_hash}]
+        用于Redis缓存；带内容哈希的键内容不变，头像更新后旧键自然过期
         """
+        if content_hash:
+            return f"avatar:{bipupu_id}:{content_hash}"
         return f"avatar:{bipupu_id}"
 
+    @staticmethod
+    def get_poster_cache_key(poster_id: int, content_hash: str) -> str:
+        """获取海报图片缓存键，格式: poster:{poster_id}:{content_hash}"""
+        return f"poster:{poster_id}:{content_hash}"
+
+    @staticmethod
+    def get_content_hash(data) -> str:
+        """计算图片内容哈希（MD5 十六进制），上传时写入 avatar_hash / image_hash"""
+        import hashlib
+        if not isinstance(data, bytes):
+            data = bytes(data) if data else b''
+        return hashlib.md5(data).hexdigest()
+
+    @staticmethod
+    def get_content_etag(content_hash: str) -> str:
+        """由内容哈希生成 ETag，无需读取图片数据"""
+        return f'"{content_hash}"'
+
+    @staticmethod
+    async def serve_image(
+        request,
+        content_hash: str,
+        load_content: Callable[[], Optional[bytes]],
+        cache_key: Optional[str] = None,
+        immutable: bool = False,
+        headers: Optional[Dict[str, str]] = None,
+        variant: Optional[str] = None
+    ):
+        """按内容哈希响应图片
+
+        1. If-None-Match 与内容哈希一致时直接返回 304，不读取图片数据
+        2. 否则依次尝试图片缓存（进程内 LRU、Redis 二进制缓存）、
+           load_content()（从数据库读取延迟加载的图片列）并回填缓存
+
+        Args:
+            content_hash: 上传时保存的内容哈希（avatar_hash / image_hash）
+            load_content: 读取图片数据的回调，仅在需要返回内容时调用
+            cache_key: 缓存键（须包含内容哈希），为空则不缓存
+            immutable: 是否为带内容哈希的版本化 URL（可永久缓存）
+            variant: 同一内容的不同版本（如头像尺寸/格式），计入 ETag
+        """
+        from fastapi import HTTPException
+        from fastapi.responses import Response
+        from app.services.blob_cache import blob_cache
+
+        etag = StorageService.get_content_etag(f"{content_hash}-{variant}" if variant else content_hash)
+        response_headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            "ETag": etag,
+            **(headers or {})
+        }
+
+        if request is not None and request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=response_headers)
+
+        content = await blob_cache.get(cache_key) if cache_key else None
+        if content is None:
+            content = load_content()
+            if not content:
+                raise HTTPException(status_code=404, detail="图片不存在")
+            if cache_key:
+                await blob_cache.set(cache_key, content)
+
+        content = bytes(content)
+        media_type = "image/webp" if content[:4] == b"RIFF" else "image/jpeg"
+        return Response(content=content, media_type=media_type, headers=response_headers)
+
     @staticmethod
     def get_avatar_etag(avatar_data, version_info) -> str:
         """生成头像ETag
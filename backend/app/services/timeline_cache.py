@@ -0,0 +1,234 @@
+"""消息时间线缓存 - 写穿式（write-through）
+
+替代按整页序列化的收件箱/发件箱缓存：
+- timeline:{direction}:{bipupu_id}        有序集合，member/score 均为消息 ID，只保留最新 TIMELINE_MAX 条
+- timeline:{direction}:{bipupu_id}:total  该方向的消息总数；不存在即视为时间线未建立（需回源重建）
+- msg:{id}                                消息对象缓存（MessageResponse JSON），各用户共享
+
+发送消息时写入时间线与对象缓存，读取时从时间线取 ID、MGET 批量取消息体，
+新消息到达不会让第一页失效。超出时间线范围的深翻页回源数据库。
+"""
+
+import json
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.redis import get_redis
+from app.models.message import Message
+from app.schemas.message import MessageResponse, MessageListResponse
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class TimelineCache:
+    """用户消息时间线 + 消息对象缓存"""
+
+    TIMELINE_MAX = 200           # 每个时间线保留的最新消息数
+    TIMELINE_TTL = 86400         # 时间线 1 天未访问即过期
+    MESSAGE_TTL = 86400          # 消息对象缓存 1 天
+
+    DIRECTIONS = ("received", "sent")
+
+    @staticmethod
+    def timeline_key(direction: str, bipupu_id: str) -> str:
+        return f"timeline:{direction}:{bipupu_id}"
+
+    @staticmethod
+    def total_key(direction: str, bipupu_id: str) -> str:
+        return f"timeline:{direction}:{bipupu_id}:total"
+
+    @staticmethod
+    def message_key(message_id: int) -> str:
+        return f"msg:{message_id}"
+
+    @staticmethod
+    def _owners(message: Message) -> List[tuple]:
+        return [
+            ("received", str(message.receiver_bipupu_id)),
+            ("sent", str(message.sender_bipupu_id)),
+        ]
+
+    # ============ 写入 ============
+
+    @staticmethod
+    def _queue_message_cache(pipe, messages: Iterable[Message]) -> None:
+        for message in messages:
+            data = json.dumps(
+                MessageResponse.model_validate(message).model_dump(mode="json"),
+                ensure_ascii=False,
+            )
+            pipe.set(TimelineCache.message_key(message.id), data, ex=TimelineCache.MESSAGE_TTL)
+
+    @staticmethod
+    async def cache_messages(messages: Iterable[Message]) -> None:
+        """写入消息对象缓存（一次管道往返）"""
+        redis = await get_redis()
+        pipe = redis.pipeline(transaction=False)
+        TimelineCache._queue_message_cache(pipe, messages)
+        await pipe.execute()
+
+    @staticmethod
+    async def record_message(message: Message) -> None:
+        """新消息写穿，见 record_messages"""
+        await TimelineCache.record_messages([message])
+
+    @staticmethod
+    async def record_messages(messages: List[Message]) -> None:
+        """新消息批量写穿：写入对象缓存，并追加到接收者收件箱与发送者发件箱时间线
+
+        同一时间线的消息合并为一条 ZADD；对象缓存、时间线追加/截断/续期与 total 是否存在的检查
+        在一次管道往返中完成，已建立的 total 再由第二次往返 INCRBY，与消息条数无关。
+        时间线即使尚未建立也会先追加（不写 total），之后回源重建时合并，
+        避免重建与写入并发时漏掉新消息。失败不影响发送流程。
+        """
+        if not messages:
+            return
+        try:
+            timelines: Dict[tuple, Dict[str, int]] = {}
+            for message in messages:
+                for owner in TimelineCache._owners(message):
+                    timelines.setdefault(owner, {})[str(message.id)] = message.id
+
+            redis = await get_redis()
+            pipe = redis.pipeline(transaction=False)
+            TimelineCache._queue_message_cache(pipe, messages)
+            for (direction, bipupu_id), mapping in timelines.items():
+                key = TimelineCache.timeline_key(direction, bipupu_id)
+                pipe.zadd(key, mapping)
+                pipe.zremrangebyrank(key, 0, -(TimelineCache.TIMELINE_MAX + 1))
+                pipe.expire(key, TimelineCache.TIMELINE_TTL)
+                pipe.exists(TimelineCache.total_key(direction, bipupu_id))
+            results = await pipe.execute()
+
+            # 每条时间线 4 条命令，最后一条为 EXISTS total
+            exists = results[len(messages) + 3::4]
+            pipe = redis.pipeline(transaction=False)
+            pending = 0
+            for ((direction, bipupu_id), mapping), found in zip(timelines.items(), exists):
+                if found:
+                    pipe.incrby(TimelineCache.total_key(direction, bipupu_id), len(mapping))
+                    pending += 1
+            if pending:
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"写入消息时间线失败（非致命）: {e}")
+
+    @staticmethod
+    async def remove_message(message: Message) -> None:
+        """删除消息时从时间线与对象缓存中移除"""
+        try:
+            redis = await get_redis()
+            await redis.delete(TimelineCache.message_key(message.id))
+            for direction, bipupu_id in TimelineCache._owners(message):
+                await redis.zrem(TimelineCache.timeline_key(direction, bipupu_id), str(message.id))
+                total_key = TimelineCache.total_key(direction, bipupu_id)
+                if await redis.exists(total_key):
+                    await redis.decr(total_key)
+        except Exception as e:
+            logger.warning(f"移除消息时间线失败（非致命）: {e}")
+
+    @staticmethod
+    async def _rebuild(db: AsyncSession, direction: str, bipupu_id: str) -> int:
+        """回源数据库重建时间线，返回消息总数"""
+        column = Message.sender_bipupu_id if direction == "sent" else Message.receiver_bipupu_id
+        ids = list((await db.execute(
+            select(Message.id)
+            .where(column == bipupu_id)
+            .order_by(Message.id.desc())
+            .limit(TimelineCache.TIMELINE_MAX)
+        )).scalars().all())
+        total = (await db.execute(
+            select(func.count(Message.id)).where(column == bipupu_id)
+        )).scalar() or 0
+
+        redis = await get_redis()
+        key = TimelineCache.timeline_key(direction, bipupu_id)
+        if ids:
+            await redis.zadd(key, {str(message_id): message_id for message_id in ids})
+            await redis.zremrangebyrank(key, 0, -(TimelineCache.TIMELINE_MAX + 1))
+            await redis.expire(key, TimelineCache.TIMELINE_TTL)
+        await redis.set(TimelineCache.total_key(direction, bipupu_id), total, ex=TimelineCache.TIMELINE_TTL)
+        return total
+
+    # ============ 读取 ============
+
+    @staticmethod
+    async def get_messages(db: AsyncSession, message_ids: List[int]) -> List[MessageResponse]:
+        """按 ID 批量获取消息：MGET 对象缓存，未命中的回源数据库并回填（保持传入顺序）"""
+        if not message_ids:
+            return []
+
+        redis = await get_redis()
+        cached = await redis.mget([TimelineCache.message_key(message_id) for message_id in message_ids])
+
+        found = {}
+        missing = []
+        for message_id, raw in zip(message_ids, cached):
+            if raw:
+                found[message_id] = MessageResponse.model_validate(
+                    json.loads(raw) if isinstance(raw, str) else raw
+                )
+            else:
+                missing.append(message_id)
+
+        if missing:
+            rows = (await db.execute(
+                select(Message).where(Message.id.in_(missing))
+            )).scalars().all()
+            await TimelineCache.cache_messages(rows)
+            for row in rows:
+                found[row.id] = MessageResponse.model_validate(row)
+
+        # 已被删除的消息直接跳过
+        return [found[message_id] for message_id in message_ids if message_id in found]
+
+    @staticmethod
+    async def get_page(
+        db: AsyncSession,
+        bipupu_id: str,
+        direction: str = "received",
+        page: int = 1,
+        page_size: int = 20,
+        before_id: Optional[int] = None,
+        include_total: bool = True
+    ) -> Optional[MessageListResponse]:
+        """从时间线组装一页消息（页码模式或 before_id 游标模式）
+
+        Returns:
+            MessageListResponse；请求范围超出时间线时返回 None，由调用方回源数据库
+        """
+        redis = await get_redis()
+        key = TimelineCache.timeline_key(direction, bipupu_id)
+
+        total_raw = await redis.get(TimelineCache.total_key(direction, bipupu_id))
+        total = int(total_raw) if total_raw is not None else await TimelineCache._rebuild(db, direction, bipupu_id)
+        size = await redis.zcard(key)
+
+        if before_id is not None:
+            ids = await redis.zrevrangebyscore(key, f"({before_id}", "-inf", start=0, num=page_size + 1)
+            # 时间线被截断且不足一页时，剩余消息可能在时间线之外
+            if len(ids) <= page_size and size < total:
+                return None
+            page = 1
+        else:
+            start = (page - 1) * page_size
+            if start + page_size >= size and size < total:
+                return None
+            ids = await redis.zrevrange(key, start, start + page_size)
+
+        message_ids = [int(message_id) for message_id in ids]
+        has_more = len(message_ids) > page_size
+        messages = await TimelineCache.get_messages(db, message_ids[:page_size])
+        next_cursor = message_ids[page_size - 1] if has_more else None
+
+        return MessageListResponse(
+            messages=messages,
+            total=total if include_total else None,
+            page=page,
+            page_size=page_size,
+            has_more=has_more,
+            next_cursor=next_cursor
+        )
@@ -6,38 +6,72 @@
 3. 实用：提供核心用户服务功能
 """
 
+import asyncio
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import Optional
+from typing import Optional, Set
 from datetime import datetime, timezone
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate, UserPasswordUpdate
 from app.core.security import verify_password, get_password_hash
+from app.core.principal import principal_cache
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# 尚未完成的 Redis 认证缓存删除任务（见 UserService._invalidate_auth_cache）
+_pending_invalidations: Set[asyncio.Task] = set()
+
 
 class UserService:
     """用户服务类"""
 
     @staticmethod
-    def create_user(db: Session, user_data: UserCreate) -> User:
+    def _invalidate_auth_cache(username: str) -> None:
+        """使认证缓存失效（同步调用方）：进程内主体缓存立即失效，Redis 认证缓存在后台任务中删除"""
+        from app.services.redis_service import RedisService
+        principal_cache.invalidate_user(username)
+        try:
+            task = asyncio.create_task(RedisService.delete_cache(f"user_auth:{username}"))
+        except Exception as e:
+            logger.warning(f"Failed to invalidate auth cache: {e}")
+            return
+        # 事件循环只持有任务的弱引用，保留引用直到完成，避免任务执行前被回收
+        _pending_invalidations.add(task)
+        task.add_done_callback(_pending_invalidations.discard)
+
+    @staticmethod
+    async def invalidate_auth_cache(username: str) -> None:
+        """使认证缓存失效（async 路由）：返回前 Redis 认证缓存已删除"""
+        from app.services.redis_service import RedisService
+        principal_cache.invalidate_user(username)
+        try:
+            await RedisService.delete_cache(f"user_auth:{username}")
+        except Exception as e:
+            logger.warning(f"Failed to invalidate auth cache: {e}")
+
+    @staticmethod
+    def create_user(db: Session, user_data: UserCreate, hashed_password: Optional[str] = None) -> User:
         """创建用户
         
+        Args:
+            hashed_password: 预先计算好的密码哈希（async 路由应在哈希线程池中计算后传入），
+                为空时在此同步计算
+        
         注意：
         - 并发情况下可能抛出 IntegrityError（bipupu_id 冲突）
         - 调用方应捕获异常并重试
         """
+        bipupu_id = None
         try:
-            # 生成 bipupu_id（4 位数字）
+            # 分配 bipupu_id（默认 4 位数字）
             from app.core.user_utils import generate_bipupu_id
             bipupu_id = generate_bipupu_id(db)
 
             # 创建用户对象
             user = User(
                 username=user_data.username,
-                hashed_password=get_password_hash(user_data.password),
+                hashed_password=hashed_password or get_password_hash(user_data.password),
                 nickname=user_data.nickname,
                 bipupu_id=bipupu_id,
                 is_active=True,
@@ -53,13 +87,28 @@ class UserService:
 
         except IntegrityError as e:
             db.rollback()
+            UserService._release_bipupu_id(db, bipupu_id)
             logger.error(f"创建用户失败 - 唯一约束冲突：{e}")
             raise ValueError("用户名已存在或 ID 冲突")
         except Exception as e:
             db.rollback()
+            UserService._release_bipupu_id(db, bipupu_id)
             logger.error(f"创建用户失败：{e}")
             raise
 
+    @staticmethod
+    def _release_bipupu_id(db: Session, bipupu_id: Optional[str]) -> None:
+        """创建失败时归还已分配的 bipupu_id（序列取号不随事务回滚，需显式放回空闲池）"""
+        if not bipupu_id:
+            return
+        try:
+            from app.services.bipupu_id_allocator import bipupu_id_allocator
+            bipupu_id_allocator.release(db, [bipupu_id])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"归还 bipupu_id 失败（非致命）: {bipupu_id}, {e}")
+
     @staticmethod
     def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
         """通过ID获取用户"""
@@ -93,13 +142,7 @@ class UserService:
             db.refresh(user)
 
             # 🆕 使认证缓存失效
-            import asyncio
-            from app.services.redis_service import RedisService
-            cache_key = f"user_auth:{user.username}"
-            try:
-                asyncio.create_task(RedisService.delete_cache(cache_key))
-            except Exception as e:
-                logger.warning(f"Failed to invalidate auth cache: {e}")
+            UserService._invalidate_auth_cache(str(user.username))
 
             logger.info(f"用户信息更新成功：user_id={user.id}")
             return user
@@ -125,13 +168,7 @@ class UserService:
             db.commit()
 
             # 🆕 使认证缓存失效（密码变更后强制重新认证）
-            import asyncio
-            from app.services.redis_service import RedisService
-            cache_key = f"user_auth:{user.username}"
-            try:
-                asyncio.create_task(RedisService.delete_cache(cache_key))
-            except Exception as e:
-                logger.warning(f"Failed to invalidate auth cache: {e}")
+            UserService._invalidate_auth_cache(str(user.username))
 
             logger.info(f"用户密码更新成功：user_id={user.id}")
             return True
@@ -149,8 +186,16 @@ class UserService:
             if not user:
                 return False
 
+            from app.services.bipupu_id_allocator import bipupu_id_allocator
+            from app.services.avatar_rendition_service import AvatarRenditionService
+            bipupu_id = str(user.bipupu_id)
+            AvatarRenditionService.delete_renditions(db, AvatarRenditionService.user_key(user_id))
             db.delete(user)
+            db.flush()
+            # 删除后留下的空洞放回空闲池，与删除同一事务提交
+            bipupu_id_allocator.release(db, [bipupu_id])
             db.commit()
+            UserService._invalidate_auth_cache(str(user.username))
 
             logger.info(f"用户删除成功: user_id={user_id}")
             return True
@@ -173,6 +218,7 @@ class UserService:
 
             db.add(user)
             db.commit()
+            UserService._invalidate_auth_cache(str(user.username))
 
             logger.info(f"用户停用成功: user_id={user_id}")
             return True
@@ -219,6 +265,7 @@ class UserService:
             db.add(user)
             db.commit()
             db.refresh(user)
+            UserService._invalidate_auth_cache(str(user.username))
 
             logger.info(f"用户状态切换成功: user_id={user_id}, is_active={user.is_active}")
             return user
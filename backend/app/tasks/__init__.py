@@ -2,12 +2,26 @@
 
 from .subscriptions import (  # noqa: F401
     check_push_times_task,
+    refresh_push_slots_task,
+    stage_pushes_task,
+    release_staged_pushes_task,
     push_service_task,
+    push_run_complete_task,
+    flush_push_logs_task,
+    retry_failed_pushes_task,
     cleanup_push_logs_task,
 )
+from .maintenance import maintain_partitions_task  # noqa: F401
 
 __all__ = [
     "check_push_times_task",
+    "refresh_push_slots_task",
+    "stage_pushes_task",
+    "release_staged_pushes_task",
     "push_service_task",
+    "push_run_complete_task",
+    "flush_push_logs_task",
+    "retry_failed_pushes_task",
     "cleanup_push_logs_task",
+    "maintain_partitions_task",
 ]
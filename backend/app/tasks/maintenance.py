@@ -0,0 +1,34 @@
+"""数据库维护任务
+
+- maintain_partitions_task：预建 messages / push_logs 未来的月分区，删除（或分离）超过保留期的分区
+"""
+from celery import shared_task
+
+from app.db.database import SessionLocal
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@shared_task(name="maintenance.partitions", bind=True, max_retries=3, default_retry_delay=300)
+def maintain_partitions_task(self) -> dict:
+    """每天预建未来 PARTITION_PREMAKE_MONTHS 个月的分区并清理过期分区（见 app.db.partitions）。"""
+    from app.db.partitions import maintain_partitions
+
+    db = SessionLocal()
+    try:
+        result = maintain_partitions(db)
+        for table, changes in result.items():
+            if changes["created"] or changes["removed"]:
+                logger.info(
+                    f"分区维护 [{table}]: 新建 {changes['created']}，"
+                    f"清理 {[r['partition'] for r in changes['removed']]}"
+                )
+        return result
+    except Exception as e:
+        db.rollback()
+        logger.error(f"分区维护失败: {e}")
+        self.retry(exc=e)
+        return {"error": str(e)}
+    finally:
+        db.close()
@@ -2,23 +2,37 @@
 
 职责：
 1. 定时检查所有活跃服务号的推送时间窗口（check_push_times_task）
-2. 通用推送派发（push_service_task）—— 不与任何具体服务号耦合
-3. 推送日志定期清理（cleanup_push_logs_task）
+   及夏令时切换后的推送时间槽刷新（refresh_push_slots_task）
+   低峰期预生成次日定时推送（stage_pushes_task），到点按令牌桶限速发布（release_staged_pushes_task）
+2. 通用推送派发（push_service_task）—— 不与任何具体服务号耦合；
+   接收者分块后以 chord 并行执行，push_run_complete_task 汇总，进度记录在 Redis
+3. 推送日志落库（flush_push_logs_task，消费 Redis Stream push:logs）与按分区清理（cleanup_push_logs_task）
+4. 失败推送按退避时间重试（retry_failed_pushes_task，见 push.retry）
 
 设计原则：
 - 任务层不感知具体服务号业务（运势/天气等），内容生成由 ContentGenerator 负责
 - 新增服务号无需修改此文件，只需在数据库创建服务号记录即可
 """
 import asyncio
+import time
+import uuid
 from datetime import datetime, timezone, timedelta
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-from celery import shared_task
+from celery import shared_task, chord
 
 from app.db.database import SessionLocal
+from app.core.config import settings
 from app.core.logging import get_logger
-from app.models.service_account import ServiceAccount
-from app.services.push.utils import get_users_for_push_time  # noqa: F401 — re-exported
+from app.core.priority import Priority, normalize_priority, queue_for
+from app.services.push.log_stream import push_log_stream
+from app.services.push.progress import PushProgress
+from app.services.push.utils import (  # noqa: F401 — get_users_for_push_time re-exported
+    get_users_for_push_time,
+    get_due_subscriptions,
+    get_dst_changed_timezones,
+    refresh_push_slots,
+)
 
 logger = get_logger(__name__)
 
@@ -27,26 +41,24 @@ logger = get_logger(__name__)
 def check_push_times_task(self) -> dict:
     """每 15 分钟检查所有活跃服务号，向当前时间窗口内到期的用户派发推送任务。
 
-    动态查询所有 is_active=True 的服务号，不与具体服务名耦合。
+    一条语句对 subscriptions.utc_push_minute 索引做范围查询，覆盖所有 is_active=True 的服务号，
+    不与具体服务名耦合。
     """
     db = SessionLocal()
     try:
         current_utc = datetime.now(timezone.utc)
         logger.info(f"检查推送时间窗口: {current_utc.strftime('%Y-%m-%d %H:%M')} UTC")
 
-        active_services = db.query(ServiceAccount.name).filter(
-            ServiceAccount.is_active.is_(True)
-        ).all()
+        due = get_due_subscriptions(
+            db, current_utc.hour, current_utc.minute,
+            exclude_staged=settings.PUSH_STAGING_ENABLED,
+        )
 
         dispatched: dict = {}
-        for (service_name,) in active_services:
-            users = get_users_for_push_time(
-                db, service_name, current_utc.hour, current_utc.minute
-            )
-            if users:
-                push_service_task.delay(service_name, users)
-                dispatched[service_name] = len(users)
-                logger.info(f"派发推送: {service_name} → {len(users)} 用户")
+        for service_name, users in due.items():
+            run_id = dispatch_push_run(service_name, users)
+            dispatched[service_name] = len(users)
+            logger.info(f"派发推送: {service_name} → {len(users)} 用户 (run={run_id})")
 
         logger.info(f"时间窗口检查完成，共派发 {sum(dispatched.values())} 条推送")
         return {"check_time": current_utc.isoformat(), "dispatched": dispatched}
@@ -59,36 +71,160 @@ def check_push_times_task(self) -> dict:
         db.close()
 
 
+@shared_task(name="subscriptions.stage_pushes", bind=True, max_retries=3, default_retry_delay=300)
+def stage_pushes_task(self) -> dict:
+    """低峰期预生成未来 24 小时的定时推送（PUSH_STAGE_HOUR 执行），同时清理过期的预生成记录。"""
+    if not settings.PUSH_STAGING_ENABLED:
+        return {"skipped": True}
+
+    from app.services.push.staging import stage_pushes, cleanup_staged_pushes
+
+    db = SessionLocal()
+    try:
+        removed = cleanup_staged_pushes(db)
+        staged = stage_pushes(db)
+        logger.info(f"预生成定时推送: 新增 {staged} 条，清理 {removed} 条")
+        return {"staged": staged, "removed": removed}
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"预生成定时推送失败: {e}")
+        self.retry(exc=e)
+        return {"error": str(e)}
+    finally:
+        db.close()
+
+
+@shared_task(name="subscriptions.release_staged_pushes", bind=True, max_retries=0)
+def release_staged_pushes_task(self) -> dict:
+    """每分钟按令牌桶速率发布到期的预生成推送（PUSH_RELEASE_RATE 条/秒，突发 PUSH_RELEASE_BURST）。"""
+    if not settings.PUSH_STAGING_ENABLED:
+        return {"skipped": True}
+
+    from app.services.push.staging import release_due_pushes
+
+    db = SessionLocal()
+    try:
+        released = asyncio.run(release_due_pushes(db))
+        push_log_stream.flush_ring(db)  # Redis 不可用时本进程缓冲的推送日志
+        if released:
+            logger.info(f"发布预生成推送: {released} 条")
+        return {"released": released}
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"发布预生成推送失败: {e}")
+        return {"error": str(e)}
+    finally:
+        db.close()
+
+
+@shared_task(name="subscriptions.refresh_push_slots", bind=True, max_retries=3, default_retry_delay=60)
+def refresh_push_slots_task(self) -> dict:
+    """每小时刷新夏令时切换时区用户的 UTC 推送时间槽（按当前 UTC 日期重新计算，仅写回变化的行）。"""
+    db = SessionLocal()
+    try:
+        timezones = get_dst_changed_timezones(db)
+        updated = refresh_push_slots(db, timezones=timezones)
+        db.commit()
+        if updated:
+            logger.info(f"夏令时切换，刷新推送时间槽: {timezones} → {updated} 条")
+        return {"timezones": timezones, "updated": updated}
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"刷新推送时间槽失败: {e}")
+        self.retry(exc=e)
+        return {"error": str(e)}
+    finally:
+        db.close()
+
+
+def dispatch_push_run(
+    service_name: str,
+    users: List[Tuple[int, str]],
+    priority: Priority = Priority.LOW,
+    content: Optional[str] = None,
+) -> str:
+    """将接收者按 PUSH_TASK_CHUNK_SIZE 拆分为 Celery group 并行执行，chord 回调汇总结果。
+
+    每个分块是独立的 push_service_task，失败时单独重试；进度写入 Redis（PushProgress）。
+    分块与回调投递到 priority 对应的队列（见 app.core.priority），定时推送默认走 push.bulk。
+
+    Returns:
+        str: 本次运行 ID
+    """
+    chunks = split_push_run(users)
+    run_id = uuid.uuid4().hex
+
+    try:
+        asyncio.run(PushProgress.start(run_id, service_name, len(users), len(chunks), lane=queue_for(priority)))
+    except Exception as e:
+        logger.warning(f"记录推送进度失败 [{service_name}]: {e}")
+
+    enqueue_push_run(service_name, chunks, run_id, priority, content)
+    return run_id
+
+
+def split_push_run(users: List[Tuple[int, str]]) -> List[List[Tuple[int, str]]]:
+    """按 PUSH_TASK_CHUNK_SIZE 拆分接收者"""
+    chunk_size = settings.PUSH_TASK_CHUNK_SIZE
+    return [users[i:i + chunk_size] for i in range(0, len(users), chunk_size)]
+
+
+def enqueue_push_run(
+    service_name: str,
+    chunks: List[List[Tuple[int, str]]],
+    run_id: str,
+    priority: Priority = Priority.LOW,
+    content: Optional[str] = None,
+) -> None:
+    """把已拆分的分块及 chord 回调投递到 priority 对应的队列（同步调用，不涉及事件循环）"""
+    queue = queue_for(priority)
+    enqueued_at = time.time()
+    chord([
+        push_service_task.s(service_name, chunk, run_id, int(priority), content, enqueued_at).set(queue=queue)
+        for chunk in chunks
+    ])(push_run_complete_task.s(service_name, run_id).set(queue=queue))
+
+
 @shared_task(name="subscriptions.push_service", bind=True, max_retries=3, default_retry_delay=60)
 def push_service_task(
     self,
     service_name: str,
     target_users: List[Tuple[int, str]],
+    run_id: Optional[str] = None,
+    priority: int = Priority.LOW,
+    content: Optional[str] = None,
+    enqueued_at: Optional[float] = None,
 ) -> dict:
     """向目标用户列表发送指定服务号的推送消息（通用，不绑定具体服务号）。
 
-    内容生成由 service_accounts.send_push → ContentGenerator 处理。
+    内容生成由 service_accounts.send_push_batch → ContentGenerator 处理，
+    按 PUSH_BATCH_SIZE 分块批量写入消息与推送日志。
+    重试次数用尽后返回失败结果而不抛出，保证 chord 回调仍能汇总其余分块。
 
     Args:
         service_name: 服务号名称（如 "cosmic.fortune"、"weather.service"）
-        target_users: [(user_id, bipupu_id), ...] 列表
+        target_users: [(user_id, bipupu_id), ...] 列表（一个分块）
+        run_id: 所属推送运行 ID，用于进度统计
+        priority: 投递优先级（WebSocket 发送队列）
+        content: 统一推送内容，为空时按接收者生成
+        enqueued_at: 投递到队列的时间戳，用于统计通道排队延迟
     """
+    queue_wait_ms = int((time.time() - enqueued_at) * 1000) if enqueued_at and not self.request.retries else 0
     db = SessionLocal()
     try:
-        from app.services.service_accounts import send_push
+        from app.services.service_accounts import send_push_batch
 
         async def _send_all() -> Tuple[int, int]:
-            tasks = [
-                send_push(db, service_name, bipupu_id)
-                for _, bipupu_id in target_users
-                if bipupu_id
-            ]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            ok = sum(1 for r in results if not isinstance(r, Exception))
-            fail = len(results) - ok
-            for r in results:
-                if isinstance(r, Exception):
-                    logger.error(f"推送异常 [{service_name}]: {r}")
+            receivers = [bipupu_id for _, bipupu_id in target_users if bipupu_id]
+            messages = await send_push_batch(
+                db, service_name, receivers, content=content, priority=normalize_priority(priority)
+            )
+            ok, fail = len(messages), len(receivers) - len(messages)
+            await _record_progress(run_id, ok, fail, queue_wait_ms)
+            push_log_stream.flush_ring(db)  # Redis 不可用时本进程缓冲的推送日志
             return ok, fail
 
         ok, fail = asyncio.run(_send_all())
@@ -102,31 +238,111 @@ def push_service_task(
 
     except Exception as e:
         logger.error(f"推送任务失败 [{service_name}]: {e}")
+        if self.request.retries >= self.max_retries:
+            asyncio.run(_record_progress(run_id, 0, len(target_users)))
+            return {
+                "service_name": service_name,
+                "success": 0,
+                "failed": len(target_users),
+                "total": len(target_users),
+                "error": str(e),
+            }
         self.retry(exc=e)
         return {"error": str(e)}
     finally:
         db.close()
 
 
+async def _record_progress(run_id: Optional[str], ok: int, fail: int, queue_wait_ms: int = 0) -> None:
+    """累加分块结果到运行进度（失败不影响推送本身）"""
+    if not run_id:
+        return
+    try:
+        await PushProgress.record_chunk(run_id, ok, fail, queue_wait_ms)
+    except Exception as e:
+        logger.warning(f"记录推送进度失败 (run={run_id}): {e}")
+
+
+@shared_task(name="subscriptions.push_run_complete", bind=True, max_retries=3, default_retry_delay=10)
+def push_run_complete_task(self, results: List[dict], service_name: str, run_id: str) -> dict:
+    """chord 回调：汇总一次推送运行所有分块的结果。"""
+    summary = {
+        "run_id": run_id,
+        "service_name": service_name,
+        "chunks": len(results),
+        "success": sum(r.get("success", 0) for r in results),
+        "failed": sum(r.get("failed", 0) for r in results),
+        "total": sum(r.get("total", 0) for r in results),
+    }
+    try:
+        asyncio.run(PushProgress.finish(run_id))
+    except Exception as e:
+        logger.warning(f"记录推送进度失败 (run={run_id}): {e}")
+
+    logger.info(
+        f"推送运行完成 [{service_name}] run={run_id}: "
+        f"成功 {summary['success']}/{summary['total']}，{summary['chunks']} 个分块"
+    )
+    return summary
+
+
+@shared_task(name="subscriptions.flush_push_logs", bind=True, max_retries=0)
+def flush_push_logs_task(self) -> dict:
+    """消费推送日志 Stream，批量写入 push_logs（每分钟，与 API 进程的 PushLogWriter 共用消费组）。"""
+    db = SessionLocal()
+    try:
+        written = asyncio.run(push_log_stream.flush(db))
+        if written:
+            logger.info(f"推送日志落库 {written} 条")
+        return {"written": written}
+    except Exception as e:
+        logger.error(f"推送日志落库失败: {e}")
+        return {"error": str(e)}
+    finally:
+        db.close()
+
+
+@shared_task(name="subscriptions.retry_failed_pushes", bind=True, max_retries=0)
+def retry_failed_pushes_task(self) -> dict:
+    """每分钟领取 next_retry_at 已到期的失败推送并批量重发（SKIP LOCKED，可多个 worker 并行）。"""
+    from app.services.push.retry import retry_due_pushes
+
+    db = SessionLocal()
+    try:
+        stats = asyncio.run(retry_due_pushes(db))
+        if stats["total_retries"]:
+            logger.info(
+                f"失败推送重试完成: 成功 {stats['successful_retries']}/{stats['total_retries']}"
+            )
+        return stats
+    except Exception as e:
+        db.rollback()
+        logger.error(f"失败推送重试异常: {e}")
+        return {"error": str(e)}
+    finally:
+        db.close()
+
+
 @shared_task(name="subscriptions.cleanup_push_logs", bind=True, max_retries=2, default_retry_delay=60)
 def cleanup_push_logs_task(self, days: int = 30) -> dict:
-    """清理超过 `days` 天的 success/failed 推送日志。
+    """删除整月早于 `days` 天的推送日志分区（app.db.partitions）。
 
-    由 Celery beat 每天凌晨 3 点自动执行。
-    pending/processing 状态日志不会被删除。
+    日常清理由 maintenance.partitions 按 PUSH_LOG_RETENTION_DAYS 执行，此任务用于手动指定保留天数。
     """
-    from app.models.push_log import PushLog
+    from app.db.partitions import drop_expired_partitions
 
     db = SessionLocal()
     try:
         cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-        deleted = db.query(PushLog).filter(
-            PushLog.created_at < cutoff,
-            PushLog.status.in_(["success", "failed"]),
-        ).delete(synchronize_session=False)
-        db.commit()
-        logger.info(f"推送日志清理完成：删除 {deleted} 条（{days} 天前）")
-        return {"deleted_count": deleted, "cutoff_date": cutoff.isoformat(), "days": days}
+        removed = drop_expired_partitions(db, "push_logs", days)
+        deleted = sum(r["rows"] for r in removed)
+        logger.info(f"推送日志清理完成：删除 {len(removed)} 个分区，约 {deleted} 条（{days} 天前）")
+        return {
+            "deleted_count": deleted,
+            "partitions": [r["partition"] for r in removed],
+            "cutoff_date": cutoff.isoformat(),
+            "days": days,
+        }
     except Exception as e:
         db.rollback()
         logger.error(f"清理推送日志失败: {e}")
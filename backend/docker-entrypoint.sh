@@ -48,7 +48,8 @@ case "${CONTAINER_ROLE:-backend}" in
             exec $OVERRIDE_CMD
         else
             echo -e "${GREEN}启动Celery Worker...${NC}"
-            exec uv run celery -A app.celery worker --loglevel=info -Q default --pool=solo
+            # CELERY_QUEUES 选择消费的优先级队列，可拆分为多个 worker（如 push.high,default 与 push.bulk）
+            exec uv run celery -A app.celery worker --loglevel=info -Q "${CELERY_QUEUES:-push.high,default,push.bulk}" --pool=solo
         fi
         ;;
         
@@ -0,0 +1,48 @@
+"""
+测试公共配置
+
+需要 PostgreSQL 的测试使用 pg_db 夹具：设置 TEST_DATABASE_URL 指向一个可清空的测试库时运行，
+否则跳过。设置后应用的同步/异步引擎都指向该库（在导入 app 之前替换 DATABASE_URL），
+不会访问开发库。
+"""
+
+import os
+import sys
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def pg_db():
+    """重建全部表（含 messages / push_logs 当月分区）的同步会话"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("未设置 TEST_DATABASE_URL")
+
+    import app.models  # noqa: F401 — 注册全部模型
+    import app.db.redis as redis_module
+    from app.db.database import Base, SessionLocal, engine
+    from app.db.partitions import ensure_partitions
+    from app.db.redis import MemoryCacheWrapper
+
+    # 推送日志 Stream、时间线缓存等使用内存缓存
+    redis_module.redis_client = MemoryCacheWrapper()
+    redis_module._redis_loop = None
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table in ("messages", "push_logs"):
+            ensure_partitions(conn, table, months_ahead=1)
+
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(engine)
@@ -0,0 +1,97 @@
+"""
+异步数据库层测试（需要 TEST_DATABASE_URL，见 conftest.py）
+
+1. get_async_db_context 正常退出时提交，异常时回滚
+2. 认证缓存未命中时 get_current_principal 经 AsyncSession 查询用户并回填缓存
+3. 连接池预算：API 进程内同步与异步引擎合计不超过 DB_POOL_SIZE / DB_MAX_OVERFLOW
+"""
+
+import asyncio
+import json
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.principal import principal_cache
+from app.core.security import create_access_token, get_current_principal
+from app.db import database
+from app.db.database import async_engine, get_async_db_context
+from app.db.redis import get_redis
+from app.models.user import User
+
+
+def _user(username: str, bipupu_id: str) -> User:
+    return User(username=username, bipupu_id=bipupu_id, hashed_password="x", timezone="Asia/Shanghai")
+
+
+def test_async_context_commits_and_rolls_back(pg_db):
+    async def run():
+        try:
+            async with get_async_db_context() as db:
+                db.add(_user("alice", "10000001"))
+
+            try:
+                async with get_async_db_context() as db:
+                    db.add(_user("bob", "10000002"))
+                    await db.flush()
+                    raise RuntimeError("boom")
+            except RuntimeError:
+                pass
+
+            async with get_async_db_context() as db:
+                result = await db.execute(select(User.username).order_by(User.username))
+                return result.scalars().all()
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(run()) == ["alice"]
+
+
+def test_principal_loaded_through_async_session(pg_db):
+    pg_db.add(_user("carol", "10000003"))
+    pg_db.add(User(username="dave", bipupu_id="10000004", hashed_password="x", is_active=False))
+    pg_db.commit()
+
+    async def run():
+        principal_cache.clear()
+        try:
+            principal = await get_current_principal(
+                HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": "carol"}))
+            )
+            cached = await (await get_redis()).get("user_auth:carol")
+
+            try:
+                await get_current_principal(
+                    HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": "dave"}))
+                )
+                inactive_rejected = False
+            except HTTPException as e:
+                inactive_rejected = e.status_code == 401
+            return principal, json.loads(cached), inactive_rejected
+        finally:
+            await async_engine.dispose()
+
+    principal, cached, inactive_rejected = asyncio.run(run())
+    assert principal.username == "carol" and principal.bipupu_id == "10000003"
+    assert cached["id"] == principal.id
+    assert inactive_rejected
+
+
+def test_pool_budget_split(monkeypatch):
+    monkeypatch.setenv("CONTAINER_ROLE", "backend")
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 5)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 10)
+    monkeypatch.setattr(settings, "DB_ASYNC_POOL_SIZE", 3)
+    monkeypatch.setattr(settings, "DB_ASYNC_MAX_OVERFLOW", 5)
+    (sync_size, sync_overflow), (async_size, async_overflow) = database._pool_budget()
+    assert (sync_size, async_size) == (2, 3)
+    assert sync_overflow + async_overflow == 10
+
+    monkeypatch.setattr(settings, "DB_ASYNC_POOL_SIZE", 9)
+    (sync_size, _), (async_size, _) = database._pool_budget()
+    assert sync_size >= 1 and sync_size + async_size == 5
+
+    monkeypatch.setenv("CONTAINER_ROLE", "worker")
+    assert database._pool_budget()[0] == (5, 10)
@@ -0,0 +1,73 @@
+"""
+资料修改后的认证缓存失效测试
+
+1. 修改资料、密码、时区的路由提交后删除 Redis 认证缓存并使进程内主体缓存失效（需要 TEST_DATABASE_URL）
+2. 同步调用方的后台删除任务在完成前保留引用
+"""
+
+import asyncio
+import json
+
+import app.db.redis as redis_module
+import app.services.user_service as user_service_module
+from app.api.routes.profile import update_password, update_profile, update_timezone
+from app.core.principal import Principal, principal_cache
+from app.core.security import get_password_hash
+from app.db.redis import MemoryCacheWrapper, get_redis
+from app.models.user import User
+from app.schemas.user import TimezoneUpdate, UserPasswordUpdate, UserUpdate
+from app.services.user_service import UserService
+
+
+async def _prime_caches(user: User) -> None:
+    await (await get_redis()).set(f"user_auth:{user.username}", json.dumps({"id": user.id, "username": user.username}))
+    principal_cache.set("token-1", Principal({"id": user.id, "username": user.username}))
+
+
+async def _caches_cleared(user: User) -> bool:
+    cached = await (await get_redis()).get(f"user_auth:{user.username}")
+    return cached is None and principal_cache.get("token-1") is None
+
+
+def test_profile_routes_invalidate_auth_cache(pg_db):
+    user = User(username="erin", bipupu_id="10000005", hashed_password=get_password_hash("old-password"))
+    pg_db.add(user)
+    pg_db.commit()
+
+    async def run():
+        results = []
+        await _prime_caches(user)
+        await update_profile(UserUpdate(nickname="Erin"), db=pg_db, current_user=user)
+        results.append(await _caches_cleared(user))
+
+        await _prime_caches(user)
+        await update_password(
+            UserPasswordUpdate(old_password="old-password", new_password="NewPassword1"),
+            db=pg_db, current_user=user,
+        )
+        results.append(await _caches_cleared(user))
+
+        await _prime_caches(user)
+        await update_timezone(TimezoneUpdate(timezone="Europe/Berlin"), db=pg_db, current_user=user)
+        results.append(await _caches_cleared(user))
+        return results
+
+    principal_cache.clear()
+    assert asyncio.run(run()) == [True, True, True]
+
+
+def test_background_invalidation_keeps_task_reference():
+    async def run():
+        redis_module.redis_client = MemoryCacheWrapper()
+        redis_module._redis_loop = None
+        redis = await get_redis()
+        await redis.set("user_auth:frank", "{}")
+
+        UserService._invalidate_auth_cache("frank")
+        pending = len(user_service_module._pending_invalidations)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return pending, len(user_service_module._pending_invalidations), await redis.get("user_auth:frank")
+
+    pending, remaining, cached = asyncio.run(run())
+    assert pending == 1 and remaining == 0 and cached is None
@@ -0,0 +1,43 @@
+"""
+头像多尺寸版本测试
+
+1. 生成 32/64/100 像素的 JPEG/WebP 版本（100 像素 JPEG 为原头像，不重复生成）
+2. 按 size 参数与 Accept 头选择版本
+"""
+
+import os
+import sys
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from app.services.avatar_rendition_service import AvatarRenditionService
+from app.services.storage_service import StorageService
+
+
+def _avatar() -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (100, 100), (10, 200, 30)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_renditions_generated():
+    """各尺寸版本尺寸与格式正确"""
+    renditions, stages = StorageService._process_avatar_renditions(_avatar())
+
+    assert set(renditions) == {(32, "jpeg"), (32, "webp"), (64, "jpeg"), (64, "webp"), (100, "webp")}
+    for (size, fmt), data in renditions.items():
+        image = Image.open(BytesIO(data))
+        assert image.size == (size, size)
+        assert image.format == fmt.upper()
+    assert "renditions" in stages
+
+
+def test_negotiate():
+    """选择不小于请求尺寸的最小版本，接受 WebP 时优先 WebP"""
+    assert AvatarRenditionService.negotiate(None, None) == (100, "jpeg")
+    assert AvatarRenditionService.negotiate(24, "image/jpeg") == (32, "jpeg")
+    assert AvatarRenditionService.negotiate(48, "image/webp,image/*") == (64, "webp")
+    assert AvatarRenditionService.negotiate(512, "image/webp") == (100, "webp")
@@ -0,0 +1,78 @@
+"""
+用户头像路由测试（经完整应用路由，需要 TEST_DATABASE_URL，见 conftest.py）
+
+1. /api/profile/avatar/{bipupu_id} 与公共头像接口返回同一头像，支持 size 参数
+2. 用户信息中的 avatar_url 指向实际挂载的头像路由；哈希过期时重定向到当前版本
+"""
+
+from io import BytesIO
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.db.database import get_db
+from app.main import app
+from app.models.user import User
+from app.services.avatar_rendition_service import AvatarRenditionService
+
+
+def _avatar() -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (100, 100), (200, 30, 10)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(pg_db):
+    app.dependency_overrides[get_db] = lambda: pg_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def user(pg_db):
+    user = User(username="grace", bipupu_id="10000007", hashed_password="x", avatar_data=_avatar())
+    pg_db.add(user)
+    pg_db.flush()
+    asyncio.run(AvatarRenditionService.save_renditions(pg_db, AvatarRenditionService.user_key(user.id), user.avatar_data))
+    pg_db.commit()
+    return user
+
+
+def test_profile_avatar_route(client, user):
+    response = client.get(f"/api/profile/avatar/{user.bipupu_id}")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.content == user.avatar_data
+
+    small = client.get(f"/api/profile/avatar/{user.bipupu_id}", params={"size": 32})
+    assert small.status_code == 200
+    assert Image.open(BytesIO(small.content)).size == (32, 32)
+
+    assert client.get("/api/profile/avatar/19999999").status_code == 404
+
+
+def test_avatar_url_resolves_through_app(client, user, pg_db):
+    assert user.avatar_url == app.url_path_for(
+        "get_user_avatar_by_hash", bipupu_id=user.bipupu_id, avatar_hash=user.avatar_hash
+    )
+    response = client.get(user.avatar_url)
+    assert response.status_code == 200 and response.content == user.avatar_data
+    assert "immutable" in response.headers["cache-control"]
+
+    # 公开信息接口返回的 avatar_url 同样可用
+    public = client.get(f"/api/users/users/{user.bipupu_id}").json()
+    assert client.get(public["avatar_url"]).status_code == 200
+
+    # 过期哈希重定向到当前版本（保留 size）
+    stale = client.get(f"/api/users/users/{user.bipupu_id}/avatar/0000", params={"size": 32}, follow_redirects=False)
+    assert stale.status_code == 302
+    assert stale.headers["location"] == f"{user.avatar_url}?size=32"
+    assert client.get(stale.headers["location"]).status_code == 200
+
+    # 尚未回填哈希的头像使用不带哈希的地址
+    user.avatar_hash = None
+    assert client.get(user.avatar_url).status_code == 200
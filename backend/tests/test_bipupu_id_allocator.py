@@ -0,0 +1,128 @@
+"""
+bipupu_id 分配器测试
+
+使用内存实现替换数据库操作：
+1. 优先复用空闲池中的空洞
+2. 新 ID 按批从序列预分配，同批内不再访问序列
+3. 位数用尽时报错，调大位数后继续分配
+4. 进程退出时归还未用完的预分配 ID
+5. 真实数据库上空洞复用按 (位数, 数值) 取最小值，并发事务经 SKIP LOCKED 互不等待、不取同一个，
+   回滚后 ID 回到空闲池；取号走 ix_bipupu_id_free_length_id 索引（需要 TEST_DATABASE_URL，见 conftest.py）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import text
+
+from app.services.bipupu_id_allocator import BipupuIdAllocator, BipupuIdExhausted
+
+
+class FakeAllocator(BipupuIdAllocator):
+    """以内存集合模拟 bipupu_id_free 表和 bipupu_id_seq 序列"""
+
+    def __init__(self, *args, start: int = 1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.free = set()
+        self.next_value = start
+        self.sequence_calls = 0
+
+    def _take_free(self, db):
+        if not self.free:
+            return None
+        bipupu_id = min(self.free, key=lambda value: (len(value), value))
+        self.free.discard(bipupu_id)
+        return bipupu_id
+
+    def _reserve_from_sequence(self, db, count):
+        self.sequence_calls += 1
+        values = list(range(self.next_value, self.next_value + count))
+        self.next_value += count
+        return values
+
+    def _put_free(self, db, bipupu_ids):
+        self.free.update(bipupu_ids)
+
+
+class FakeSession:
+    def commit(self):
+        pass
+
+
+def test_reuse_holes_first():
+    """空闲池中的空洞优先分配"""
+    allocator = FakeAllocator(width=4, batch_size=5)
+    allocator.release(None, ["0007", "0003"])
+
+    assert allocator.allocate(None) == "0003"
+    assert allocator.allocate(None) == "0007"
+    assert allocator.allocate(None) == "0001"
+
+
+def test_batch_reservation():
+    """同一批预分配内只访问一次序列"""
+    allocator = FakeAllocator(width=4, batch_size=5)
+    ids = [allocator.allocate(None) for _ in range(7)]
+
+    assert ids == ["0001", "0002", "0003", "0004", "0005", "0006", "0007"]
+    assert allocator.sequence_calls == 2
+
+
+def test_exhausted_and_widen():
+    """位数用尽时报错，调大位数后继续分配"""
+    allocator = FakeAllocator(width=4, batch_size=1, start=9999)
+    assert allocator.allocate(None) == "9999"
+    with pytest.raises(BipupuIdExhausted):
+        allocator.allocate(None)
+
+    widened = FakeAllocator(width=5, batch_size=1, start=10000)
+    assert widened.allocate(None) == "10000"
+
+
+def test_release_reserved():
+    """归还未用完的预分配 ID"""
+    allocator = FakeAllocator(width=4, batch_size=5)
+    assert allocator.allocate(None) == "0001"
+
+    assert allocator.release_reserved(FakeSession()) == 4
+    assert allocator.free == {"0002", "0003", "0004", "0005"}
+    assert allocator.allocate(None) == "0002"
+
+
+def test_take_free_skip_locked(pg_db):
+    from app.db.database import SessionLocal
+
+    pg_db.execute(text("INSERT INTO bipupu_id_free (bipupu_id) VALUES ('0010'), ('00001'), ('0002'), ('0100')"))
+    pg_db.commit()
+    allocator = BipupuIdAllocator(width=4)
+
+    first = SessionLocal()
+    second = SessionLocal()
+    try:
+        assert allocator._take_free(first) == "0002"
+        # first 未提交、仍锁着 0002；second 不等待锁（超时即失败），直接取下一个
+        second.execute(text("SET LOCAL lock_timeout = '1s'"))
+        assert allocator._take_free(second) == "0010"
+        first.rollback()
+        second.commit()
+
+        # 回滚后 0002 回到空闲池；较长的 ID 排在同位数之后
+        assert allocator._take_free(pg_db) == "0002"
+        assert allocator._take_free(pg_db) == "0100"
+        assert allocator._take_free(pg_db) == "00001"
+        assert allocator._take_free(pg_db) is None
+        pg_db.rollback()
+
+        pg_db.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = "\n".join(pg_db.execute(text(
+            "EXPLAIN SELECT bipupu_id FROM bipupu_id_free "
+            "ORDER BY length(bipupu_id), bipupu_id LIMIT 1 FOR UPDATE SKIP LOCKED"
+        )).scalars())
+        assert "ix_bipupu_id_free_length_id" in plan and "Sort" not in plan
+        pg_db.rollback()
+    finally:
+        first.close()
+        second.close()
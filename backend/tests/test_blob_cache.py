@@ -0,0 +1,146 @@
+"""
+图片二进制缓存测试
+
+1. 进程内 LRU 按字节计量容量并淘汰最久未用的项
+2. 原始字节往返无损，命中率统计
+3. 超过单项上限的图片不缓存
+4. 旧事件循环上的 Redis 客户端（二进制与 get_redis 的文本客户端）在重建前关闭连接
+5. 命中率经 /metrics 暴露
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis.asyncio as redis
+
+import app.db.redis as redis_module
+import app.services.blob_cache as blob_cache_module
+from app.api.routes.root import runtime_metrics
+from app.core.principal import Principal
+from app.db.redis import _close_stale_client
+from app.services.blob_cache import BlobCache, BytesLRU
+
+
+async def _no_redis():
+    return None
+
+
+def test_bytes_lru_eviction():
+    """超过字节容量时淘汰最久未使用的项"""
+    lru = BytesLRU(max_bytes=10)
+    lru.set("a", b"1234")
+    lru.set("b", b"5678")
+    assert lru.get("a") == b"1234"  # a 变为最近使用
+    lru.set("c", b"90ab")
+
+    assert lru.get("b") is None
+    assert lru.get("a") == b"1234"
+    assert lru.size == 8
+
+    lru.set("huge", b"x" * 11)
+    assert lru.get("huge") is None
+
+
+def test_roundtrip_and_stats(monkeypatch):
+    """原始字节往返无损，统计命中与未命中"""
+    monkeypatch.setattr(blob_cache_module, "get_binary_redis", _no_redis)
+
+    async def run():
+        cache = BlobCache(l1_max_bytes=1024, max_item_bytes=256, ttl=60)
+        data = bytes(range(256))
+
+        assert await cache.get("avatar:0001:abc") is None
+        await cache.set("avatar:0001:abc", data)
+        assert await cache.get("avatar:0001:abc") == data
+
+        await cache.set("poster:1:def", b"x" * 257)
+        assert await cache.get("poster:1:def") is None
+
+        stats = cache.get_stats()
+        assert stats["l1_hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["l1_bytes"] == 256
+
+    asyncio.run(run())
+
+
+def _resp_server():
+    """最小 RESP 服务：PING 回复 PONG，其他命令回复 OK；记录已断开的连接数"""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    closed = []
+
+    def handle(conn):
+        while True:
+            data = conn.recv(4096)
+            if not data:
+                closed.append(conn)
+                conn.close()
+                return
+            commands = [c for c in (b"\r\n" + data).split(b"\r\n*") if c]
+            conn.sendall(b"".join(b"+PONG\r\n" if b"PING" in c.upper() else b"+OK\r\n" for c in commands))
+
+    def serve():
+        while True:
+            conn, _ = listener.accept()
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener.getsockname()[1], closed
+
+
+def test_close_client_from_finished_loop():
+    """Celery 每个任务一次 asyncio.run：下一个循环中关闭旧客户端时连接被释放"""
+    port, closed = _resp_server()
+    clients = []
+
+    async def first_task():
+        client = redis.Redis.from_url(f"redis://127.0.0.1:{port}", decode_responses=False)
+        await client.ping()
+        clients.append(client)
+
+    async def second_task():
+        await _close_stale_client(clients[0])
+
+    asyncio.run(first_task())
+    asyncio.run(second_task())
+
+    deadline = time.monotonic() + 2
+    while not closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(closed) == 1
+
+
+def test_get_redis_closes_client_from_finished_loop(monkeypatch):
+    """get_redis 在新循环中重建文本客户端时关闭旧循环上的连接池"""
+    port, closed = _resp_server()
+    monkeypatch.setenv("REDIS_URL", f"redis://127.0.0.1:{port}")
+    monkeypatch.setattr(redis_module, "redis_client", None)
+    monkeypatch.setattr(redis_module, "_redis_loop", None)
+
+    async def task():
+        client = await redis_module.get_redis()
+        await client.set("k", "v")
+        return client
+
+    first = asyncio.run(task())
+    second = asyncio.run(task())
+    assert isinstance(first, redis.Redis) and second is not first
+
+    deadline = time.monotonic() + 2
+    while not closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(closed) == 1
+
+
+def test_metrics_route_exposes_hit_rate():
+    admin = Principal({"id": 1, "username": "admin", "is_active": True, "is_superuser": True})
+    metrics = asyncio.run(runtime_metrics(current_user=admin))
+    assert {"l1_hits", "l2_hits", "hit_rate", "l1_bytes"} <= set(metrics["blob_cache"])
@@ -0,0 +1,61 @@
+"""
+消息缓存版本号失效测试（MemoryCacheWrapper）
+
+1. 缓存键嵌入版本号
+2. 失效只递增版本号，旧缓存不再被读取
+3. 不同用户、不同作用域互不影响
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.db.redis as redis_module
+from app.db.redis import MemoryCacheWrapper
+from app.schemas.message import MessageListResponse
+from app.services.cache_service import CacheService
+
+
+def _use_memory_cache() -> MemoryCacheWrapper:
+    cache = MemoryCacheWrapper()
+    redis_module.redis_client = cache
+    redis_module._redis_loop = None
+    return cache
+
+
+def test_invalidate_bumps_version():
+    """失效后生成新的缓存键，旧缓存不再命中"""
+    async def run():
+        _use_memory_cache()
+        response = MessageListResponse(messages=[], total=0, page=1, page_size=20)
+
+        key = await CacheService.generate_inbox_cache_key(1, 1, 20)
+        assert ":v0:" in key
+        await CacheService.set_message_list(key, response)
+        assert await CacheService.get_message_list(key) is not None
+
+        await CacheService.invalidate_user_inbox_cache(1)
+        new_key = await CacheService.generate_inbox_cache_key(1, 1, 20)
+        assert new_key != key
+        assert await CacheService.get_message_list(new_key) is None
+
+    asyncio.run(run())
+
+
+def test_scopes_are_independent():
+    """收件箱失效不影响发件箱和其他用户"""
+    async def run():
+        _use_memory_cache()
+        sent_key = await CacheService.generate_sent_cache_key(2, 1, 20)
+        other_key = await CacheService.generate_inbox_cache_key(3, 1, 20)
+
+        await CacheService.invalidate_user_inbox_cache(2)
+        assert await CacheService.generate_sent_cache_key(2, 1, 20) == sent_key
+        assert await CacheService.generate_inbox_cache_key(3, 1, 20) == other_key
+
+        await CacheService.invalidate_user_message_cache(2)
+        assert await CacheService.generate_sent_cache_key(2, 1, 20) != sent_key
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+"""
+内容寻址图片 URL 测试
+
+1. 写入图片数据时自动计算内容哈希，URL 随内容变化
+2. If-None-Match 命中时返回 304，不读取图片数据
+3. 版本化 URL 带 immutable 缓存头
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+
+from app.models.user import User
+from app.models.poster import Poster
+from app.services.storage_service import StorageService, IMMUTABLE_CACHE_CONTROL
+
+
+def _request(headers=None) -> Request:
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw_headers})
+
+
+def test_hash_follows_content():
+    """写入图片数据时同步更新哈希与 URL"""
+    user = User(bipupu_id="0001", username="alice", hashed_password="x")
+    user.avatar_data = b"avatar-v1"
+    first_hash = user.avatar_hash
+    assert first_hash == StorageService.get_content_hash(b"avatar-v1")
+    assert user.avatar_url == f"/api/users/users/0001/avatar/{first_hash}"
+
+    user.avatar_data = b"avatar-v2"
+    assert user.avatar_hash != first_hash
+
+    user.avatar_data = None
+    assert user.avatar_hash is None
+
+    poster = Poster(id=3, title="p", image_data=b"poster")
+    assert poster.image_url == f"/api/posters/3/image/{poster.image_hash}"
+
+
+def test_not_modified_without_loading():
+    """ETag 命中时不调用 load_content"""
+    async def run():
+        content_hash = StorageService.get_content_hash(b"data")
+
+        def load_content():
+            raise AssertionError("304 响应不应读取图片数据")
+
+        response = await StorageService.serve_image(
+            _request({"If-None-Match": f'"{content_hash}"'}),
+            content_hash,
+            load_content,
+            immutable=True
+        )
+        assert response.status_code == 304
+        assert response.headers["etag"] == f'"{content_hash}"'
+
+    asyncio.run(run())
+
+
+def test_immutable_response():
+    """版本化 URL 返回内容并带 immutable 缓存头"""
+    async def run():
+        content_hash = StorageService.get_content_hash(b"data")
+        response = await StorageService.serve_image(
+            _request(), content_hash, lambda: b"data", immutable=True
+        )
+        assert response.status_code == 200
+        assert response.body == b"data"
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+    asyncio.run(run())
@@ -0,0 +1,70 @@
+"""
+推送内容生成器测试
+
+1. 运势/天气内容确定性：同一用户、同一天结果一致，不影响全局 random 状态
+2. 记忆缓存：种子相同的用户、同一城市同一小时共享内容，超出容量按 LRU 淘汰
+3. 批量接口与逐条生成结果一致
+"""
+
+import os
+import random
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.push.content import ContentGenerator, ContentMemo
+
+
+NOW = datetime(2026, 10, 17, 9, 0, tzinfo=timezone.utc)
+
+
+def test_deterministic_and_isolated():
+    """结果只由输入决定，且不修改全局随机状态"""
+    random.seed(42)
+    expected_next = random.random()
+    random.seed(42)
+
+    generator = ContentGenerator()
+    fortune = generator.generate_fortune("1234", NOW)
+    weather = generator.generate_weather("上海", NOW)
+
+    assert random.random() == expected_next
+    assert ContentGenerator().generate_fortune("1234", NOW) == fortune
+    assert ContentGenerator().generate_weather("上海", NOW) == weather
+    assert NOW.strftime("%Y年%m月%d日") in fortune
+
+
+def test_memo_shared_between_recipients():
+    """种子相同的用户与同一城市的订阅者命中同一缓存项"""
+    generator = ContentGenerator()
+    # "1234" 与 "4321" 的字符和相同 → 同一种子
+    assert generator.generate_fortune("1234", NOW) == generator.generate_fortune("4321", NOW)
+    generator.generate_weather("北京", NOW)
+    generator.generate_weather("北京", NOW.replace(minute=30))
+
+    stats = generator.memo.get_stats()
+    assert stats["misses"] == 2
+    assert stats["hits"] == 2
+
+
+def test_memo_eviction():
+    """超出容量时淘汰最久未使用的项"""
+    memo = ContentMemo(max_size=2)
+    memo.get_or_create("a", lambda: "A")
+    memo.get_or_create("b", lambda: "B")
+    memo.get_or_create("a", lambda: "A2")
+    memo.get_or_create("c", lambda: "C")
+
+    assert len(memo) == 2
+    assert memo.get_or_create("a", lambda: "A3") == "A"
+    assert memo.get_or_create("b", lambda: "B2") == "B2"
+
+
+def test_generate_batch_matches_single():
+    """批量生成与逐条生成一致，顺序对应"""
+    generator = ContentGenerator()
+    user_ids = [f"{i:04d}" for i in range(200)]
+    for service_name in ("cosmic.fortune", "weather.service", "unknown.service"):
+        batch = generator.generate_batch(service_name, user_ids, NOW)
+        assert batch == [generator.get_service_content(service_name, uid, NOW) for uid in user_ids]
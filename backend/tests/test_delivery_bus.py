@@ -0,0 +1,84 @@
+"""
+跨进程投递总线测试
+
+使用 InMemoryDeliveryBus 模拟多个 API worker：
+1. 本进程持有连接时直接投递
+2. 其他进程持有连接时经总线转发
+3. 发布者不会重复投递自己发布的消息
+4. 信封编解码
+"""
+
+import asyncio
+import json
+import os
+import sys
+from unittest.mock import AsyncMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.delivery_bus import InMemoryDeliveryBus, encode_envelope, decode_envelope
+from app.core.websocket import ConnectionManager
+
+
+TEST_MESSAGE = {"type": "new_message", "message": {"id": 1, "content": "测试消息"}}
+
+
+def _make_worker(bus: InMemoryDeliveryBus) -> ConnectionManager:
+    return ConnectionManager(bus=bus)
+
+
+def test_cross_process_delivery():
+    """其他 worker 持有接收者连接时，消息经总线送达"""
+    async def run():
+        bus = InMemoryDeliveryBus()
+        worker_a = _make_worker(bus)
+        worker_b = _make_worker(bus)
+        await worker_a.start_delivery()
+        await worker_b.start_delivery()
+
+        websocket = AsyncMock()
+        await worker_b.connect(websocket, "0001")
+
+        ok = await worker_a.send_personal_message(TEST_MESSAGE, "0001")
+        assert ok is True
+        websocket.send_text.assert_awaited_once_with(json.dumps(TEST_MESSAGE, ensure_ascii=False))
+
+    asyncio.run(run())
+
+
+def test_local_delivery_not_duplicated():
+    """发布者本地持有连接时只投递一次"""
+    async def run():
+        bus = InMemoryDeliveryBus()
+        worker_a = _make_worker(bus)
+        worker_b = _make_worker(bus)
+        await worker_a.start_delivery()
+        await worker_b.start_delivery()
+
+        websocket = AsyncMock()
+        await worker_a.connect(websocket, "0002")
+
+        await worker_a.send_personal_message(TEST_MESSAGE, "0002")
+        assert websocket.send_text.await_count == 1
+
+    asyncio.run(run())
+
+
+def test_offline_user():
+    """没有任何订阅者且用户不在线时返回 False"""
+    async def run():
+        bus = InMemoryDeliveryBus()
+        worker = _make_worker(bus)
+        await worker.start_delivery()
+        assert await worker.send_personal_message(TEST_MESSAGE, "0003") is False
+
+    asyncio.run(run())
+
+
+def test_envelope_roundtrip():
+    """信封编解码"""
+    raw = encode_envelope("host:1", "0004", TEST_MESSAGE)
+    envelope = decode_envelope(raw.encode("utf-8"))
+    assert envelope == {"origin": "host:1", "target": "0004", "payload": TEST_MESSAGE}
+    assert decode_envelope("not json") is None
+    assert decode_envelope(json.dumps({"target": "0004"})) is None
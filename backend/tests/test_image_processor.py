@@ -0,0 +1,107 @@
+"""
+图片处理进程池测试
+
+1. 头像在子进程中处理，结果与原流程一致（裁剪为正方形并压缩）
+2. 记录处理次数与阶段耗时
+3. 进程池饱和时拒绝请求
+4. 计时指标经 /metrics 暴露
+5. 任务超时即使任务自身捕获 OSError / Exception，也按超时报告并计入 timeouts
+"""
+
+import asyncio
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from PIL import Image
+
+from app.api.routes.root import runtime_metrics
+from app.core.image_processor import ImageProcessor, ImageProcessorBusy, ImageProcessTimeout, image_processor
+from app.core.principal import Principal
+from app.services.storage_service import StorageService, AVATAR_MAX_SIZE
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (255, 0, 0)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def _slow_job(seconds: float):
+    """与 _process_poster / _process_avatar 相同的异常处理结构"""
+    try:
+        time.sleep(seconds)
+        return b"", {}
+    except OSError:
+        raise ValueError("图片文件损坏或格式不支持")
+    except Exception as e:
+        raise ValueError(f"头像图片处理失败: {e}")
+
+
+def test_avatar_processed_off_loop():
+    """头像在进程池中裁剪压缩，并记录阶段耗时"""
+    async def run():
+        data = await StorageService.save_avatar_bytes(_jpeg(1600, 800))
+        image = Image.open(BytesIO(data))
+        assert image.format == "JPEG"
+        assert image.size == (AVATAR_MAX_SIZE, AVATAR_MAX_SIZE)
+
+        stats = image_processor.get_stats()
+        assert stats["count"] >= 1
+        assert {"decode", "resize", "encode"} <= set(stats["stage_avg_ms"])  # 统计为进程级，可能含其他用例的阶段
+
+    try:
+        asyncio.run(run())
+    finally:
+        image_processor.shutdown()
+
+
+def test_invalid_image_rejected():
+    """无法解码的数据抛出 ValueError"""
+    async def run():
+        with pytest.raises(ValueError):
+            await StorageService.save_avatar_bytes(b"not an image")
+
+    try:
+        asyncio.run(run())
+    finally:
+        image_processor.shutdown()
+
+
+def test_busy_when_saturated():
+    """在途任务达到上限时直接拒绝"""
+    async def run():
+        processor = ImageProcessor(workers=1, max_queue=0, queue_timeout=1, job_timeout=5, max_memory_mb=0)
+        processor._in_flight = 1
+        with pytest.raises(ImageProcessorBusy):
+            await processor.run(StorageService._process_avatar, _jpeg(10, 10))
+        assert processor.get_stats()["rejected"] == 1
+
+    asyncio.run(run())
+
+
+def test_metrics_route_exposes_stage_timings():
+    admin = Principal({"id": 1, "username": "admin", "is_active": True, "is_superuser": True})
+    metrics = asyncio.run(runtime_metrics(current_user=admin))
+    assert {"in_flight", "count", "timeouts", "avg_ms", "stage_avg_ms"} <= set(metrics["image_processor"])
+
+
+def test_job_timeout_not_swallowed():
+    """超过 job_timeout 的任务抛出 ImageProcessTimeout 并计入 timeouts，进程池仍可用"""
+    processor = ImageProcessor(workers=1, max_queue=0, queue_timeout=5, job_timeout=1, max_memory_mb=0)
+
+    async def run():
+        with pytest.raises(ImageProcessTimeout, match="超时"):
+            await processor.run(_slow_job, 3)
+        assert await processor.run(_slow_job, 0) == b""
+        return processor.get_stats()
+
+    try:
+        stats = asyncio.run(run())
+    finally:
+        processor.shutdown()
+    assert stats["timeouts"] == 1 and stats["failed"] == 0 and stats["count"] == 1
@@ -0,0 +1,82 @@
+"""
+惰性会话与缓存优先认证测试
+
+1. LazySession 未使用时不创建会话，commit/close 为空操作
+2. 认证缓存命中时 get_current_principal 不访问数据库
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+import app.db.redis as redis_module
+from app.core.principal import principal_cache
+from app.db.redis import MemoryCacheWrapper
+from app.db.database import LazySession
+from app.core.security import create_access_token, get_current_principal
+
+
+class _CountingFactory:
+    def __init__(self):
+        self.created = 0
+
+    def __call__(self):
+        self.created += 1
+        return _FakeSession()
+
+
+class _FakeSession:
+    def __init__(self):
+        self.committed = False
+
+    def query(self, *args):
+        return "query"
+
+    def commit(self):
+        self.committed = True
+
+    def close(self):
+        pass
+
+
+def test_lazy_session_not_created_when_unused():
+    factory = _CountingFactory()
+    db = LazySession(factory)
+    db.commit()
+    db.close()
+    assert factory.created == 0 and db.materialized is False
+
+
+def test_lazy_session_created_on_first_use():
+    factory = _CountingFactory()
+    db = LazySession(factory)
+    assert db.query("User") == "query"
+    assert factory.created == 1 and db.materialized is True
+    db.commit()
+    assert db._session.committed is True
+
+
+def test_principal_from_auth_cache_without_db():
+    """缓存命中时直接返回 Principal（测试环境无数据库，访问即失败）"""
+    async def run():
+        cache = MemoryCacheWrapper()
+        redis_module.redis_client = cache
+        redis_module._redis_loop = None
+        principal_cache.clear()
+        await cache.set("user_auth:alice", json.dumps({
+            "id": 7, "bipupu_id": "1000007", "username": "alice",
+            "nickname": None, "is_active": True, "is_superuser": False, "timezone": "Asia/Shanghai",
+        }))
+
+        token = create_access_token({"sub": "alice"})
+        principal = await get_current_principal(
+            HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        )
+        assert principal.id == 7 and principal.bipupu_id == "1000007"
+
+    asyncio.run(run())
@@ -0,0 +1,121 @@
+"""
+消息列表键集分页测试（需要 TEST_DATABASE_URL，见 conftest.py）
+
+1. 第一页：按 id 降序，has_more / next_cursor 指向更早的消息
+2. before_id / after_id 游标不包含游标本身，after_id 返回紧接游标之后的一段
+3. 最后一页 has_more 为 False、next_cursor 为 None
+4. /messages/inbox、/messages/sent 路由（经时间线缓存）与数据库分页结果一致
+"""
+
+import asyncio
+
+from fastapi import HTTPException
+
+from app.api.routes.messages import get_received_messages, get_sent_messages
+from app.core.principal import Principal
+from app.db.database import async_engine, get_async_db_context
+from app.models.message import Message
+from app.services.message_service import MessageService
+
+ME = "20000001"
+
+
+def _seed(db) -> list:
+    """收件箱 5 条（夹杂他人消息），发件箱 2 条；返回收件箱消息 id（升序）"""
+    received = []
+    for i in range(5):
+        msg = Message(content=f"in {i}", message_type="NORMAL", sender_bipupu_id="20000002", receiver_bipupu_id=ME)
+        db.add(msg)
+        db.add(Message(content="other", message_type="NORMAL", sender_bipupu_id="20000002", receiver_bipupu_id="20000003"))
+        db.flush()
+        received.append(msg.id)
+    for i in range(2):
+        db.add(Message(content=f"out {i}", message_type="NORMAL", sender_bipupu_id=ME, receiver_bipupu_id="20000002"))
+    db.commit()
+    return received
+
+
+def _run(coro_fn):
+    async def run():
+        try:
+            async with get_async_db_context() as db:
+                return await coro_fn(db)
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(run())
+
+
+def _ids(response) -> list:
+    return [message.id for message in response.messages]
+
+
+def test_first_page_and_before_id(pg_db):
+    ids = _seed(pg_db)
+
+    async def pages(db):
+        first = await MessageService.list_messages(db, ME, page_size=2)
+        second = await MessageService.list_messages(db, ME, page_size=2, before_id=first.next_cursor)
+        last = await MessageService.list_messages(db, ME, page_size=2, before_id=second.next_cursor)
+        return first, second, last
+
+    first, second, last = _run(pages)
+
+    assert _ids(first) == [ids[4], ids[3]]
+    assert first.total == 5 and first.has_more and first.next_cursor == ids[3]
+
+    # before_id 不包含游标本身，游标模式默认不统计总数
+    assert _ids(second) == [ids[2], ids[1]]
+    assert second.total is None and second.has_more and second.next_cursor == ids[1]
+
+    assert _ids(last) == [ids[0]]
+    assert last.has_more is False and last.next_cursor is None
+
+
+def test_after_id(pg_db):
+    ids = _seed(pg_db)
+
+    async def pages(db):
+        newer = await MessageService.list_messages(db, ME, page_size=2, after_id=ids[0])
+        newest = await MessageService.list_messages(db, ME, page_size=2, after_id=newer.next_cursor)
+        empty = await MessageService.list_messages(db, ME, page_size=2, after_id=ids[4])
+        return newer, newest, empty
+
+    newer, newest, empty = _run(pages)
+
+    # 紧接游标之后的 page_size 条，降序返回；next_cursor 为其中最新的一条
+    assert _ids(newer) == [ids[2], ids[1]]
+    assert newer.has_more and newer.next_cursor == ids[2]
+
+    assert _ids(newest) == [ids[4], ids[3]]
+    assert newest.has_more is False and newest.next_cursor is None
+
+    assert _ids(empty) == [] and empty.has_more is False and empty.next_cursor is None
+
+
+def test_routes_match_database_pages(pg_db):
+    ids = _seed(pg_db)
+    me = Principal({"id": 1, "bipupu_id": ME, "username": "me", "is_active": True})
+
+    async def pages(db):
+        params = dict(since_id=0, include_total=None, current_user=me, db=db)
+        first = await get_received_messages(page=1, page_size=2, before_id=None, after_id=None, **params)
+        second = await get_received_messages(page=1, page_size=2, before_id=first.next_cursor, after_id=None, **params)
+        last = await get_received_messages(page=1, page_size=2, before_id=second.next_cursor, after_id=None, **params)
+        newer = await get_received_messages(page=1, page_size=2, before_id=None, after_id=ids[0], **params)
+        sent = await get_sent_messages(page=1, page_size=20, before_id=None, after_id=None, **params)
+        try:
+            await get_received_messages(page=1, page_size=2, before_id=ids[3], after_id=ids[0], **params)
+            conflict = None
+        except HTTPException as e:
+            conflict = e.status_code
+        return first, second, last, newer, sent, conflict
+
+    first, second, last, newer, sent, conflict = _run(pages)
+
+    assert _ids(first) == [ids[4], ids[3]] and first.next_cursor == ids[3]
+    assert _ids(second) == [ids[2], ids[1]] and second.next_cursor == ids[1]
+    assert _ids(last) == [ids[0]] and last.has_more is False and last.next_cursor is None
+    assert _ids(newer) == [ids[2], ids[1]] and newer.next_cursor == ids[2]
+    assert [m.content for m in sent.messages] == ["out 1", "out 0"] and sent.has_more is False
+    assert conflict == 400
@@ -0,0 +1,43 @@
+"""
+月分区维护测试（纯计算部分）
+
+1. 分区月份范围：起始月至今后 N 个月，跨年
+2. 过期判断：分区上界不晚于截止时间才过期
+3. 分区 DDL 使用 UTC 边界
+"""
+
+import os
+import sys
+from datetime import date, datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.partitions import (
+    add_months,
+    create_partition_sql,
+    expired_months,
+    partition_months,
+    partition_name,
+)
+
+
+def test_partition_months_across_year():
+    months = partition_months(date(2026, 10, 17), date(2026, 11, 3), 3)
+    assert months == [date(2026, 10, 1), date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1), date(2027, 2, 1)]
+    assert add_months(date(2026, 12, 1), 1) == date(2027, 1, 1)
+    assert add_months(date(2027, 1, 1), -1) == date(2026, 12, 1)
+
+
+def test_expired_months_whole_month_only():
+    months = [date(2026, 8, 1), date(2026, 9, 1), date(2026, 10, 1)]
+    cutoff = datetime(2026, 9, 17, tzinfo=timezone.utc)
+    assert expired_months(months, cutoff) == [date(2026, 8, 1)]
+    assert expired_months(months, datetime(2026, 9, 1, tzinfo=timezone.utc)) == [date(2026, 8, 1)]
+    assert expired_months(months, datetime(2026, 8, 31, 23, 59, tzinfo=timezone.utc)) == []
+
+
+def test_create_partition_sql():
+    assert partition_name("push_logs", date(2026, 12, 1)) == "push_logs_p202612"
+    sql = create_partition_sql("push_logs", date(2026, 12, 1))
+    assert 'CREATE TABLE IF NOT EXISTS "push_logs_p202612" PARTITION OF "push_logs"' in sql
+    assert "FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')" in sql
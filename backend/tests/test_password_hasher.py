@@ -0,0 +1,68 @@
+"""
+密码哈希线程池测试
+
+1. 哈希/校验在线程池中执行，结果正确并记录计时
+2. 在途请求超过并发 + 队列上限时拒绝
+3. 计时指标经 /metrics（管理员）暴露
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes.root import runtime_metrics
+from app.core.password_hasher import PasswordHasher, PasswordHasherBusy
+from app.core.principal import Principal
+from app.core.security import get_password_hash, verify_password
+
+
+def test_hash_and_verify_in_pool():
+    async def run():
+        hasher = PasswordHasher(workers=1, max_queue=1, queue_timeout=5)
+        hashed = await hasher.run(get_password_hash, "secret123")
+        assert await hasher.run(verify_password, "secret123", hashed) is True
+        stats = hasher.get_stats()
+        assert stats["count"] == 2 and stats["rejected"] == 0
+        hasher.shutdown()
+
+    asyncio.run(run())
+
+
+def test_rejects_when_saturated():
+    async def run():
+        hasher = PasswordHasher(workers=1, max_queue=1, queue_timeout=5)
+        release = threading.Event()
+
+        running = asyncio.ensure_future(hasher.run(release.wait))
+        queued = asyncio.ensure_future(hasher.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        try:
+            await hasher.run(release.wait)
+            assert False, "应当拒绝"
+        except PasswordHasherBusy:
+            pass
+
+        release.set()
+        await asyncio.gather(running, queued)
+        assert hasher.get_stats()["rejected"] == 1
+        hasher.shutdown()
+
+    asyncio.run(run())
+
+
+def test_metrics_route_exposes_hasher_stats():
+    admin = Principal({"id": 1, "username": "admin", "is_active": True, "is_superuser": True})
+    metrics = asyncio.run(runtime_metrics(current_user=admin))
+    assert {"in_flight", "count", "rejected", "avg_ms", "max_ms"} <= set(metrics["password_hasher"])
+
+    user = Principal({"id": 2, "username": "user", "is_active": True, "is_superuser": False})
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(runtime_metrics(current_user=user))
+    assert excinfo.value.status_code == 403
@@ -0,0 +1,58 @@
+"""
+长轮询唤醒测试
+
+1. 新消息事件唤醒挂起的长轮询
+2. 无事件时按超时返回
+3. 跨 worker 的新消息经投递总线唤醒本进程等待者
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.delivery_bus import InMemoryDeliveryBus
+from app.core.poll_wakeup import PollWakeupRegistry, poll_wakeups
+from app.core.websocket import ConnectionManager
+
+
+def test_wake_waiter():
+    """wake() 唤醒对应用户的等待者"""
+    async def run():
+        registry = PollWakeupRegistry()
+        with registry.listen("0001") as waiter:
+            assert registry.get_waiting_count() == 1
+            asyncio.get_running_loop().call_later(0.01, registry.wake, "0001")
+            assert await waiter.wait(1.0) is True
+        assert registry.get_waiting_count() == 0
+
+    asyncio.run(run())
+
+
+def test_wait_timeout():
+    """无新消息时超时返回 False，其他用户的事件不会唤醒"""
+    async def run():
+        registry = PollWakeupRegistry()
+        with registry.listen("0002") as waiter:
+            assert registry.wake("0003") == 0
+            assert await waiter.wait(0.05) is False
+
+    asyncio.run(run())
+
+
+def test_cross_process_wakeup():
+    """其他 worker 发送的新消息经投递总线唤醒本进程的长轮询"""
+    async def run():
+        bus = InMemoryDeliveryBus()
+        worker_a = ConnectionManager(bus=bus)
+        worker_b = ConnectionManager(bus=bus)
+        await worker_a.start_delivery()
+        await worker_b.start_delivery()
+
+        payload = {"type": "new_message", "message": {"id": 1, "receiver_bipupu_id": "0004"}}
+        with poll_wakeups.listen("0004") as waiter:
+            await worker_a.send_personal_message(payload, "0004")
+            assert await waiter.wait(1.0) is True
+
+    asyncio.run(run())
@@ -0,0 +1,52 @@
+"""
+进程内主体缓存测试
+
+1. 按令牌命中，过期后失效
+2. 按用户名失效该用户的全部令牌（登出按令牌失效）
+3. 超出容量时淘汰最久未使用的条目
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.principal import Principal, PrincipalCache
+
+
+def _principal(username: str) -> Principal:
+    return Principal({"id": 1, "bipupu_id": "1000001", "username": username, "is_active": True})
+
+
+def test_get_and_expire():
+    cache = PrincipalCache(ttl=0.05)
+    cache.set("t1", _principal("alice"))
+    assert cache.get("t1").username == "alice"
+    time.sleep(0.06)
+    assert cache.get("t1") is None
+    assert len(cache) == 0
+
+
+def test_invalidate_user_and_token():
+    cache = PrincipalCache()
+    cache.set("t1", _principal("alice"))
+    cache.set("t2", _principal("alice"))
+    cache.set("t3", _principal("bob"))
+
+    cache.invalidate_user("alice")
+    assert cache.get("t1") is None and cache.get("t2") is None
+    assert cache.get("t3") is not None
+
+    cache.invalidate_token("t3")
+    assert cache.get("t3") is None
+
+
+def test_bounded_lru():
+    cache = PrincipalCache(max_size=2)
+    cache.set("t1", _principal("a"))
+    cache.set("t2", _principal("b"))
+    cache.get("t1")
+    cache.set("t3", _principal("c"))
+    assert cache.get("t2") is None
+    assert cache.get("t1") is not None and cache.get("t3") is not None
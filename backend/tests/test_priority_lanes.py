@@ -0,0 +1,99 @@
+"""
+优先级投递通道测试
+
+1. 本地发送队列中，高优先级消息先于已排队的批量推送发出
+2. 优先级经投递总线信封传递到接收进程
+3. 优先级归一化与 Celery 队列映射
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.delivery_bus import InMemoryDeliveryBus, encode_envelope, decode_envelope
+from app.core.priority import Priority, normalize_priority, queue_for
+from app.core.websocket import ConnectionManager
+
+
+class _BlockingWebSocket:
+    """第一次发送阻塞到 release 被设置，用于让后续消息在队列中堆积"""
+
+    def __init__(self):
+        self.sent = []
+        self.release = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if not self.sent:
+            self.sent.append(text)
+            await self.release.wait()
+            return
+        self.sent.append(text)
+
+
+def test_high_priority_jumps_queue():
+    """发送协程忙碌时排队的消息按优先级出队"""
+    async def run():
+        manager = ConnectionManager(bus=InMemoryDeliveryBus())
+        manager.SENDER_COUNT = 1
+        websocket = _BlockingWebSocket()
+        await manager.connect(websocket, "0001")
+
+        sends = [asyncio.create_task(manager.send_local_message({"n": "bulk-0"}, "0001", Priority.LOW))]
+        await asyncio.sleep(0)
+        for i in range(1, 4):
+            sends.append(asyncio.create_task(manager.send_local_message({"n": f"bulk-{i}"}, "0001", Priority.LOW)))
+        sends.append(asyncio.create_task(manager.send_local_message({"n": "page"}, "0001", Priority.HIGH)))
+        await asyncio.sleep(0.01)
+
+        websocket.release.set()
+        assert all(await asyncio.gather(*sends))
+        order = [text.split('"')[3] for text in websocket.sent]
+        assert order == ["bulk-0", "page", "bulk-1", "bulk-2", "bulk-3"]
+
+        lanes = manager.get_lane_stats()
+        assert lanes["high"]["sent"] == 1
+        assert lanes["low"]["sent"] == 4
+        assert lanes["low"]["queued"] == 0
+        assert lanes["low"]["max_wait_ms"] >= lanes["high"]["max_wait_ms"]
+        await manager.stop_delivery()
+
+    asyncio.run(run())
+
+
+def test_priority_over_bus():
+    """经投递总线转发时保留优先级，缺省为 NORMAL"""
+    received = []
+
+    async def run():
+        bus = InMemoryDeliveryBus()
+
+        async def handler(bipupu_id, payload, priority):
+            received.append(priority)
+
+        await bus.subscribe("other", handler)
+        await bus.publish("me", "0002", {"n": 1}, Priority.HIGH)
+        await bus.publish("me", "0002", {"n": 2})
+
+    asyncio.run(run())
+    assert received == [Priority.HIGH, Priority.NORMAL]
+
+    envelope = decode_envelope(encode_envelope("host:1", "0002", {"n": 1}, Priority.LOW))
+    assert normalize_priority(envelope.get("priority")) == Priority.LOW
+    envelope = decode_envelope(encode_envelope("host:1", "0002", {"n": 1}))
+    assert normalize_priority(envelope.get("priority")) == Priority.NORMAL
+
+
+def test_normalize_and_queue():
+    assert normalize_priority(1) is Priority.HIGH
+    assert normalize_priority(0) is Priority.HIGH
+    assert normalize_priority(9) is Priority.LOW
+    assert normalize_priority(None) is Priority.NORMAL
+    assert normalize_priority("x") is Priority.NORMAL
+    assert queue_for(Priority.HIGH) == "push.high"
+    assert queue_for(2) == "default"
+    assert queue_for(Priority.LOW) == "push.bulk"
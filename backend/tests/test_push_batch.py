@@ -0,0 +1,107 @@
+"""
+批量推送写入路径测试（需要 TEST_DATABASE_URL，见 conftest.py）
+
+1. 按 chunk_size 分块，每块一条 INSERT ... RETURNING，返回的消息与接收者顺序一致，提交后不再回查消息
+2. 某块写入失败时回滚该块、记录 FAILED 日志（进入重试队列），继续处理后续块
+3. contents 与接收者数量不一致时拒绝发送
+4. 写入成功的消息按优先级投递到接收者
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import event, select, text
+
+from app.core.priority import Priority
+from app.core.websocket import manager
+from app.db.database import engine
+from app.models.message import Message
+from app.models.push_log import PushLog, PushStatus
+from app.services.push.log_stream import push_log_stream
+from app.services.service_accounts import send_push_batch
+
+
+class _StatementLog:
+    """记录 messages 表的 INSERT 语句，以及最后一次 INSERT 之后读取 messages 的 SELECT"""
+
+    def __init__(self):
+        self.inserts = []
+        self.selects_after_insert = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        normalized = " ".join(statement.upper().split())
+        if normalized.startswith("INSERT INTO MESSAGES"):
+            self.inserts.append(statement)
+            self.selects_after_insert = []
+        elif normalized.startswith("SELECT") and "FROM MESSAGES" in normalized and self.inserts:
+            self.selects_after_insert.append(statement)
+
+
+@pytest.fixture
+def statements():
+    log = _StatementLog()
+    event.listen(engine, "before_cursor_execute", log)
+    yield log
+    event.remove(engine, "before_cursor_execute", log)
+
+
+@pytest.fixture
+def deliveries(monkeypatch):
+    sent = []
+
+    async def send_personal_message(message, bipupu_id, priority=Priority.NORMAL):
+        sent.append((bipupu_id, message["message"]["id"], priority))
+
+    monkeypatch.setattr(manager, "send_personal_message", send_personal_message)
+    return sent
+
+
+def test_chunks_insert_once_per_chunk(pg_db, statements, deliveries):
+    receivers = [f"3000{i:04d}" for i in range(7)]
+    contents = [f"第 {i} 条" for i in range(7)]
+
+    messages = asyncio.run(send_push_batch(
+        pg_db, "weather", receivers, contents=contents, chunk_size=3, priority=Priority.LOW,
+    ))
+
+    assert len(statements.inserts) == 3  # 3 + 3 + 1
+    # 投递与时间线缓存使用 RETURNING 结果，提交后不逐条回查消息
+    assert statements.selects_after_insert == []
+    assert [m.receiver_bipupu_id for m in messages] == receivers
+    assert [m.content for m in messages] == contents
+    assert all(m.id is not None for m in messages)
+
+    stored = pg_db.scalars(select(Message.id).order_by(Message.id)).all()
+    assert stored == sorted(m.id for m in messages)
+    assert sorted(deliveries) == sorted((m.receiver_bipupu_id, m.id, Priority.LOW) for m in messages)
+
+
+def test_failed_chunk_rolls_back_and_continues(pg_db, deliveries):
+    push_log_stream.flush_ring(pg_db)  # 日志环形缓冲区为进程级，先排空前面用例留下的条目
+    pg_db.query(PushLog).delete()
+    # 第二块中的 30000004 违反约束，整块写入失败
+    pg_db.execute(text("ALTER TABLE messages ADD CONSTRAINT reject_30000004 CHECK (receiver_bipupu_id <> '30000004')"))
+    pg_db.commit()
+    receivers = ["30000001", "30000002", "30000003", "30000004", "30000005"]
+    contents = ["a", "b", "c", "d", "e"]
+
+    messages = asyncio.run(send_push_batch(pg_db, "weather", receivers, contents=contents, chunk_size=2))
+    push_log_stream.flush_ring(pg_db)
+
+    assert [m.receiver_bipupu_id for m in messages] == ["30000001", "30000002", "30000005"]
+    assert sorted(pg_db.scalars(select(Message.receiver_bipupu_id)).all()) == ["30000001", "30000002", "30000005"]
+
+    failed = pg_db.scalars(select(PushLog).where(PushLog.status == PushStatus.FAILED)).all()
+    assert sorted(log.receiver_bipupu_id for log in failed) == ["30000003", "30000004"]
+    assert all(log.next_retry_at is not None and log.error_message for log in failed)
+    assert sorted(log.extra_data["content"] for log in failed) == ["c", "d"]
+
+    succeeded = pg_db.scalars(select(PushLog).where(PushLog.status == PushStatus.SUCCESS)).all()
+    assert len(succeeded) == 3 and all(log.next_retry_at is None for log in succeeded)
+    assert len(deliveries) == 3
+
+
+def test_contents_mismatch_rejected(pg_db, statements):
+    with pytest.raises(ValueError):
+        asyncio.run(send_push_batch(pg_db, "weather", ["30000001", "30000002"], contents=["only one"]))
+    assert statements.inserts == []
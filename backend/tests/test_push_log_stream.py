@@ -0,0 +1,132 @@
+"""
+推送日志写后落库测试（MemoryCacheWrapper 降级为进程内缓冲）
+
+1. 记录的推送结果可按条件倒序读取
+2. 缓冲中的记录一次批量写入，已落库的不会重复写入
+3. 异步落库（缓冲与 Stream）的数据库写入在线程池中执行，不阻塞事件循环
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.db.redis as redis_module
+from app.db.redis import MemoryCacheWrapper
+from app.models.push_log import PushStatus
+from app.services.push.log_stream import PushLogStream, encode_entry
+
+
+def _use_memory_cache():
+    redis_module.redis_client = MemoryCacheWrapper()
+    redis_module._redis_loop = None
+
+
+def _row(receiver: str, status: PushStatus, minute: int, service: str = "cosmic.fortune") -> dict:
+    started_at = datetime(2026, 1, 1, 9, minute, tzinfo=timezone.utc)
+    return {
+        "service_name": service,
+        "receiver_bipupu_id": receiver,
+        "content_preview": "今日运势",
+        "status": status,
+        "error_message": None if status == PushStatus.SUCCESS else "boom",
+        "task_id": None,
+        "task_name": None,
+        "started_at": started_at,
+        "completed_at": started_at + timedelta(seconds=1),
+    }
+
+
+class _RecordingSession:
+    def __init__(self):
+        self.batches = []
+        self.threads = []
+
+    def execute(self, stmt, rows):
+        self.batches.append(rows)
+        self.threads.append(threading.get_ident())
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_recent_entries():
+    """按接收者与状态筛选，新的在前"""
+    _use_memory_cache()
+    stream = PushLogStream()
+
+    async def run():
+        await stream.record([_row("0001", PushStatus.SUCCESS, 0), _row("0002", PushStatus.FAILED, 1)])
+        await stream.record([_row("0001", PushStatus.SUCCESS, 2, service="weather.service")])
+
+        items, total = await stream.recent(limit=10)
+        assert total == 3
+        assert [i["receiver_bipupu_id"] for i in items] == ["0001", "0002", "0001"]
+        assert items[0]["service_name"] == "weather.service"
+
+        items, total = await stream.recent(status="failed")
+        assert total == 1 and items[0]["error_message"] == "boom"
+
+        items, total = await stream.recent(limit=1, skip=1, receiver_id="0001")
+        assert total == 2 and items[0]["service_name"] == "cosmic.fortune"
+
+    asyncio.run(run())
+
+
+def test_flush_ring_batches_once():
+    """缓冲记录一次批量写入，类型还原为 PushStatus / datetime"""
+    _use_memory_cache()
+    stream = PushLogStream()
+    db = _RecordingSession()
+
+    async def run():
+        await stream.record([_row(f"{i:04d}", PushStatus.SUCCESS, i) for i in range(5)])
+        assert await stream.flush(db) == 5
+        assert await stream.flush(db) == 0
+
+        await stream.record([_row("0009", PushStatus.FAILED, 9)])
+        assert stream.flush_ring(db) == 1
+
+    asyncio.run(run())
+
+    assert [len(batch) for batch in db.batches] == [5, 1]
+    row = db.batches[0][0]
+    assert row["status"] is PushStatus.SUCCESS
+    assert row["created_at"] == row["completed_at"]
+    assert isinstance(row["started_at"], datetime)
+
+
+class _FakeStreamRedis:
+    def __init__(self):
+        self.acked = []
+
+    async def xack(self, stream_key, group, *ids):
+        self.acked.extend(ids)
+
+
+def test_async_flush_writes_off_loop():
+    """flush 与 Stream 批次写入不在事件循环线程中执行同步数据库 I/O"""
+    _use_memory_cache()
+    stream = PushLogStream()
+    db = _RecordingSession()
+    redis = _FakeStreamRedis()
+
+    async def run():
+        await stream.record([_row("0001", PushStatus.SUCCESS, 0)])
+        assert await stream.flush(db) == 1
+
+        batch = [("1-0", {stream.FIELD: encode_entry(_row("0002", PushStatus.SUCCESS, 1))})]
+        assert await stream._write_batch(redis, db, batch) == 1
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+
+    assert len(db.threads) == 2
+    assert loop_thread not in db.threads
+    assert redis.acked == ["1-0"]
@@ -0,0 +1,69 @@
+"""
+推送运行进度测试（MemoryCacheWrapper）
+
+1. 登记运行后各分块累加计数，chord 回调标记完成
+2. 最近运行按开始时间倒序返回，只保留 RUNS_MAX 条
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.db.redis as redis_module
+from app.db.redis import MemoryCacheWrapper
+from app.services.push.progress import PushProgress
+
+
+def _use_memory_cache() -> MemoryCacheWrapper:
+    cache = MemoryCacheWrapper()
+    redis_module.redis_client = cache
+    redis_module._redis_loop = None
+    return cache
+
+
+def test_run_progress():
+    """分块结果累加，完成后状态变为 completed"""
+    _use_memory_cache()
+
+    async def run():
+        await PushProgress.start("run-1", "cosmic.fortune", total=2500, chunks=3)
+        await PushProgress.record_chunk("run-1", success=1000, failed=0)
+        await PushProgress.record_chunk("run-1", success=990, failed=10)
+
+        run_info = await PushProgress.get_run("run-1")
+        assert run_info["status"] == "running"
+        assert run_info["chunks_done"] == 2
+        assert run_info["success"] == 1990
+        assert run_info["failed"] == 10
+
+        await PushProgress.record_chunk("run-1", success=500, failed=0)
+        await PushProgress.finish("run-1")
+
+        run_info = await PushProgress.get_run("run-1")
+        assert run_info["status"] == "completed"
+        assert run_info["chunks_done"] == 3
+        assert run_info["success"] == 2490
+        assert run_info["finished_at"] is not None
+
+    asyncio.run(run())
+
+
+def test_recent_runs_trimmed():
+    """最近运行新的在前，超出 RUNS_MAX 的被裁剪"""
+    _use_memory_cache()
+
+    async def run():
+        for i in range(PushProgress.RUNS_MAX + 5):
+            await PushProgress.start(f"run-{i}", "weather.service", total=1, chunks=1)
+
+        cache = redis_module.redis_client
+        assert await cache.zcard(PushProgress.RUNS_KEY) == PushProgress.RUNS_MAX
+
+        runs = await PushProgress.get_recent_runs(limit=3)
+        assert len(runs) == 3
+        assert runs[0]["started_at"] >= runs[1]["started_at"] >= runs[2]["started_at"]
+        assert await PushProgress.get_run("missing") is None
+
+    asyncio.run(run())
@@ -0,0 +1,122 @@
+"""
+失败推送退避重试测试
+
+1. 退避时间：指数增长，有上限，抖动落在 [delay/2, delay]
+2. 重试次数用尽后移出重试队列
+3. 失败日志行带 next_retry_at 与完整内容，经 Stream 编码后可还原
+4. 重发时逐条决定：保存了内容的按原内容发送，其余重新生成；同一接收者的多条记录各自结算
+   （需要 TEST_DATABASE_URL，见 conftest.py）
+"""
+
+import asyncio
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, text
+
+from app.core.config import settings
+from app.core.websocket import manager
+from app.models.message import Message
+from app.models.push_log import PushLog, PushStatus
+from app.services.push.content import content_generator
+from app.services.push.log_stream import decode_entry, encode_entry
+from app.services.push.retry import next_retry_at, retry_delay, retry_due_pushes
+from app.services.service_accounts import _push_log_row
+
+
+def test_retry_delay_backoff_and_cap():
+    rng = random.Random(7)
+    base = settings.PUSH_RETRY_BASE_SECONDS
+    for retry_count in range(20):
+        delay = min(base * 2 ** retry_count, settings.PUSH_RETRY_MAX_DELAY_SECONDS)
+        value = retry_delay(retry_count, rng)
+        assert delay / 2 <= value <= delay
+    # 抖动：同一重试次数的等待时间不全相同
+    assert len({round(retry_delay(2, rng), 3) for _ in range(10)}) > 1
+
+
+def test_next_retry_at_exhausted():
+    now = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+    assert next_retry_at(0, 3, now) > now
+    assert next_retry_at(2, 3, now) <= now + timedelta(seconds=settings.PUSH_RETRY_MAX_DELAY_SECONDS)
+    assert next_retry_at(3, 3, now) is None
+
+
+def test_failed_log_row_enters_retry_queue():
+    now = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+    failed = _push_log_row("weather", "10001", "明天有雨", PushStatus.FAILED, None, None, now, now, "boom")
+    assert failed["next_retry_at"] > now
+    assert failed["extra_data"] == {"content": "明天有雨"}
+
+    row = decode_entry(encode_entry(failed))
+    assert row["next_retry_at"] == failed["next_retry_at"]
+    assert row["max_retries"] == settings.PUSH_RETRY_MAX_ATTEMPTS
+
+    ok = _push_log_row("weather", "10001", "明天有雨", PushStatus.SUCCESS, None, None, now, now)
+    assert ok["next_retry_at"] is None and ok["extra_data"] is None
+
+
+def _seed_due_retries(db) -> dict:
+    """同一服务号下：40000001 有两条失败记录（一条有保存内容、一条没有），40000002 一条有保存内容"""
+    due = datetime.now(timezone.utc) - timedelta(minutes=1)
+    logs = {
+        "saved": PushLog(service_name="weather", receiver_bipupu_id="40000001", status=PushStatus.FAILED,
+                         next_retry_at=due, extra_data={"content": "保存的内容 1"}),
+        "missing": PushLog(service_name="weather", receiver_bipupu_id="40000001", status=PushStatus.FAILED,
+                           next_retry_at=due, extra_data=None),
+        "other": PushLog(service_name="weather", receiver_bipupu_id="40000002", status=PushStatus.FAILED,
+                         next_retry_at=due, extra_data={"content": "保存的内容 2"}),
+    }
+    db.add_all(logs.values())
+    db.commit()
+    return {name: log.id for name, log in logs.items()}
+
+
+def _quiet_delivery(monkeypatch):
+    async def send_personal_message(message, bipupu_id, priority=None):
+        pass
+
+    monkeypatch.setattr(manager, "send_personal_message", send_personal_message)
+    monkeypatch.setattr(content_generator, "generate_batch",
+                        lambda service_name, user_ids, current_time, extra_data=None: ["重新生成"] * len(user_ids))
+
+
+def _statuses(db, ids: dict) -> dict:
+    db.expire_all()
+    return {name: db.scalars(select(PushLog).where(PushLog.id == log_id)).one() for name, log_id in ids.items()}
+
+
+def test_retry_keeps_saved_content_per_item(pg_db, monkeypatch):
+    _quiet_delivery(monkeypatch)
+    ids = _seed_due_retries(pg_db)
+
+    stats = asyncio.run(retry_due_pushes(pg_db))
+
+    assert stats == {"total_retries": 3, "successful_retries": 3, "failed_retries": 0}
+    sent = pg_db.execute(select(Message.receiver_bipupu_id, Message.content)).all()
+    assert sorted(sent) == [("40000001", "保存的内容 1"), ("40000001", "重新生成"), ("40000002", "保存的内容 2")]
+    logs = _statuses(pg_db, ids)
+    assert all(log.status == PushStatus.SUCCESS and log.next_retry_at is None for log in logs.values())
+
+
+def test_retry_settles_duplicate_receivers_separately(pg_db, monkeypatch):
+    _quiet_delivery(monkeypatch)
+    ids = _seed_due_retries(pg_db)
+    # 按原内容重发的一组写入失败，重新生成的一组成功；40000001 的两条记录结果不同
+    pg_db.execute(text("ALTER TABLE messages ADD CONSTRAINT reject_saved_2 CHECK (content <> '保存的内容 2')"))
+    pg_db.commit()
+
+    stats = asyncio.run(retry_due_pushes(pg_db))
+
+    assert stats == {"total_retries": 3, "successful_retries": 1, "failed_retries": 2}
+    assert pg_db.execute(select(Message.receiver_bipupu_id, Message.content)).all() == [("40000001", "重新生成")]
+    logs = _statuses(pg_db, ids)
+    assert logs["missing"].status == PushStatus.SUCCESS and logs["missing"].next_retry_at is None
+    for name in ("saved", "other"):
+        assert logs[name].status == PushStatus.FAILED
+        assert logs[name].retry_count == 1 and logs[name].next_retry_at is not None
+        assert logs[name].extra_data["content"]  # 保存的内容保留，下次仍按原内容重发
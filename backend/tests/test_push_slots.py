@@ -0,0 +1,48 @@
+"""
+推送时间槽测试
+
+1. 本地推送时间按日期换算为 UTC 当日分钟数，夏令时前后结果不同
+2. 无推送时间或无效时区时不生成时间槽
+3. 时间窗口在零点附近拆为两段范围条件
+"""
+
+import os
+import sys
+from datetime import date, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.push.utils import compute_utc_push_minute, _push_window_clause
+
+
+def _sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_compute_utc_push_minute():
+    """上海 09:00 = UTC 01:00；纽约 09:00 在夏令时前后分别为 UTC 14:00 / 13:00"""
+    assert compute_utc_push_minute(time(9, 0), "Asia/Shanghai", date(2026, 1, 15)) == 60
+    assert compute_utc_push_minute(time(9, 0), None, date(2026, 1, 15)) == 60
+    assert compute_utc_push_minute(time(9, 0), "America/New_York", date(2026, 3, 7)) == 14 * 60
+    assert compute_utc_push_minute(time(9, 0), "America/New_York", date(2026, 3, 8)) == 13 * 60
+    # 跨日：上海 07:30 = 前一天 UTC 23:30
+    assert compute_utc_push_minute(time(7, 30), "Asia/Shanghai", date(2026, 1, 15)) == 23 * 60 + 30
+
+
+def test_compute_utc_push_minute_missing():
+    """未设置推送时间或时区无效时返回 None"""
+    assert compute_utc_push_minute(None, "Asia/Shanghai", date(2026, 1, 15)) is None
+    assert compute_utc_push_minute(time(9, 0), "Mars/Olympus", date(2026, 1, 15)) is None
+
+
+def test_push_window_clause():
+    """窗口为 ±15 分钟，跨零点时拆为两段"""
+    assert _sql(_push_window_clause(60)) == "subscriptions.utc_push_minute BETWEEN 45 AND 75"
+    assert _sql(_push_window_clause(5)) == (
+        "subscriptions.utc_push_minute >= 1430 OR subscriptions.utc_push_minute <= 20"
+    )
+    assert _sql(_push_window_clause(23 * 60 + 45)) == (
+        "subscriptions.utc_push_minute >= 1410 OR subscriptions.utc_push_minute <= 0"
+    )
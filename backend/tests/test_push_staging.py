@@ -0,0 +1,47 @@
+"""
+定时推送预生成与限速发布测试
+
+1. 令牌桶按速率补充令牌，容量限制突发量
+2. 推送时间槽换算为下一次发生时间
+"""
+
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.push.staging import TokenBucket, next_slot_time
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_rate_and_burst():
+    """初始满桶，取空后按 rate 补充，补充量不超过容量"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=50, clock=clock)
+
+    assert bucket.take(80) == 50
+    assert bucket.take(1) == 0
+    assert bucket.wait_time(50) == 5.0
+
+    clock.now = 2.0
+    assert bucket.take(100) == 20
+
+    clock.now = 100.0
+    assert bucket.wait_time(50) == 0.0
+    assert bucket.take(100) == 50
+
+
+def test_next_slot_time():
+    """时间槽已过则取次日，恰好等于当前时间也视为已过"""
+    now = datetime(2026, 10, 17, 18, 0, 30, tzinfo=timezone.utc)
+    assert next_slot_time(60, now) == datetime(2026, 10, 18, 1, 0, tzinfo=timezone.utc)
+    assert next_slot_time(18 * 60 + 5, now) == datetime(2026, 10, 17, 18, 5, tzinfo=timezone.utc)
+    assert next_slot_time(18 * 60, now) == datetime(2026, 10, 18, 18, 0, tzinfo=timezone.utc)
@@ -0,0 +1,146 @@
+"""
+消息时间线缓存测试（MemoryCacheWrapper）
+
+1. 新消息写穿到收件箱/发件箱时间线与 msg:{id} 对象缓存
+2. 页码模式与 before_id 游标模式从时间线组装
+3. 时间线截断后超出范围的请求回源（返回 None）
+4. 批量写穿按管道执行，往返次数与消息条数无关
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.db.redis as redis_module
+from app.db.redis import MemoryCacheWrapper
+from app.models.message import Message
+from app.services.timeline_cache import TimelineCache
+
+
+def _use_memory_cache() -> MemoryCacheWrapper:
+    cache = MemoryCacheWrapper()
+    redis_module.redis_client = cache
+    redis_module._redis_loop = None
+    return cache
+
+
+def _message(message_id: int, receiver: str = "1000002") -> Message:
+    return Message(
+        id=message_id,
+        sender_bipupu_id="1000001",
+        receiver_bipupu_id=receiver,
+        content=f"消息 {message_id}",
+        message_type="NORMAL",
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+def test_record_and_read_pages():
+    """写穿后直接从缓存组装页面（不访问数据库）"""
+    async def run():
+        cache = _use_memory_cache()
+        await cache.set(TimelineCache.total_key("received", "1000002"), 0)
+        for message_id in (1, 2, 3):
+            await TimelineCache.record_message(_message(message_id))
+
+        page = await TimelineCache.get_page(None, "1000002", page=1, page_size=2)
+        assert [m.id for m in page.messages] == [3, 2]
+        assert page.total == 3
+        assert page.has_more is True and page.next_cursor == 2
+
+        page = await TimelineCache.get_page(None, "1000002", page_size=2, before_id=2, include_total=False)
+        assert [m.id for m in page.messages] == [1]
+        assert page.has_more is False and page.total is None
+
+        # 发件箱时间线同样写入
+        assert await cache.zrevrange(TimelineCache.timeline_key("sent", "1000001"), 0, -1) == ["3", "2", "1"]
+
+    asyncio.run(run())
+
+
+def test_truncated_timeline_falls_back():
+    """时间线只保留最新 TIMELINE_MAX 条，更深的页返回 None"""
+    async def run():
+        cache = _use_memory_cache()
+        original_max = TimelineCache.TIMELINE_MAX
+        TimelineCache.TIMELINE_MAX = 3
+        try:
+            await cache.set(TimelineCache.total_key("received", "1000002"), 0)
+            for message_id in range(1, 6):
+                await TimelineCache.record_message(_message(message_id))
+
+            key = TimelineCache.timeline_key("received", "1000002")
+            assert await cache.zrevrange(key, 0, -1) == ["5", "4", "3"]
+            assert await TimelineCache.get_page(None, "1000002", page=2, page_size=2) is None
+
+            await TimelineCache.remove_message(_message(5))
+            page = await TimelineCache.get_page(None, "1000002", page=1, page_size=1)
+            assert [m.id for m in page.messages] == [4]
+            assert page.total == 4
+        finally:
+            TimelineCache.TIMELINE_MAX = original_max
+
+    asyncio.run(run())
+
+
+class _CountingCache(MemoryCacheWrapper):
+    """统计往返次数：每次管道 execute 或直接命令计一次"""
+
+    COMMANDS = ("set", "zadd", "zremrangebyrank", "expire", "exists", "incr", "incrby")
+
+    def __init__(self):
+        super().__init__()
+        self.round_trips = 0
+        self._in_pipeline = False
+        for name in self.COMMANDS:
+            setattr(self, name, self._counted(getattr(self, name)))
+
+    def _counted(self, method):
+        async def call(*args, **kwargs):
+            if not self._in_pipeline:
+                self.round_trips += 1
+            return await method(*args, **kwargs)
+        return call
+
+    def pipeline(self, transaction: bool = False):
+        pipe = super().pipeline(transaction)
+        execute = pipe.execute
+
+        async def counted():
+            self.round_trips += 1
+            self._in_pipeline = True
+            try:
+                return await execute()
+            finally:
+                self._in_pipeline = False
+        pipe.execute = counted
+        return pipe
+
+
+def test_record_messages_pipelined():
+    """广播 50 条：两次往返写完对象缓存、各时间线与已建立的 total"""
+    async def run():
+        cache = _CountingCache()
+        redis_module.redis_client = cache
+        redis_module._redis_loop = None
+        await cache.set(TimelineCache.total_key("sent", "1000001"), 7)
+        await cache.set(TimelineCache.total_key("received", "2000000"), 1)
+        cache.round_trips = 0
+
+        messages = [_message(100 + i, receiver=f"2{i:06d}") for i in range(50)]
+        await TimelineCache.record_messages(messages)
+        assert cache.round_trips == 2
+
+        sent = await cache.zrevrange(TimelineCache.timeline_key("sent", "1000001"), 0, -1)
+        assert sent == [str(100 + i) for i in reversed(range(50))]
+        assert await cache.get(TimelineCache.total_key("sent", "1000001")) == 57
+        assert await cache.get(TimelineCache.total_key("received", "2000000")) == 2
+        # 未建立 total 的时间线只追加，不写 total
+        assert await cache.zrevrange(TimelineCache.timeline_key("received", "2000049"), 0, -1) == ["149"]
+        assert not await cache.exists(TimelineCache.total_key("received", "2000049"))
+        assert await cache.get(TimelineCache.message_key(149))
+
+    asyncio.run(run())
@@ -0,0 +1,93 @@
+"""
+上传文件分块读取测试
+
+1. 超过大小上限时中止读取
+2. 非图片在读取首批数据后即被拒绝
+3. 超过落盘阈值的文件写入临时文件，小文件留在内存
+"""
+
+import asyncio
+import os
+import sys
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+
+from app.core.config import settings
+from app.services.storage_service import StorageService, UPLOAD_CHUNK_SIZE
+
+
+class CountingFile(BytesIO):
+    """记录读取字节数的文件"""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def _png(width: int, height: int) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (0, 128, 255)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_rejects_oversized_while_streaming():
+    """超过上限后不再继续读取"""
+    async def run():
+        data = _png(10, 10) + b"\x00" * (UPLOAD_CHUNK_SIZE * 4)
+        raw = CountingFile(data)
+        with pytest.raises(ValueError):
+            await StorageService._ingest_upload(UploadFile(raw), UPLOAD_CHUNK_SIZE * 2, 5000, "文件过大")
+        assert raw.bytes_read <= UPLOAD_CHUNK_SIZE * 3
+
+    asyncio.run(run())
+
+
+def test_rejects_non_image_early():
+    """非图片在首批数据后即被拒绝"""
+    async def run():
+        raw = CountingFile(b"<html>" + b"x" * (UPLOAD_CHUNK_SIZE * 4))
+        with pytest.raises(ValueError):
+            await StorageService._ingest_upload(UploadFile(raw), 10 * 1024 * 1024, 5000, "文件过大")
+        assert raw.bytes_read == UPLOAD_CHUNK_SIZE
+
+    asyncio.run(run())
+
+
+def test_rejects_oversized_dimensions_from_header():
+    """图片头中的尺寸超限时拒绝"""
+    async def run():
+        with pytest.raises(ValueError):
+            await StorageService._ingest_upload(UploadFile(BytesIO(_png(300, 20))), 10 * 1024 * 1024, 200, "文件过大")
+
+    asyncio.run(run())
+
+
+def test_spools_large_upload(monkeypatch):
+    """超过落盘阈值写入临时文件，小文件返回 bytes"""
+    monkeypatch.setattr(settings, "UPLOAD_SPOOL_THRESHOLD", 1024)
+
+    async def run():
+        small = _png(4, 4)
+        assert await StorageService._ingest_upload(UploadFile(BytesIO(small)), 10 * 1024 * 1024, 5000, "文件过大") == small
+
+        large = _png(10, 10) + b"\x00" * 4096
+        path = await StorageService._ingest_upload(UploadFile(BytesIO(large)), 10 * 1024 * 1024, 5000, "文件过大")
+        try:
+            assert isinstance(path, str)
+            with open(path, "rb") as f:
+                assert f.read() == large
+        finally:
+            StorageService._discard_source(path)
+        assert not os.path.exists(path)
+
+    asyncio.run(run())